@@ -1,3 +1,7 @@
+import time
+
+_import_started = time.perf_counter()
+
 from flask import Flask
 from config import Config
 from app.models import db
@@ -8,12 +12,47 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    # Engine lấy thông tin đăng nhập động từ OpenBao thay vì URI tĩnh
+    if app.config["DB_DYNAMIC_CREDENTIALS"]:
+        from app.db_credentials import attach_pool_events, init_dynamic_credentials
+
+        init_dynamic_credentials(app)
+
     db.init_app(app)
     migrate = Migrate(app, db)
 
+    if app.config["DB_DYNAMIC_CREDENTIALS"]:
+        with app.app_context():
+            attach_pool_events(app, db.engine)
+
     # Đăng ký blueprint
     from app.views import main
 
     app.register_blueprint(main)
 
+    if app.config["METRICS_ENABLED"]:
+        from app.metrics import init_metrics
+
+        init_metrics(app)
+
+    if app.config["TRACE_SAMPLE_RATE"] > 0:
+        from app.tracing import init_tracing
+
+        init_tracing(app)
+
+    if app.config["PROFILE_SECRET"]:
+        from app.profiling import init_profiling
+
+        init_profiling(app)
+
+    # Đăng ký các lệnh CLI và đo thời gian khởi động
+    from app.bootstrap import init_startup_timing, mark_imported, run_bootstrap
+    from app.cli import register_commands
+
+    register_commands(app)
+    mark_imported(_import_started)
+    if app.config["BAO_BOOTSTRAP_ON_START"]:
+        run_bootstrap()
+    init_startup_timing(app)
+
     return app
@@ -0,0 +1,415 @@
+import csv
+import io
+import os
+import threading
+import time
+from datetime import date, datetime, time as dtime
+
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from .models import db, Attendance, to_base36
+from .employee_directory import get_employee_directory, invalidate_employee_directory
+from .attendance_summary import refresh_summaries
+
+# Chỉ giữ chi tiết của một số dòng bị từ chối đầu tiên trong mỗi lần gửi
+MAX_REPORTED_ERRORS = 50
+
+
+def make_attendance_id(employee_id, day):
+    """
+    Sinh attendance_id xác định cho (employee_id, date) dưới dạng base36.
+
+    Cùng một nhân viên và ngày luôn cho cùng một mã nên việc gửi lại sự kiện
+    không tạo bản ghi mới. Mã vừa 10 ký tự với employee_id tới khoảng 3,6 tỷ.
+    """
+    return to_base36(employee_id * 1_000_000 + day.toordinal())
+
+
+def parse_event(event):
+    """
+    Chuyển một sự kiện chấm công thành (employee_id, date, giờ vào, giờ ra).
+
+    Sự kiện có dạng {"employee_id", "date", "check_in_time", "check_out_time"}
+    hoặc dạng máy chấm công {"employee_id", "timestamp", "type": "in"|"out"}.
+
+    Raises:
+        ValueError: Nếu sự kiện thiếu trường hoặc sai định dạng.
+        TypeError: Nếu ngày/giờ không phải chuỗi.
+    """
+    if not isinstance(event, dict):
+        raise ValueError("event must be an object")
+    try:
+        employee_id = int(event["employee_id"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("invalid employee_id")
+
+    if event.get("timestamp"):
+        moment = datetime.fromisoformat(event["timestamp"])
+        punch = moment.time().replace(microsecond=0, tzinfo=None)
+        if event.get("type", "in") == "out":
+            return employee_id, moment.date(), None, punch
+        return employee_id, moment.date(), punch, None
+
+    if not event.get("date"):
+        raise ValueError("missing date or timestamp")
+    day = date.fromisoformat(event["date"])
+    check_in = event.get("check_in_time")
+    check_out = event.get("check_out_time")
+    if not check_in and not check_out:
+        raise ValueError("missing check_in_time/check_out_time")
+    return (
+        employee_id,
+        day,
+        dtime.fromisoformat(check_in) if check_in else None,
+        dtime.fromisoformat(check_out) if check_out else None,
+    )
+
+
+def _earliest(a, b):
+    return b if a is None or (b is not None and b < a) else a
+
+
+def _latest(a, b):
+    return b if a is None or (b is not None and b > a) else a
+
+
+class AttendanceIngester:
+    """
+    Bộ đệm trong bộ nhớ cho các sự kiện chấm công, ghi xuống attendances theo lô.
+
+    Các sự kiện cùng (employee_id, date) được gộp ngay trong bộ đệm (giờ vào sớm
+    nhất, giờ ra muộn nhất). Bộ đệm được ghi khi đủ max_batch bản ghi hoặc khi
+    sự kiện cũ nhất đã chờ quá max_delay giây; trên PostgreSQL mỗi lần ghi là
+    một lệnh COPY vào bảng tạm rồi một câu INSERT ... ON CONFLICT.
+
+    Args:
+        app (Flask): Ứng dụng dùng để mở app context cho luồng ghi nền.
+        max_batch (int): Số bản ghi tối đa trong bộ đệm trước khi ghi.
+        max_delay (float): Thời gian chờ tối đa của một sự kiện, tính bằng giây.
+    """
+
+    def __init__(self, app, max_batch=5000, max_delay=0.5):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending = {}
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._stats = {
+            "received": 0,
+            "accepted": 0,
+            "rejected": 0,
+            "merged": 0,
+            "flushes": 0,
+            "flushed_rows": 0,
+            "flush_errors": 0,
+            "last_flush_ms": 0.0,
+            "last_lag_ms": 0.0,
+            "max_lag_ms": 0.0,
+        }
+        self._rejected_reasons = {}
+
+    def start(self):
+        # Thread nền không tồn tại trong tiến trình con sau khi fork, nên mỗi
+        # tiến trình khởi động thread riêng; bộ đệm kế thừa thuộc tiến trình cha
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                with self._lock:
+                    self._pending = {}
+                    self._oldest = None
+                self._wakeup = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, name="attendance-ingest", daemon=True
+            )
+            self._pid = pid
+            self._thread.start()
+
+    def submit(self, events):
+        """
+        Kiểm tra và đưa các sự kiện vào bộ đệm.
+
+        Args:
+            events (iterable): Các sự kiện dạng dict.
+
+        Returns:
+            dict: Số sự kiện được nhận, bị từ chối và chi tiết lỗi đầu tiên.
+        """
+        parsed, errors = [], []
+        rejected = 0
+        for index, event in enumerate(events):
+            try:
+                parsed.append(parse_event(event))
+            except (TypeError, ValueError) as e:
+                rejected += 1
+                self._reject(str(e))
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"index": index, "error": str(e)})
+
+        now = time.monotonic()
+        with self._lock:
+            for employee_id, day, check_in, check_out in parsed:
+                key = (employee_id, day)
+                current = self._pending.get(key)
+                if current is None:
+                    self._pending[key] = [check_in, check_out, now]
+                else:
+                    current[0] = _earliest(current[0], check_in)
+                    current[1] = _latest(current[1], check_out)
+                    self._stats["merged"] += 1
+            if self._oldest is None and self._pending:
+                self._oldest = now
+            self._stats["received"] += len(parsed) + rejected
+            self._stats["accepted"] += len(parsed)
+            self._stats["rejected"] += rejected
+            full = len(self._pending) >= self.max_batch
+
+        if full:
+            # Ghi ngay trong luồng của request để bộ đệm không phình ra vô hạn
+            self.flush()
+        else:
+            self._wakeup.set()
+        return {"accepted": len(parsed), "rejected": rejected, "errors": errors}
+
+    def flush(self):
+        """
+        Ghi toàn bộ bộ đệm xuống cơ sở dữ liệu.
+
+        Returns:
+            int: Số bản ghi đã được ghi.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._oldest = None
+            if not pending:
+                return 0
+            started = time.perf_counter()
+            with self.app.app_context():
+                rows = None
+                try:
+                    # Nạp danh bạ cũng có thể lỗi nên phải nằm trong try, nếu
+                    # không lô đã lấy khỏi bộ đệm bị mất và thread nền dừng hẳn
+                    rows = self._filter_known_employees(pending)
+                    if rows:
+                        self._write(rows)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error flushing attendance events: {e}")
+                    with self._lock:
+                        self._stats["flush_errors"] += 1
+                        if isinstance(e, OperationalError):
+                            # Lỗi kết nối: trả các sự kiện về bộ đệm để thử lại
+                            self._requeue(pending)
+                        else:
+                            failed = len(rows) if rows is not None else len(pending)
+                            self._stats["rejected"] += failed
+                            self._rejected_reasons["write failed"] = (
+                                self._rejected_reasons.get("write failed", 0) + failed
+                            )
+                    return 0
+                finally:
+                    db.session.remove()
+
+            now = time.monotonic()
+            lag = max(now - value[2] for value in pending.values()) * 1000
+            with self._lock:
+                self._stats["flushes"] += 1
+                self._stats["flushed_rows"] += len(rows)
+                self._stats["last_flush_ms"] = round(
+                    (time.perf_counter() - started) * 1000, 3
+                )
+                self._stats["last_lag_ms"] = round(lag, 3)
+                self._stats["max_lag_ms"] = max(
+                    self._stats["max_lag_ms"], round(lag, 3)
+                )
+            return len(rows)
+
+    def stats(self):
+        """
+        Returns:
+            dict: Bộ đếm nhận/từ chối/ghi, độ trễ ghi và số sự kiện đang chờ.
+        """
+        with self._lock:
+            pending_age = time.monotonic() - self._oldest if self._oldest else 0.0
+            return dict(
+                self._stats,
+                pending=len(self._pending),
+                pending_age_ms=round(pending_age * 1000, 3),
+                rejected_reasons=dict(self._rejected_reasons),
+            )
+
+    def _requeue(self, pending):
+        for key, (check_in, check_out, received_at) in pending.items():
+            current = self._pending.get(key)
+            if current is None:
+                self._pending[key] = [check_in, check_out, received_at]
+            else:
+                current[0] = _earliest(current[0], check_in)
+                current[1] = _latest(current[1], check_out)
+                current[2] = min(current[2], received_at)
+        self._oldest = min(self._oldest or time.monotonic(), time.monotonic())
+        # Đánh thức thread nền để thử lại sau max_delay thay vì chờ lần submit sau
+        self._wakeup.set()
+
+    def _reject(self, reason):
+        with self._lock:
+            self._rejected_reasons[reason] = self._rejected_reasons.get(reason, 0) + 1
+
+    def _filter_known_employees(self, pending):
+        directory = get_employee_directory()
+        if any(employee_id not in directory for employee_id, _ in pending):
+            # Nhân viên có thể vừa được thêm ở tiến trình khác: nạp lại một lần
+            invalidate_employee_directory()
+            directory = get_employee_directory()
+        rows = []
+        unknown = 0
+        for (employee_id, day), (check_in, check_out, _) in pending.items():
+            if employee_id not in directory:
+                unknown += 1
+                continue
+            rows.append(
+                (
+                    make_attendance_id(employee_id, day),
+                    employee_id,
+                    day,
+                    check_in,
+                    check_out,
+                )
+            )
+        if unknown:
+            with self._lock:
+                self._stats["rejected"] += unknown
+                self._rejected_reasons["unknown employee"] = (
+                    self._rejected_reasons.get("unknown employee", 0) + unknown
+                )
+        return rows
+
+    def _write(self, rows):
+        if db.engine.dialect.name == "postgresql":
+            self._copy_upsert(rows)
+        else:
+            self._insert_upsert(rows)
+        # Cập nhật tổng hợp tháng trong cùng transaction với dữ liệu chấm công
+        refresh_summaries({(row[1], row[2].year, row[2].month) for row in rows})
+        db.session.commit()
+
+    def _copy_upsert(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for attendance_id, employee_id, day, check_in, check_out in rows:
+            writer.writerow(
+                (
+                    attendance_id,
+                    employee_id,
+                    day.isoformat(),
+                    check_in.isoformat() if check_in else "",
+                    check_out.isoformat() if check_out else "",
+                )
+            )
+        buffer.seek(0)
+        connection = db.session.connection().connection
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS attendance_ingest ("
+                "attendance_id varchar(10), employee_id integer, date date, "
+                "check_in_time time, check_out_time time"
+                ") ON COMMIT DELETE ROWS"
+            )
+            cursor.copy_expert(
+                "COPY attendance_ingest FROM STDIN WITH (FORMAT csv)", buffer
+            )
+            cursor.execute(
+                "INSERT INTO attendances (attendance_id, employee_id, date, "
+                "check_in_time, check_out_time) "
+                "SELECT attendance_id, employee_id, date, check_in_time, "
+                "check_out_time FROM attendance_ingest "
+                "ON CONFLICT (employee_id, date) DO UPDATE SET "
+                "check_in_time = LEAST("
+                "attendances.check_in_time, EXCLUDED.check_in_time), "
+                "check_out_time = GREATEST("
+                "attendances.check_out_time, EXCLUDED.check_out_time)"
+            )
+
+    def _insert_upsert(self, rows):
+        from sqlalchemy.dialects.sqlite import insert
+
+        table = Attendance.__table__
+        statement = insert(table)
+        excluded = statement.excluded
+        statement = statement.on_conflict_do_update(
+            index_elements=["employee_id", "date"],
+            set_={
+                "check_in_time": func.min(
+                    func.coalesce(table.c.check_in_time, excluded.check_in_time),
+                    func.coalesce(excluded.check_in_time, table.c.check_in_time),
+                ),
+                "check_out_time": func.max(
+                    func.coalesce(table.c.check_out_time, excluded.check_out_time),
+                    func.coalesce(excluded.check_out_time, table.c.check_out_time),
+                ),
+            },
+        )
+        db.session.execute(
+            statement,
+            [
+                {
+                    "attendance_id": attendance_id,
+                    "employee_id": employee_id,
+                    "date": day,
+                    "check_in_time": check_in,
+                    "check_out_time": check_out,
+                }
+                for attendance_id, employee_id, day, check_in, check_out in rows
+            ],
+        )
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            with self._lock:
+                oldest = self._oldest
+            if oldest is None:
+                continue
+            remaining = self.max_delay - (time.monotonic() - oldest)
+            if remaining > 0:
+                time.sleep(remaining)
+            try:
+                self.flush()
+            except Exception as e:
+                # Thread nền không được dừng vì một lần flush lỗi
+                print(f"Error in attendance ingest thread: {e}")
+
+
+_ingester_lock = threading.Lock()
+
+
+def get_attendance_ingester():
+    """Trả về AttendanceIngester của ứng dụng hiện tại, khởi tạo khi cần."""
+    app = current_app._get_current_object()
+    ingester = app.extensions.get("attendance_ingest")
+    if ingester is None:
+        with _ingester_lock:
+            ingester = app.extensions.get("attendance_ingest")
+            if ingester is None:
+                ingester = AttendanceIngester(
+                    app,
+                    max_batch=app.config["ATTENDANCE_INGEST_MAX_BATCH"],
+                    max_delay=app.config["ATTENDANCE_INGEST_MAX_DELAY"],
+                )
+                app.extensions["attendance_ingest"] = ingester
+    # Khởi động (lại) thread nền nếu đây là tiến trình mới
+    ingester.start()
+    return ingester
@@ -0,0 +1,145 @@
+import re
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError, OperationalError
+
+from .models import db, Attendance, month_range
+
+PARTITION_PATTERN = re.compile(r"^attendances_y(\d{4})m(\d{2})$")
+
+
+def partition_name(year, month):
+    """Tên partition của một tháng, ví dụ attendances_y2026m10."""
+    return f"attendances_y{year:04d}m{month:02d}"
+
+
+def add_months(year, month, count):
+    """Cộng count tháng vào (year, month)."""
+    index = year * 12 + month - 1 + count
+    return index // 12, index % 12 + 1
+
+
+def is_partitioned():
+    """Kiểm tra bảng attendances có đang được chia partition (PostgreSQL) hay không."""
+    if db.engine.dialect.name != "postgresql":
+        return False
+    return bool(
+        db.session.execute(
+            text(
+                "SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid "
+                "WHERE c.relname = 'attendances'"
+            )
+        ).scalar()
+    )
+
+
+def list_partitions():
+    """
+    Liệt kê các partition theo tháng của bảng attendances.
+
+    Returns:
+        list: Các tuple (year, month, tên partition) theo thứ tự thời gian.
+    """
+    rows = db.session.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'attendances'"
+        )
+    ).scalars()
+    partitions = []
+    for name in rows:
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            partitions.append((int(match.group(1)), int(match.group(2)), name))
+    return sorted(partitions)
+
+
+def ensure_partitions(months_ahead=3, today=None):
+    """
+    Tạo partition cho tháng hiện tại và months_ahead tháng tiếp theo nếu chưa có.
+
+    Returns:
+        list: Tên các partition vừa được tạo.
+    """
+    today = today or date.today()
+    months = [
+        add_months(today.year, today.month, offset)
+        for offset in range(months_ahead + 1)
+    ]
+    return create_partitions(months)
+
+
+def create_partitions(months):
+    """
+    Tạo partition cho các tháng (year, month) chưa có partition.
+
+    Returns:
+        list: Tên các partition vừa được tạo.
+    """
+    existing = {name for _, _, name in list_partitions()}
+    created = []
+    for year, month in months:
+        name = partition_name(year, month)
+        if name in existing:
+            continue
+        start, end = month_range(year, month)
+        try:
+            db.session.execute(
+                text(
+                    f"CREATE TABLE {name} PARTITION OF attendances "
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+            )
+            db.session.commit()
+            created.append(name)
+        except (ProgrammingError, OperationalError) as e:
+            # Thường do partition mặc định đã có dữ liệu của tháng này
+            db.session.rollback()
+            print(f"Error creating partition {name}: {e}")
+    return created
+
+
+def apply_retention(retain_months, today=None):
+    """
+    Xóa dữ liệu chấm công cũ hơn retain_months tháng.
+
+    Trên bảng đã chia partition, cả partition của tháng cũ được tách ra và xóa
+    (DETACH + DROP) thay vì DELETE từng dòng; trên các cơ sở dữ liệu khác dùng
+    DELETE theo khoảng date.
+
+    Returns:
+        dict: Mốc thời gian giữ lại và các partition đã xóa (hoặc số dòng đã xóa).
+    """
+    today = today or date.today()
+    year, month = add_months(today.year, today.month, -retain_months)
+    cutoff = date(year, month, 1)
+
+    if not is_partitioned():
+        deleted = Attendance.query.filter(Attendance.date < cutoff).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+        return {"cutoff": cutoff.isoformat(), "deleted_rows": deleted}
+
+    dropped = []
+    for part_year, part_month, name in list_partitions():
+        if date(part_year, part_month, 1) >= cutoff:
+            break
+        db.session.execute(text(f"ALTER TABLE attendances DETACH PARTITION {name}"))
+        db.session.execute(text(f"DROP TABLE {name}"))
+        db.session.commit()
+        dropped.append(name)
+    # Dòng lọt vào partition mặc định (ngoài mọi khoảng đã tạo) vẫn phải DELETE
+    deleted = Attendance.query.filter(Attendance.date < cutoff).delete(
+        synchronize_session=False
+    )
+    db.session.commit()
+    return {
+        "cutoff": cutoff.isoformat(),
+        "dropped_partitions": dropped,
+        "deleted_rows": deleted,
+    }
@@ -0,0 +1,324 @@
+import itertools
+from datetime import datetime, time
+
+from flask import current_app
+from sqlalchemy import delete, event, inspect, insert, select
+from sqlalchemy.orm import Session
+
+from .models import db, Attendance, AttendanceSummary, month_range
+
+# Số nhân viên tối đa trong một mệnh đề IN khi làm mới tổng hợp
+REFRESH_CHUNK_SIZE = 1000
+
+
+def _late_after():
+    return time.fromisoformat(current_app.config["ATTENDANCE_LATE_AFTER"])
+
+
+def _minutes_between(check_in, check_out):
+    if check_in is None or check_out is None or check_out <= check_in:
+        return 0
+    return (
+        check_out.hour * 60 + check_out.minute - check_in.hour * 60 - check_in.minute
+    )
+
+
+def summarize_rows(rows, late_after):
+    """
+    Tổng hợp các dòng chấm công theo (employee_id, year, month).
+
+    Args:
+        rows (iterable): Các tuple (employee_id, date, check_in_time, check_out_time).
+        late_after (datetime.time): Giờ vào muộn hơn mốc này bị tính là đi muộn.
+
+    Returns:
+        dict: (employee_id, year, month) -> [days_present, total_minutes, late_arrivals].
+    """
+    summaries = {}
+    for employee_id, day, check_in, check_out in rows:
+        key = (employee_id, day.year, day.month)
+        summary = summaries.setdefault(key, [0, 0, 0])
+        if check_in is not None:
+            summary[0] += 1
+            if check_in > late_after:
+                summary[2] += 1
+        summary[1] += _minutes_between(check_in, check_out)
+    return summaries
+
+
+def _summary_rows(summaries, now):
+    return [
+        {
+            "employee_id": employee_id,
+            "year": year,
+            "month": month,
+            "days_present": days_present,
+            "total_minutes": total_minutes,
+            "late_arrivals": late_arrivals,
+            "updated_at": now,
+        }
+        for (employee_id, year, month), (
+            days_present,
+            total_minutes,
+            late_arrivals,
+        ) in summaries.items()
+    ]
+
+
+def _upsert_statement(session):
+    """
+    Câu INSERT ghi đè tổng hợp theo khóa chính (employee_id, year, month).
+
+    Xóa rồi chèn lại trong hai transaction đồng thời có thể cùng chèn một khóa
+    và một bên lỗi khóa chính, nên PostgreSQL/SQLite dùng ON CONFLICT DO UPDATE;
+    CSDL khác trả về None (dùng xóa rồi chèn).
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    statement = dialect_insert(AttendanceSummary.__table__)
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=["employee_id", "year", "month"],
+        set_={
+            "days_present": excluded.days_present,
+            "total_minutes": excluded.total_minutes,
+            "late_arrivals": excluded.late_arrivals,
+            "updated_at": excluded.updated_at,
+        },
+    )
+
+
+def _write_summaries(session, year, month, summaries, stale_ids, now):
+    """
+    Ghi tổng hợp của một tháng và xóa tổng hợp của các nhân viên không còn dữ liệu.
+
+    Args:
+        session (Session): Phiên làm việc.
+        summaries (dict): (employee_id, year, month) -> giá trị cần ghi.
+        stale_ids (iterable): employee_id có tổng hợp cần xóa.
+        now (datetime): Thời điểm cập nhật.
+    """
+    summary_table = AttendanceSummary.__table__
+    statement = _upsert_statement(session)
+    if statement is None:
+        # Không có upsert: xóa cả các khóa sắp ghi rồi chèn lại
+        stale_ids = set(stale_ids) | {key[0] for key in summaries}
+    stale_ids = sorted(stale_ids)
+    for offset in range(0, len(stale_ids), REFRESH_CHUNK_SIZE):
+        session.execute(
+            delete(summary_table).where(
+                summary_table.c.year == year,
+                summary_table.c.month == month,
+                summary_table.c.employee_id.in_(
+                    stale_ids[offset : offset + REFRESH_CHUNK_SIZE]
+                ),
+            )
+        )
+    if summaries:
+        session.execute(
+            statement if statement is not None else insert(summary_table),
+            _summary_rows(summaries, now),
+        )
+
+
+def refresh_summaries(keys, session=None):
+    """
+    Tính lại tổng hợp của các (employee_id, year, month) bị ảnh hưởng.
+
+    Mỗi khóa chỉ đọc các dòng chấm công của một nhân viên trong một tháng (theo
+    chỉ mục (employee_id, date)), nên chi phí tỉ lệ với số dòng vừa thay đổi
+    chứ không phải kích thước bảng. Không commit: thay đổi nằm trong cùng
+    transaction với thao tác ghi chấm công.
+
+    Args:
+        keys (iterable): Các tuple (employee_id, year, month).
+        session (Session): Phiên làm việc, mặc định là db.session.
+    """
+    session = session or db.session
+    late_after = _late_after()
+    table = Attendance.__table__
+    now = datetime.utcnow()
+
+    by_month = {}
+    for employee_id, year, month in keys:
+        by_month.setdefault((year, month), set()).add(employee_id)
+
+    for (year, month), employee_ids in by_month.items():
+        start, end = month_range(year, month)
+        employee_ids = sorted(employee_ids)
+        for offset in range(0, len(employee_ids), REFRESH_CHUNK_SIZE):
+            chunk = employee_ids[offset : offset + REFRESH_CHUNK_SIZE]
+            rows = session.execute(
+                select(
+                    table.c.employee_id,
+                    table.c.date,
+                    table.c.check_in_time,
+                    table.c.check_out_time,
+                ).where(
+                    table.c.employee_id.in_(chunk),
+                    table.c.date >= start,
+                    table.c.date < end,
+                )
+            )
+            summaries = summarize_rows(rows, late_after)
+            # Nhân viên không còn dòng chấm công nào trong tháng bị xóa tổng hợp
+            present = {key[0] for key in summaries}
+            stale_ids = [
+                employee_id for employee_id in chunk if employee_id not in present
+            ]
+            _write_summaries(session, year, month, summaries, stale_ids, now)
+
+
+def get_summary(employee_id, year, month):
+    """
+    Đọc tổng hợp chấm công của một nhân viên trong tháng (tra cứu theo khóa chính).
+
+    Returns:
+        AttendanceSummary: Bản tổng hợp, hoặc None nếu tháng đó không có dữ liệu.
+    """
+    return db.session.get(AttendanceSummary, (employee_id, year, month))
+
+
+def get_month_summaries(year, month):
+    """
+    Trả về ánh xạ employee_id -> AttendanceSummary của một tháng.
+
+    Nhân viên có dữ liệu chấm công trong tháng nhưng chưa có tổng hợp (ví dụ
+    dòng được ghi trước khi nâng cấp, khi bảng tổng hợp mới chỉ có một phần)
+    được tính lại trước khi trả về, để bảng lương không đọc thành 0 ngày công.
+    """
+    summaries = {
+        summary.employee_id: summary
+        for summary in AttendanceSummary.query.filter_by(year=year, month=month)
+    }
+    start, end = month_range(year, month)
+    employee_ids = db.session.scalars(
+        select(Attendance.employee_id)
+        .where(
+            Attendance.date >= start,
+            Attendance.date < end,
+            Attendance.employee_id.is_not(None),
+        )
+        .distinct()
+    )
+    missing = {
+        (employee_id, year, month)
+        for employee_id in employee_ids
+        if employee_id not in summaries
+    }
+    if missing:
+        refresh_summaries(missing)
+        db.session.commit()
+        summaries = {
+            summary.employee_id: summary
+            for summary in AttendanceSummary.query.filter_by(year=year, month=month)
+        }
+    return summaries
+
+
+def reconcile_month(year, month, batch_size=5000):
+    """
+    Đối chiếu toàn bộ tổng hợp của một tháng với dữ liệu chấm công gốc.
+
+    Dùng cho job chạy hằng đêm để sửa sai lệch (ví dụ dữ liệu bị sửa trực tiếp
+    trong cơ sở dữ liệu).
+
+    Returns:
+        dict: Số tổng hợp đã kiểm tra, được tạo, được sửa và bị xóa.
+    """
+    start, end = month_range(year, month)
+    table = Attendance.__table__
+    rows = db.session.execute(
+        select(
+            table.c.employee_id,
+            table.c.date,
+            table.c.check_in_time,
+            table.c.check_out_time,
+        )
+        .where(table.c.date >= start, table.c.date < end)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    expected = summarize_rows(rows, _late_after())
+    existing = {
+        (summary.employee_id, summary.year, summary.month): [
+            summary.days_present,
+            summary.total_minutes,
+            summary.late_arrivals,
+        ]
+        for summary in AttendanceSummary.query.filter_by(year=year, month=month)
+    }
+
+    created = [key for key in expected if key not in existing]
+    fixed = [
+        key for key in expected if key in existing and existing[key] != expected[key]
+    ]
+    deleted = [key for key in existing if key not in expected]
+    rewrite = {key: expected[key] for key in created + fixed}
+    _write_summaries(
+        db.session,
+        year,
+        month,
+        rewrite,
+        [key[0] for key in deleted],
+        datetime.utcnow(),
+    )
+    db.session.commit()
+    return {
+        "year": year,
+        "month": month,
+        "checked": len(set(expected) | set(existing)),
+        "created": len(created),
+        "fixed": len(fixed),
+        "deleted": len(deleted),
+    }
+
+
+def attendance_months():
+    """Liệt kê mọi (year, month) có dữ liệu chấm công hoặc tổng hợp."""
+    months = set()
+    for (day,) in db.session.execute(select(Attendance.date).distinct()):
+        months.add((day.year, day.month))
+    for year, month in db.session.execute(
+        select(AttendanceSummary.year, AttendanceSummary.month).distinct()
+    ):
+        months.add((year, month))
+    return sorted(months)
+
+
+def _attendance_keys(obj):
+    keys = set()
+    state = inspect(obj)
+    employee_ids = set(state.attrs.employee_id.history.sum())
+    days = set(state.attrs.date.history.sum())
+    for employee_id, day in itertools.product(employee_ids, days):
+        if employee_id is not None and day is not None:
+            keys.add((employee_id, day.year, day.month))
+    return keys
+
+
+@event.listens_for(Session, "after_flush")
+def _track_attendance_changes(session, flush_context):
+    # Ghi nhận các (nhân viên, tháng) bị ảnh hưởng, kể cả giá trị cũ khi một dòng
+    # được chuyển sang nhân viên/ngày khác
+    keys = session.info.setdefault("attendance_summary_keys", set())
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Attendance):
+            keys.update(_attendance_keys(obj))
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_on_commit(session):
+    session.flush()
+    keys = session.info.pop("attendance_summary_keys", None)
+    if keys:
+        refresh_summaries(keys, session=session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _reset_on_rollback(session):
+    session.info.pop("attendance_summary_keys", None)
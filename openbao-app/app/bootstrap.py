@@ -0,0 +1,166 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .vault_postgresql import (
+    postgresql_config_exists,
+    postgresql_role_exists,
+    configure_postgresql,
+    create_postgresql_role,
+    generate_postgresql_credentials,
+    query_postgresql,
+)
+from .vault_secrets import list_mounted_secrets
+
+_phases = {}
+_phases_lock = threading.Lock()
+
+
+def record_phase(name, seconds):
+    """
+    Ghi lại thời gian của một giai đoạn khởi động.
+
+    Args:
+        name (str): Tên giai đoạn (import, bootstrap, first_request).
+        seconds (float): Thời gian thực hiện tính bằng giây.
+    """
+    with _phases_lock:
+        _phases[name] = seconds
+
+
+def mark_imported(started):
+    """
+    Ghi lại thời gian import, tính từ mốc started đến thời điểm gọi hàm.
+
+    Args:
+        started (float): Giá trị time.perf_counter() lúc bắt đầu import.
+    """
+    record_phase("import", time.perf_counter() - started)
+
+
+def get_startup_report():
+    """
+    Trả về báo cáo thời gian khởi động theo từng giai đoạn.
+
+    Returns:
+        dict: Thời gian (ms) của các giai đoạn import, bootstrap, first_request
+        và tổng cộng.
+    """
+    with _phases_lock:
+        phases = dict(_phases)
+    report = {
+        name: round(phases[name] * 1000, 2)
+        for name in ("import", "bootstrap", "first_request")
+        if name in phases
+    }
+    report["total"] = round(sum(phases.values()) * 1000, 2)
+    return report
+
+
+def print_startup_report():
+    """In báo cáo thời gian khởi động ra stdout."""
+    report = get_startup_report()
+    print("Startup timing (ms):")
+    for name, value in report.items():
+        print(f"- {name}: {value}")
+
+
+def run_bootstrap(smoke_test=False):
+    """
+    Thiết lập OpenBao cho ứng dụng: secret engines, cấu hình và role PostgreSQL.
+
+    Các bước kiểm tra độc lập được chạy song song; bước ghi chỉ được thực hiện
+    khi cấu hình chưa tồn tại, nên có thể chạy lại nhiều lần một cách an toàn.
+
+    Args:
+        smoke_test (bool): Nếu True, tạo thông tin đăng nhập tạm thời và chạy
+            truy vấn thử để kiểm tra kết nối PostgreSQL.
+
+    Returns:
+        dict: Kết quả của từng bước và thời gian thực hiện (ms).
+    """
+    started = time.perf_counter()
+    timings = {}
+
+    def timed(name, func, *args):
+        step_started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            timings[name] = round((time.perf_counter() - step_started) * 1000, 2)
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        mounts_future = executor.submit(timed, "list_mounts", list_mounted_secrets)
+        config_future = executor.submit(
+            timed, "check_config", postgresql_config_exists
+        )
+        role_future = executor.submit(timed, "check_role", postgresql_role_exists)
+        mounts = mounts_future.result()
+        config_exists = config_future.result()
+        role_exists = role_future.result()
+
+    if mounts:
+        print("Mounted Secret Engines:")
+        for mount, details in mounts.items():
+            print(f"- Path: {mount}, Type: {details['type']}")
+
+    # Role tham chiếu tới cấu hình database nên phải tạo sau cấu hình.
+    # Bỏ qua bước ghi nếu bước kiểm tra tương ứng không liên lạc được với Vault.
+    configured = False
+    if config_exists is not None:
+        configured = timed("configure", configure_postgresql, config_exists)
+    role_created = False
+    if role_exists is not None and configured:
+        role_created = timed("create_role", create_postgresql_role, role_exists)
+
+    result = {
+        "mounts": sorted(mounts) if mounts else [],
+        "postgresql_configured": configured,
+        "role_created": role_created,
+    }
+
+    if smoke_test:
+        credentials = timed("generate_credentials", generate_postgresql_credentials)
+        if credentials:
+            timed(
+                "query",
+                query_postgresql,
+                credentials["username"],
+                credentials["password"],
+            )
+        result["smoke_test"] = bool(credentials)
+
+    elapsed = time.perf_counter() - started
+    record_phase("bootstrap", elapsed)
+    result["timings_ms"] = timings
+    result["total_ms"] = round(elapsed * 1000, 2)
+    return result
+
+
+def init_startup_timing(app):
+    """
+    Đăng ký hook đo thời gian request đầu tiên và in báo cáo khởi động.
+
+    Args:
+        app (Flask): Ứng dụng Flask.
+    """
+    state = {"done": False, "started": None}
+    lock = threading.Lock()
+
+    @app.before_request
+    def _start_first_request_timer():
+        if not state["done"] and state["started"] is None:
+            with lock:
+                if state["started"] is None:
+                    state["started"] = time.perf_counter()
+
+    @app.teardown_request
+    def _finish_first_request_timer(exc=None):
+        if state["done"] or state["started"] is None:
+            return
+        with lock:
+            if state["done"]:
+                return
+            state["done"] = True
+        record_phase("first_request", time.perf_counter() - state["started"])
+        print_startup_report()
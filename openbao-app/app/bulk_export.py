@@ -0,0 +1,183 @@
+import csv
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import select
+
+from .models import db, Employee
+from .vault_config import get_batch_settings
+
+# Các cột xuất ra: cột thường của Employee rồi tới các trường nhạy cảm đã giải mã
+EXPORT_COLUMNS = (
+    "employee_id",
+    "name",
+    "gender",
+    "date_of_birth",
+    "address",
+    "status",
+) + Employee.sensitive_fields
+
+CONTENT_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+# Số lần đọc lại các nhân viên của một trang khi Vault không trả kịp dữ liệu
+PAGE_ATTEMPTS = 3
+
+
+class ExportIncompleteError(RuntimeError):
+    """Không đọc được dữ liệu nhạy cảm của một trang sau PAGE_ATTEMPTS lần thử."""
+
+
+def _iter_pages(batch_size):
+    """
+    Đọc bảng employees theo trang bằng server-side cursor.
+
+    Chỉ các cột được đọc (không tạo đối tượng ORM) nên identity map của phiên
+    làm việc không lớn dần trong lúc xuất.
+    """
+    statement = (
+        select(Employee.__table__)
+        .order_by(Employee.__table__.c.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    for page in db.session.execute(statement).partitions(batch_size):
+        yield page
+
+
+def _missing_indexes(page, values_list):
+    # Trường có khóa tham chiếu nhưng không có giá trị là lần đọc bị lỗi hoặc
+    # quá thời hạn, không phải trường để trống
+    return [
+        index
+        for index, (row, values) in enumerate(zip(page, values_list))
+        if any(
+            values.get(field) is None and getattr(row, f"{field}_key") is not None
+            for field in Employee.sensitive_fields
+        )
+    ]
+
+
+def _load_page(page, max_workers):
+    """
+    Giải mã dữ liệu nhạy cảm của một trang, đọc lại các nhân viên bị thiếu.
+
+    Raises:
+        ExportIncompleteError: Khi vẫn còn trường không đọc được sau
+            PAGE_ATTEMPTS lần thử, để bản xuất không chứa ô trống sai.
+    """
+    values_list = Employee.load_sensitive_batch(page, max_workers=max_workers)
+    missing = _missing_indexes(page, values_list)
+    for _ in range(PAGE_ATTEMPTS - 1):
+        if not missing:
+            break
+        rows = [page[index] for index in missing]
+        retried = Employee.load_sensitive_batch(rows, max_workers=max_workers)
+        for index, values in zip(missing, retried):
+            values_list[index] = values
+        missing = [missing[offset] for offset in _missing_indexes(rows, retried)]
+    if missing:
+        raise ExportIncompleteError(
+            f"Could not read sensitive fields of {len(missing)} employees "
+            f"(first id: {page[missing[0]].employee_id})"
+        )
+    return page, values_list
+
+
+def iter_employee_records(batch_size=500, max_workers=None):
+    """
+    Duyệt toàn bộ nhân viên kèm dữ liệu nhạy cảm đã giải mã.
+
+    Dữ liệu nhạy cảm của trang kế tiếp được giải mã trong luồng nền trong lúc
+    trang hiện tại đang được ghi ra, nên thời gian chờ Vault và thời gian ghi
+    chồng lên nhau. Tại mỗi thời điểm chỉ có tối đa hai trang trong bộ nhớ.
+
+    Args:
+        batch_size (int): Số nhân viên mỗi trang.
+        max_workers (int): Số request Vault đồng thời tối đa cho mỗi trang.
+
+    Yields:
+        list: Mỗi phần tử là một trang, gồm các dict cột -> giá trị.
+
+    Raises:
+        ExportIncompleteError: Khi một trang không đọc được đầy đủ từ Vault.
+    """
+    if max_workers is None:
+        max_workers = get_batch_settings()["max_workers"]
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="export") as executor:
+        pending = None
+        for page in _iter_pages(batch_size):
+            future = executor.submit(_load_page, page, max_workers)
+            if pending is not None:
+                yield _merge(*pending.result())
+            pending = future
+        if pending is not None:
+            yield _merge(*pending.result())
+
+
+def _merge(page, values_list):
+    return [
+        {
+            column: values.get(column, getattr(row, column, None))
+            for column in EXPORT_COLUMNS
+        }
+        for row, values in zip(page, values_list)
+    ]
+
+
+def iter_employee_export(fmt="csv", batch_size=500, max_workers=None):
+    """
+    Sinh nội dung xuất theo từng khối văn bản, mỗi khối ứng với một trang.
+
+    Args:
+        fmt (str): "csv" hoặc "ndjson".
+
+    Yields:
+        str: Một khối CSV (khối đầu có dòng tiêu đề) hoặc NDJSON.
+
+    Raises:
+        ExportIncompleteError: Khi một trang không đọc được đầy đủ; các khối
+            đã sinh trước đó không phải là bản xuất hoàn chỉnh.
+    """
+    if fmt not in CONTENT_TYPES:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        yield buffer.getvalue()
+
+    for records in iter_employee_records(batch_size, max_workers):
+        if fmt == "csv":
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(records)
+            yield buffer.getvalue()
+        else:
+            yield "".join(
+                json.dumps(record, default=str, ensure_ascii=False) + "\n"
+                for record in records
+            )
+
+
+def export_employees_file(path, fmt="csv", batch_size=500, max_workers=None):
+    """
+    Ghi toàn bộ nhân viên ra file, xem iter_employee_export().
+
+    Nội dung được ghi ra file tạm rồi mới đổi tên, nên khi xuất lỗi giữa chừng
+    file đích không bị thay bằng một bản xuất thiếu.
+
+    Returns:
+        int: Số byte đã ghi.
+    """
+    written = 0
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, "w", newline="", encoding="utf-8") as f:
+            for chunk in iter_employee_export(fmt, batch_size, max_workers):
+                written += f.write(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    os.replace(temp_path, path)
+    return written
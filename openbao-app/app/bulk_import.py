@@ -0,0 +1,324 @@
+import csv
+import io
+import itertools
+import json
+import os
+import time
+from datetime import date
+
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from .models import db, Employee
+from .employee_directory import invalidate_employee_directory
+
+# Các cột thường của Employee có thể nhập trực tiếp
+EMPLOYEE_COLUMNS = (
+    "employee_id",
+    "name",
+    "gender",
+    "date_of_birth",
+    "address",
+    "status",
+)
+# Chỉ giữ chi tiết của một số lỗi đầu tiên để bộ nhớ không tăng theo kích thước file
+MAX_REPORTED_ERRORS = 100
+
+
+def detect_format(source_name):
+    """Xác định định dạng đầu vào ("csv" hoặc "jsonl") theo phần mở rộng."""
+    return "jsonl" if source_name.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def iter_rows(stream, fmt):
+    """
+    Đọc tuần tự từng dòng của file CSV (có dòng tiêu đề) hoặc JSONL.
+
+    Dòng JSONL được trả về nguyên dạng văn bản và chỉ được giải mã trong
+    _parse_row(), để một dòng hỏng chỉ làm lỗi dòng đó thay vì cả lần nhập.
+
+    Args:
+        stream (file): File văn bản đã được mở.
+        fmt (str): "csv" hoặc "jsonl".
+
+    Yields:
+        dict | str: Dữ liệu của một nhân viên (CSV) hoặc một dòng JSON.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def _chunks(rows, size):
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _parse_row(row):
+    """Tách một dòng thành (giá trị cột thường, giá trị nhạy cảm)."""
+    if isinstance(row, str):
+        row = json.loads(row)
+    if not isinstance(row, dict):
+        raise ValueError("row must be a JSON object")
+    columns = {column: row.get(column) or None for column in EMPLOYEE_COLUMNS}
+    if not columns["employee_id"] or not columns["name"]:
+        raise ValueError("employee_id and name are required")
+    if columns["date_of_birth"]:
+        columns["date_of_birth"] = date.fromisoformat(columns["date_of_birth"])
+    # Kiểm tra độ dài trước khi ghi Vault: một giá trị quá dài làm INSERT của
+    # cả lô thất bại sau khi dữ liệu nhạy cảm đã được ghi
+    for column in EMPLOYEE_COLUMNS:
+        length = getattr(Employee.__table__.c[column].type, "length", None)
+        value = columns[column]
+        if length is None or value is None:
+            continue
+        if not isinstance(value, str):
+            raise ValueError(f"{column} must be a string")
+        if len(value) > length:
+            raise ValueError(f"{column} is longer than {length} characters")
+    sensitive = {field: row.get(field) or None for field in Employee.sensitive_fields}
+    return columns, sensitive
+
+
+def _record_error(stats, row, error):
+    stats["failed"] += 1
+    if len(stats["errors"]) < MAX_REPORTED_ERRORS:
+        stats["errors"].append({"row": row, "error": error})
+
+
+def _load_checkpoint(checkpoint_path, source_name):
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return 0
+    with open(checkpoint_path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("source") != source_name:
+        return 0
+    return checkpoint.get("rows_done", 0)
+
+
+def _save_checkpoint(checkpoint_path, source_name, rows_done):
+    if not checkpoint_path:
+        return
+    # Ghi ra file tạm rồi đổi tên để checkpoint không bao giờ bị ghi dở
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"source": source_name, "rows_done": rows_done}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def _insert_statement():
+    """
+    Trả về (câu INSERT, có RETURNING hay không).
+
+    Nhân viên đã tồn tại được bỏ qua để có thể chạy lại một lô đã commit
+    nhưng chưa kịp ghi checkpoint (import_employees cũng lọc chúng trước khi ghi
+    Vault; ON CONFLICT phòng khi hai lần nhập chạy đồng thời); RETURNING cho
+    biết số dòng thực sự được nhập.
+    """
+    table = Employee.__table__
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(table), False
+    statement = dialect_insert(table).on_conflict_do_nothing(
+        index_elements=["employee_id"]
+    )
+    return statement.returning(table.c.id), True
+
+
+def _existing_employee_ids(employee_ids):
+    employee_ids = set(employee_ids)
+    if not employee_ids:
+        return set()
+    rows = db.session.query(Employee.employee_id).filter(
+        Employee.employee_id.in_(employee_ids)
+    )
+    return {employee_id for (employee_id,) in rows}
+
+
+def _insert_rows(statement, returning, mappings):
+    """Chạy câu INSERT, trả về số dòng thực sự được nhập."""
+    result = db.session.execute(statement, mappings)
+    return len(result.all()) if returning else len(mappings)
+
+
+def _insert_rows_one_by_one(statement, returning, mappings, line_numbers, stats):
+    """
+    Nhập lại từng dòng của một lô vừa bị DB từ chối, mỗi dòng một lần commit.
+
+    Returns:
+        tuple: (số dòng được nhập, danh sách chỉ số các dòng bị DB từ chối).
+    """
+    inserted, rejected = 0, []
+    for index, (mapping, line_number) in enumerate(zip(mappings, line_numbers)):
+        try:
+            inserted += _insert_rows(statement, returning, [mapping])
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            _record_error(stats, line_number, str(e.orig or e).strip())
+            rejected.append(index)
+    return inserted, rejected
+
+
+def import_employees(
+    stream,
+    fmt,
+    source_name=None,
+    batch_size=500,
+    max_workers=None,
+    checkpoint_path=None,
+    progress=None,
+):
+    """
+    Nhập nhân viên từ một luồng CSV/JSONL theo từng lô.
+
+    Mỗi lô tốn một lần ghi dữ liệu nhạy cảm theo lô (store_sensitive_batch),
+    một câu INSERT nhiều dòng và một lần commit. Chỉ một lô được giữ trong bộ
+    nhớ nên bộ nhớ sử dụng không phụ thuộc kích thước file. Sau mỗi lần commit
+    số dòng đã xử lý được ghi vào checkpoint để có thể chạy tiếp sau khi lỗi.
+
+    Args:
+        stream (file): File văn bản đầu vào.
+        fmt (str): "csv" hoặc "jsonl".
+        source_name (str): Tên nguồn dùng để đối chiếu checkpoint.
+        batch_size (int): Số dòng mỗi lô.
+        max_workers (int): Số request ghi Vault đồng thời tối đa.
+        checkpoint_path (str): Đường dẫn file checkpoint, None để không dùng.
+        progress (callable): Hàm nhận dict thống kê sau mỗi lô.
+
+    Returns:
+        dict: Số dòng đã đọc, đã nhập, bị bỏ qua, lỗi và tốc độ (dòng/giây).
+    """
+    source_name = source_name or getattr(stream, "name", "<stream>")
+    rows_done = _load_checkpoint(checkpoint_path, source_name)
+    stats = {
+        "rows": rows_done,
+        "resumed_from": rows_done,
+        "inserted": 0,
+        "skipped": 0,
+        "failed": 0,
+        "errors": [],
+        "elapsed": 0.0,
+        "rows_per_sec": 0.0,
+    }
+    started = time.perf_counter()
+    statement, returning = _insert_statement()
+    rows = itertools.islice(iter_rows(stream, fmt), rows_done, None)
+
+    for chunk in _chunks(rows, batch_size):
+        parsed = []
+        for offset, row in enumerate(chunk):
+            line_number = stats["rows"] + offset + 1
+            try:
+                parsed.append((line_number, *_parse_row(row)))
+            except (ValueError, TypeError) as e:
+                _record_error(stats, line_number, str(e))
+
+        # Bỏ nhân viên đã có trong DB và mã trùng trong lô (giữ dòng đầu) trước
+        # khi ghi Vault, để dòng bị bỏ qua không ghi đè dữ liệu nhạy cảm hiện có
+        seen = _existing_employee_ids(
+            columns["employee_id"] for _, columns, _ in parsed
+        )
+        records, values_list, line_numbers = [], [], []
+        for line_number, columns, sensitive in parsed:
+            if columns["employee_id"] in seen:
+                stats["skipped"] += 1
+                continue
+            seen.add(columns["employee_id"])
+            records.append(Employee(**columns))
+            values_list.append(sensitive)
+            line_numbers.append(line_number)
+
+        Employee.store_sensitive_batch(records, values_list, max_workers=max_workers)
+
+        mappings, stored_records, stored_line_numbers = [], [], []
+        for record, values, line_number in zip(records, values_list, line_numbers):
+            # Không nhập dòng có trường nhạy cảm chưa được ghi vào Vault
+            if any(
+                value is not None and getattr(record, f"{field}_key") is None
+                for field, value in values.items()
+            ):
+                _record_error(stats, line_number, "failed to store sensitive data")
+                continue
+            mappings.append(
+                {
+                    column.key: getattr(record, column.key)
+                    for column in Employee.__table__.columns
+                    if column.key != "id"
+                }
+            )
+            stored_records.append(record)
+            stored_line_numbers.append(line_number)
+
+        inserted, rejected = 0, []
+        if mappings:
+            try:
+                inserted = _insert_rows(statement, returning, mappings)
+                db.session.commit()
+            except SQLAlchemyError:
+                # Một dòng lỗi làm hỏng cả lô: nhập lại từng dòng để các dòng
+                # hợp lệ vẫn được nhập, rồi xóa document Vault của các dòng bị
+                # từ chối để chúng không bị bỏ rơi
+                db.session.rollback()
+                inserted, rejected = _insert_rows_one_by_one(
+                    statement, returning, mappings, stored_line_numbers, stats
+                )
+                Employee.discard_sensitive_batch(
+                    [stored_records[index] for index in rejected],
+                    max_workers=max_workers,
+                )
+            stats["inserted"] += inserted
+            stats["skipped"] += len(mappings) - len(rejected) - inserted
+        else:
+            db.session.commit()
+
+        stats["rows"] += len(chunk)
+        _save_checkpoint(checkpoint_path, source_name, stats["rows"])
+        stats["elapsed"] = round(time.perf_counter() - started, 3)
+        processed = stats["rows"] - stats["resumed_from"]
+        if stats["elapsed"]:
+            stats["rows_per_sec"] = round(processed / stats["elapsed"], 1)
+        if progress is not None:
+            progress(stats)
+
+    # INSERT dạng core không đi qua flush của ORM nên danh bạ phải được làm mới
+    if stats["inserted"]:
+        invalidate_employee_directory()
+    return stats
+
+
+def import_employees_file(path, fmt=None, **kwargs):
+    """
+    Nhập nhân viên từ một file CSV/JSONL, xem import_employees().
+    """
+    with open(path, newline="", encoding="utf-8") as stream:
+        return import_employees(
+            stream,
+            fmt or detect_format(path),
+            source_name=os.path.abspath(path),
+            **kwargs,
+        )
+
+
+def import_employees_upload(file_storage, fmt=None, **kwargs):
+    """
+    Nhập nhân viên từ file được tải lên qua form (werkzeug FileStorage).
+    """
+    stream = io.TextIOWrapper(file_storage.stream, encoding="utf-8", newline="")
+    return import_employees(
+        stream,
+        fmt or detect_format(file_storage.filename or ""),
+        source_name=file_storage.filename,
+        **kwargs,
+    )
@@ -0,0 +1,162 @@
+import json
+from datetime import date
+
+import click
+
+from .bootstrap import run_bootstrap
+from .bulk_import import import_employees_file
+from .bulk_export import (
+    ExportIncompleteError,
+    export_employees_file,
+    iter_employee_export,
+)
+from .attendance_partitions import (
+    add_months,
+    apply_retention,
+    ensure_partitions,
+    is_partitioned,
+)
+from .payroll import run_payroll
+from .attendance_summary import attendance_months, reconcile_month
+from .models import Employee, Salary
+from .profiling import PROFILE_HEADER, make_token
+
+
+def register_commands(app):
+    """
+    Đăng ký các lệnh CLI của ứng dụng với Flask.
+
+    Args:
+        app (Flask): Ứng dụng Flask.
+    """
+
+    @app.cli.command("bao-bootstrap")
+    @click.option(
+        "--smoke-test",
+        is_flag=True,
+        help="Tạo thông tin đăng nhập tạm thời và chạy truy vấn thử.",
+    )
+    def bao_bootstrap(smoke_test):
+        """Thiết lập OpenBao cho ứng dụng (chạy một lần cho mỗi lần triển khai)."""
+        result = run_bootstrap(smoke_test=smoke_test)
+        click.echo(json.dumps(result, indent=2))
+
+    @app.cli.command("transit-rewrap")
+    @click.option("--batch-size", default=500, show_default=True)
+    def transit_rewrap(batch_size):
+        """Mã hóa lại các cột transit đang dùng phiên bản khóa cũ."""
+        for model in (Employee, Salary):
+            result = model.rewrap_sensitive_columns(batch_size=batch_size)
+            if result is None:
+                raise click.ClickException("Failed to read transit key version.")
+            click.echo(
+                f"{model.__tablename__}: rewrapped {result['rewrapped']} values "
+                f"to key version {result['latest_version']}"
+            )
+
+    @app.cli.command("import-employees")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]))
+    @click.option("--batch-size", default=500, show_default=True)
+    @click.option("--max-workers", type=int, help="Số request ghi Vault đồng thời.")
+    @click.option(
+        "--checkpoint",
+        type=click.Path(dir_okay=False),
+        help="File checkpoint để chạy tiếp sau khi lỗi (mặc định: <path>.checkpoint).",
+    )
+    @click.option("--no-checkpoint", is_flag=True, help="Không dùng checkpoint.")
+    def import_employees(path, fmt, batch_size, max_workers, checkpoint, no_checkpoint):
+        """Nhập nhân viên từ file CSV hoặc JSONL theo từng lô."""
+        checkpoint_path = None if no_checkpoint else checkpoint or f"{path}.checkpoint"
+
+        def report(stats):
+            click.echo(
+                f"{stats['rows']} rows, {stats['inserted']} inserted, "
+                f"{stats['skipped']} skipped, {stats['failed']} failed "
+                f"({stats['rows_per_sec']} rows/s)",
+                err=True,
+            )
+
+        result = import_employees_file(
+            path,
+            fmt=fmt,
+            batch_size=batch_size,
+            max_workers=max_workers,
+            checkpoint_path=checkpoint_path,
+            progress=report,
+        )
+        click.echo(json.dumps(result, indent=2))
+
+    @app.cli.command("export-employees")
+    @click.argument("path", default="-")
+    @click.option(
+        "--format", "fmt", type=click.Choice(["csv", "ndjson"]), default="csv"
+    )
+    @click.option("--batch-size", default=500, show_default=True)
+    @click.option("--max-workers", type=int, help="Số request đọc Vault đồng thời.")
+    def export_employees(path, fmt, batch_size, max_workers):
+        """Xuất toàn bộ nhân viên kèm dữ liệu nhạy cảm ra file (hoặc stdout với -)."""
+        try:
+            if path == "-":
+                for chunk in iter_employee_export(fmt, batch_size, max_workers):
+                    click.echo(chunk, nl=False)
+                return
+            written = export_employees_file(path, fmt, batch_size, max_workers)
+        except ExportIncompleteError as e:
+            raise click.ClickException(f"Export aborted: {e}")
+        click.echo(f"Wrote {written} bytes to {path}", err=True)
+
+    @app.cli.command("attendance-partitions")
+    @click.option("--months-ahead", default=3, show_default=True)
+    @click.option(
+        "--retain-months",
+        type=int,
+        help="Xóa dữ liệu chấm công cũ hơn số tháng này (mặc định: giữ tất cả).",
+    )
+    def attendance_partitions(months_ahead, retain_months):
+        """Tạo partition chấm công cho các tháng tới và xóa partition quá hạn."""
+        result = {}
+        if is_partitioned():
+            result["created_partitions"] = ensure_partitions(months_ahead)
+        if retain_months is not None:
+            result.update(apply_retention(retain_months))
+        click.echo(json.dumps(result, indent=2))
+
+    @app.cli.command("run-payroll")
+    @click.option("--year", type=int, required=True)
+    @click.option("--month", type=click.IntRange(1, 12), required=True)
+    @click.option("--standard-days", type=int, help="Số ngày công chuẩn của tháng.")
+    @click.option("--max-workers", type=int, help="Số request Vault đồng thời.")
+    def payroll(year, month, standard_days, max_workers):
+        """Tính lương thực nhận của một tháng và in thời gian từng giai đoạn."""
+        result = run_payroll(
+            year, month, standard_days=standard_days, max_workers=max_workers
+        )
+        click.echo(json.dumps(result, indent=2))
+
+    @app.cli.command("reconcile-attendance-summaries")
+    @click.option("--year", type=int)
+    @click.option("--month", type=click.IntRange(1, 12))
+    @click.option("--all", "all_months", is_flag=True, help="Đối chiếu mọi tháng.")
+    def reconcile_attendance_summaries(year, month, all_months):
+        """Đối chiếu tổng hợp chấm công (mặc định: tháng này và tháng trước)."""
+        if all_months:
+            months = attendance_months()
+        elif year and month:
+            months = [(year, month)]
+        else:
+            today = date.today()
+            months = [add_months(today.year, today.month, -1), (today.year, today.month)]
+        for year, month in months:
+            click.echo(json.dumps(reconcile_month(year, month)))
+
+    @app.cli.command("profile-token")
+    @click.option("--ttl", default=600, show_default=True, help="Thời hạn (giây).")
+    def profile_token(ttl):
+        """Tạo token để profile request qua header X-Profile-Token."""
+        secret = app.config["PROFILE_SECRET"]
+        if not secret:
+            raise click.ClickException("PROFILE_SECRET is not set")
+        click.echo(
+            json.dumps({"header": PROFILE_HEADER, "token": make_token(secret, ttl)})
+        )
@@ -51,12 +51,43 @@ def query_postgresql(username, password):
             connection.close()
 
 
+def query_employees(app):
+    """
+    Truy vấn danh sách nhân viên qua engine SQLAlchemy của ứng dụng.
+
+    Kết nối được lấy từ pool của engine (dùng thông tin đăng nhập động khi bật
+    DB_DYNAMIC_CREDENTIALS) thay vì mở một kết nối psycopg2 mới cho mỗi truy vấn.
+
+    Args:
+        app (Flask): Ứng dụng Flask đã được khởi tạo.
+    """
+    from sqlalchemy import text
+    from .models import db
+
+    try:
+        with app.app_context():
+            rows = db.session.execute(text("SELECT * FROM employees;")).fetchall()
+        print("Danh sách nhân viên:")
+        for row in rows:
+            print(row)
+    except Exception as error:
+        print(f"Error while querying PostgreSQL: {error}")
+
+
 def main():
     # Cấu hình PostgreSQL trong OpenBao nếu cần
     configure_postgresql()
     # Tạo role PostgreSQL trong OpenBao nếu cần
     create_postgresql_role()
 
+    from . import create_app
+
+    app = create_app()
+    if app.config["DB_DYNAMIC_CREDENTIALS"]:
+        # Engine dùng lease do CredentialLeaseManager quản lý
+        query_employees(app)
+        return
+
     # Lấy thông tin đăng nhập PostgreSQL từ OpenBao
     credentials = generate_postgresql_credentials()
     if credentials:
@@ -0,0 +1,252 @@
+import os
+import threading
+import time
+
+import psycopg2
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DisconnectionError
+
+from .vault_postgresql import generate_postgresql_lease, renew_lease, revoke_lease
+
+
+class CredentialLeaseManager:
+    """
+    Quản lý thông tin đăng nhập PostgreSQL động lấy từ database/creds/<role>.
+
+    Thông tin đăng nhập được tạo khi mở kết nối đầu tiên của tiến trình rồi
+    gia hạn trong luồng nền trước khi hết hạn. Khi không gia hạn được nữa (ví
+    dụ chạm max_ttl), một bộ mới được tạo, số thế hệ (generation) tăng lên và
+    lease cũ bị thu hồi sau một khoảng ân hạn để các kết nối đang dùng kịp trả
+    về pool. Ngoài kết nối đầu tiên, request không phải chờ tạo thông tin đăng
+    nhập: nó chỉ đọc bộ hiện tại trong bộ nhớ.
+
+    Args:
+        role (str): Tên role database trong OpenBao.
+        renew_fraction (float): Gia hạn khi đã dùng hết phần này của lease_duration.
+        revoke_grace (float): Thời gian ân hạn (giây) trước khi thu hồi lease cũ.
+        retry_interval (float): Thời gian chờ (giây) trước khi thử lại khi lỗi.
+    """
+
+    def __init__(
+        self, role="my-role", renew_fraction=2 / 3, revoke_grace=60, retry_interval=5
+    ):
+        self.role = role
+        self.renew_fraction = renew_fraction
+        self.revoke_grace = revoke_grace
+        self.retry_interval = retry_interval
+        self.generation = 0
+        self._lease = None
+        self._expires_at = 0
+        self._ttl = 0
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._stats = {"mints": 0, "renewals": 0, "revocations": 0, "failures": 0}
+
+    def start(self):
+        """
+        Tạo bộ thông tin đăng nhập đầu tiên và khởi động luồng gia hạn nền.
+
+        Được gọi lại an toàn nhiều lần. Luồng nền không tồn tại trong tiến trình
+        con sau khi fork (gunicorn --preload), nên mỗi tiến trình tạo lease và
+        luồng gia hạn riêng; lease của tiến trình cha không bị gia hạn hay thu
+        hồi từ tiến trình con.
+
+        Returns:
+            bool: True nếu đã có thông tin đăng nhập, ngược lại là False.
+        """
+        pid = os.getpid()
+        if self._pid == pid and self._lease is not None:
+            return True
+        with self._start_lock:
+            if self._pid != pid:
+                if self._pid is not None:
+                    self._lease = None
+                    self._stop = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run, name="db-credential-lease", daemon=True
+                )
+                self._pid = pid
+                if self._lease is None:
+                    self._mint()
+                self._thread.start()
+        return self._lease is not None
+
+    def stop(self):
+        """Dừng luồng gia hạn nền."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def current(self):
+        """
+        Trả về thông tin đăng nhập hiện tại.
+
+        Returns:
+            tuple: (username, password, generation), hoặc None nếu chưa có.
+        """
+        with self._lock:
+            if self._lease is None:
+                return None
+            return self._lease["username"], self._lease["password"], self.generation
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                generation=self.generation,
+                expires_in=max(0, round(self._expires_at - time.monotonic(), 1)),
+            )
+
+    def _mint(self):
+        lease = generate_postgresql_lease(self.role)
+        if lease is None or not lease.get("username"):
+            with self._lock:
+                self._stats["failures"] += 1
+            return False
+        with self._lock:
+            old_lease = self._lease
+            self._lease = lease
+            self._ttl = lease["lease_duration"]
+            self._expires_at = time.monotonic() + self._ttl
+            self.generation += 1
+            self._stats["mints"] += 1
+        if old_lease is not None and old_lease.get("lease_id"):
+            timer = threading.Timer(
+                self.revoke_grace, self._revoke, args=(old_lease["lease_id"],)
+            )
+            timer.daemon = True
+            timer.start()
+        return True
+
+    def _renew(self):
+        lease = self._lease
+        if not lease.get("renewable") or not lease.get("lease_id"):
+            return False
+        duration = renew_lease(lease["lease_id"], lease["lease_duration"])
+        # Vault trả về thời hạn ngắn hơn khi lease sắp chạm max_ttl; khi đó tạo
+        # bộ mới luôn thay vì tiếp tục gia hạn những khoảng ngắn dần.
+        minimum = lease["lease_duration"] * (1 - self.renew_fraction)
+        if not duration or duration <= minimum:
+            return False
+        with self._lock:
+            self._ttl = duration
+            self._expires_at = time.monotonic() + duration
+            self._stats["renewals"] += 1
+        return True
+
+    def _revoke(self, lease_id):
+        if revoke_lease(lease_id):
+            with self._lock:
+                self._stats["revocations"] += 1
+
+    def _seconds_until_refresh(self):
+        with self._lock:
+            if self._lease is None:
+                return 0
+            if not self._ttl:
+                # Lease không có thời hạn, không cần gia hạn
+                return None
+            remaining = self._expires_at - time.monotonic()
+            return max(0, remaining - self._ttl * (1 - self.renew_fraction))
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = self._seconds_until_refresh()
+            if wait is None:
+                self._stop.wait()
+                return
+            if wait and self._stop.wait(wait):
+                return
+            if self._lease is not None and self._renew():
+                continue
+            if not self._mint():
+                self._stop.wait(self.retry_interval)
+
+
+_manager = None
+
+
+def get_lease_manager():
+    """Trả về CredentialLeaseManager của tiến trình (None nếu chưa khởi tạo)."""
+    return _manager
+
+
+def init_dynamic_credentials(app):
+    """
+    Cấu hình engine SQLAlchemy dùng thông tin đăng nhập động từ OpenBao.
+
+    Phải được gọi trước db.init_app(app). Kết nối mới trong pool được tạo từ
+    lease hiện tại; kết nối thuộc thế hệ cũ bị loại khi được lấy ra khỏi pool,
+    còn các kết nối đang được dùng vẫn chạy tiếp cho tới khi trả về. Lease và
+    luồng gia hạn được tạo khi mở kết nối đầu tiên của mỗi tiến trình, không
+    phải trong create_app (tiến trình cha của gunicorn --preload).
+
+    Args:
+        app (Flask): Ứng dụng Flask.
+
+    Returns:
+        CredentialLeaseManager: Bộ quản lý lease.
+    """
+    global _manager
+    _manager = CredentialLeaseManager(
+        role=app.config["DB_CREDENTIALS_ROLE"],
+        renew_fraction=app.config["DB_LEASE_RENEW_FRACTION"],
+        revoke_grace=app.config["DB_LEASE_REVOKE_GRACE"],
+    )
+
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    # Giữ mọi tham số kết nối của URL (kể cả query như sslmode); chỉ user và
+    # password được thay bằng lease hiện tại
+    connect_args = url.translate_connect_args(username="user", database="dbname")
+    connect_args.update(url.query)
+    manager = _manager
+    generations = {}
+
+    def creator():
+        if not manager.start():
+            print("Failed to generate initial PostgreSQL credentials.")
+        credentials = manager.current()
+        if credentials is None:
+            raise psycopg2.OperationalError("No PostgreSQL credentials available.")
+        username, password, generation = credentials
+        connection = psycopg2.connect(
+            **dict(connect_args, user=username, password=password)
+        )
+        generations[id(connection)] = generation
+        return connection
+
+    options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    options["creator"] = creator
+    options.setdefault("pool_pre_ping", True)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+    def on_connect(dbapi_connection, connection_record):
+        connection_record.info["lease_generation"] = generations.pop(
+            id(dbapi_connection), manager.generation
+        )
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        if connection_record.info.get("lease_generation") != manager.generation:
+            # Pool sẽ bỏ kết nối này và mở kết nối mới bằng lease hiện tại
+            raise DisconnectionError("PostgreSQL credentials rotated.")
+
+    app.extensions["db_credential_events"] = (on_connect, on_checkout)
+    return _manager
+
+
+def attach_pool_events(app, engine):
+    """
+    Gắn các hook pool của init_dynamic_credentials() vào engine đã được tạo.
+
+    Args:
+        app (Flask): Ứng dụng Flask.
+        engine (Engine): Engine SQLAlchemy của ứng dụng.
+    """
+    on_connect, on_checkout = app.extensions["db_credential_events"]
+    event.listen(engine, "connect", on_connect)
+    event.listen(engine, "checkout", on_checkout)
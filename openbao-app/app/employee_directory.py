@@ -0,0 +1,119 @@
+import itertools
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from flask import current_app
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from .models import db, Employee
+
+
+class EmployeeDirectory:
+    """
+    Danh bạ (id, name) của nhân viên, lưu gọn trong bộ nhớ.
+
+    Id được lưu trong một array kiểu số nguyên, tên trong một tuple; danh bạ
+    được sắp xếp theo tên (không phân biệt hoa thường) để tìm kiếm theo tiền tố
+    bằng tìm kiếm nhị phân. Danh sách choices cho form được dựng sẵn một lần.
+    """
+
+    __slots__ = ("ids", "names", "_keys", "_id_set", "choices", "loaded_at")
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda row: (row[1].casefold(), row[0]))
+        self.ids = array("q", (row[0] for row in rows))
+        self.names = tuple(row[1] for row in rows)
+        self._keys = tuple(name.casefold() for name in self.names)
+        self.choices = tuple(zip(self.ids, self.names))
+        self._id_set = frozenset(self.ids)
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls):
+        """Đọc chỉ hai cột id và name của bảng employees."""
+        return cls(db.session.execute(select(Employee.id, Employee.name)).all())
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, employee_id):
+        return employee_id in self._id_set
+
+    def page(self, offset=0, limit=50):
+        """
+        Trả về một trang danh bạ theo thứ tự tên.
+
+        Returns:
+            list: Các cặp (id, name).
+        """
+        return list(self.choices[offset : offset + limit])
+
+    def search(self, prefix, limit=20):
+        """
+        Tìm nhân viên có tên bắt đầu bằng prefix (không phân biệt hoa thường).
+
+        Returns:
+            list: Tối đa limit cặp (id, name).
+        """
+        key = prefix.casefold()
+        start = bisect_left(self._keys, key)
+        results = []
+        for index in range(start, min(start + limit, len(self._keys))):
+            if not self._keys[index].startswith(key):
+                break
+            results.append(self.choices[index])
+        return results
+
+
+_directory = None
+_directory_lock = threading.Lock()
+
+
+def get_employee_directory():
+    """
+    Trả về danh bạ nhân viên dùng chung, nạp lại khi bị vô hiệu hóa hoặc quá hạn.
+
+    Thời hạn (EMPLOYEE_DIRECTORY_TTL) chỉ là lưới an toàn cho thay đổi từ tiến
+    trình khác; thay đổi trong tiến trình này vô hiệu hóa danh bạ ngay khi commit.
+    """
+    global _directory
+    ttl = current_app.config["EMPLOYEE_DIRECTORY_TTL"]
+    directory = _directory
+    if directory is None or time.monotonic() - directory.loaded_at > ttl:
+        with _directory_lock:
+            directory = _directory
+            if directory is None or time.monotonic() - directory.loaded_at > ttl:
+                directory = _directory = EmployeeDirectory.load()
+    return directory
+
+
+def invalidate_employee_directory():
+    """Bỏ danh bạ hiện tại để lần đọc tiếp theo nạp lại từ cơ sở dữ liệu."""
+    global _directory
+    _directory = None
+
+
+@event.listens_for(Session, "after_flush")
+def _track_employee_changes(session, flush_context):
+    # Chỉ thêm/xóa nhân viên hoặc đổi tên mới làm danh bạ thay đổi
+    for obj in itertools.chain(session.new, session.deleted, session.dirty):
+        if not isinstance(obj, Employee):
+            continue
+        if obj in session.dirty and not inspect(obj).attrs.name.history.has_changes():
+            continue
+        session.info["employee_directory_dirty"] = True
+        return
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("employee_directory_dirty", False):
+        invalidate_employee_directory()
+
+
+@event.listens_for(Session, "after_rollback")
+def _reset_on_rollback(session):
+    session.info.pop("employee_directory_dirty", None)
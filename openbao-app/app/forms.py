@@ -1,16 +1,26 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired
 from flask_wtf.form import _Auto
 from wtforms import (
     StringField,
+    IntegerField,
     PasswordField,
     SubmitField,
     DateField,
     SelectField,
     TextAreaField,
 )
-from wtforms.validators import DataRequired, Email, EqualTo, ValidationError
+from wtforms.validators import (
+    DataRequired,
+    Email,
+    EqualTo,
+    NumberRange,
+    Optional,
+    ValidationError,
+)
 from email_validator import validate_email, EmailNotValidError
-from app.models import Users, Employee
+from app.models import Users
+from app.employee_directory import get_employee_directory
 
 
 class RegistrationForm(FlaskForm):
@@ -102,6 +112,26 @@ class SalaryForm(FlaskForm):
     deduction = StringField("Deduction", validators=[DataRequired()])
     submit = SubmitField("Submit")
 
+    def validate_employee_id(self, employee_id):
+        try:
+            int(employee_id.data)
+        except ValueError:
+            raise ValidationError("Employee ID must be a number.")
+
+    def validate_month(self, month):
+        try:
+            value = int(month.data)
+        except ValueError:
+            raise ValidationError("Month must be a number.")
+        if not 1 <= value <= 12:
+            raise ValidationError("Month must be between 1 and 12.")
+
+    def validate_year(self, year):
+        try:
+            int(year.data)
+        except ValueError:
+            raise ValidationError("Year must be a number.")
+
     def validate_basic_salary(self, basic_salary):
         try:
             float(basic_salary.data)
@@ -122,7 +152,7 @@ class SalaryForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super(SalaryForm, self).__init__(*args, **kwargs)
-        self.employee_id.choices = [(e.id, e.name) for e in Employee.query.all()]
+        self.employee_id.choices = get_employee_directory().choices
 
 
 class AttendanceForm(FlaskForm):
@@ -134,7 +164,7 @@ class AttendanceForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super(AttendanceForm, self).__init__(*args, **kwargs)
-        self.employee_id.choices = [(e.id, e.name) for e in Employee.query.all()]
+        self.employee_id.choices = get_employee_directory().choices
 
     def validate_check_in_time(self, check_in_time):
         try:
@@ -152,3 +182,16 @@ class AttendanceForm(FlaskForm):
 class SearchForm(FlaskForm):
     search = StringField("Search", validators=[DataRequired()])
     submit = SubmitField("Search")
+
+
+class ImportEmployeesForm(FlaskForm):
+    file = FileField("File", validators=[FileRequired()])
+    format = SelectField(
+        "Format",
+        choices=[("", "Auto"), ("csv", "CSV"), ("jsonl", "JSONL")],
+        validators=[Optional()],
+    )
+    batch_size = IntegerField(
+        "Batch Size", default=500, validators=[Optional(), NumberRange(min=1)]
+    )
+    submit = SubmitField("Import")
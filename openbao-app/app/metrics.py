@@ -0,0 +1,238 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+
+from .models import db
+from .vault_client import CLOSED, HALF_OPEN, OPEN, get_breaker_stats
+from .vault_http import add_request_observer, get_pool_stats
+
+VAULT_REQUEST_SECONDS = Histogram(
+    "openbao_vault_request_duration_seconds",
+    "Thời gian các request HTTP tới OpenBao.",
+    ("mount", "operation", "method", "status"),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+SQL_STATEMENT_SECONDS = Histogram(
+    "openbao_sql_statement_duration_seconds",
+    "Thời gian thực thi các câu lệnh SQL.",
+    ("operation",),
+    buckets=(
+        0.0001,
+        0.00025,
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        1,
+    ),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "openbao_http_request_duration_seconds",
+    "Thời gian xử lý request theo endpoint Flask.",
+    ("endpoint", "method", "status"),
+)
+
+CIRCUIT_STATES = (CLOSED, HALF_OPEN, OPEN)
+
+SQL_OPERATIONS = frozenset(("select", "insert", "update", "delete", "with", "copy"))
+
+# Ứng dụng đang được theo dõi, dùng khi Prometheus scrape để đọc trạng thái pool
+_apps = {}
+_apps_lock = threading.Lock()
+
+
+def _observe_vault_request(method, url, status, seconds):
+    parts = urlsplit(url).path.split("/", 4)
+    # /v1/<mount>/<operation>/...
+    mount = parts[2] if len(parts) > 2 else ""
+    operation = parts[3] if len(parts) > 3 else ""
+    VAULT_REQUEST_SECONDS.labels(
+        mount, operation, method, str(status) if status else "error"
+    ).observe(seconds)
+
+
+def _sql_operation(statement):
+    operation = statement.lstrip()[:7].split(None, 1)
+    operation = operation[0].lower() if operation else ""
+    return operation if operation in SQL_OPERATIONS else "other"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["metrics_started"].pop()
+    SQL_STATEMENT_SECONDS.labels(_sql_operation(statement)).observe(
+        time.perf_counter() - started
+    )
+
+
+def _handle_error(context):
+    # Câu lệnh lỗi không đi qua after_cursor_execute
+    if context.connection is not None:
+        stack = context.connection.info.get("metrics_started")
+        if stack:
+            stack.pop()
+
+
+class _PoolCollector:
+    """Đọc trạng thái các pool (SQLAlchemy, HTTP tới OpenBao, cache) lúc scrape."""
+
+    def collect(self):
+        from .vault_cache import get_cache_stats
+
+        vault_pool = CounterMetricFamily(
+            "openbao_vault_pool_connections",
+            "Số lần lấy kết nối HTTP tới OpenBao theo kết quả (tái sử dụng/mới).",
+            labels=("result",),
+        )
+        pool = get_pool_stats()
+        vault_pool.add_metric(("hit",), pool["hits"])
+        vault_pool.add_metric(("miss",), pool["misses"])
+        yield vault_pool
+
+        breaker = get_breaker_stats()
+        state = GaugeMetricFamily(
+            "openbao_vault_circuit_state",
+            "Trạng thái circuit breaker của OpenBao (0 đóng, 1 thử lại, 2 mở).",
+        )
+        state.add_metric((), CIRCUIT_STATES.index(breaker["state"]))
+        yield state
+        transitions = CounterMetricFamily(
+            "openbao_vault_circuit_transitions",
+            "Số lần circuit breaker của OpenBao chuyển trạng thái.",
+            labels=("from_state", "to_state"),
+        )
+        for (from_state, to_state), count in breaker["transitions"].items():
+            transitions.add_metric((from_state, to_state), count)
+        yield transitions
+        yield CounterMetricFamily(
+            "openbao_vault_circuit_rejected",
+            "Số lời gọi tới OpenBao bị từ chối ngay vì circuit breaker đang mở.",
+            value=breaker["rejected"],
+        )
+        yield CounterMetricFamily(
+            "openbao_vault_retries",
+            "Số lần thử lại request tới OpenBao.",
+            value=breaker["retries"],
+        )
+
+        cache = get_cache_stats()
+        cache_requests = CounterMetricFamily(
+            "openbao_secret_cache_lookups",
+            "Số lần tra cache secret theo kết quả.",
+            labels=("result",),
+        )
+        cache_requests.add_metric(("hit",), cache["hits"])
+        cache_requests.add_metric(("miss",), cache["misses"])
+        yield cache_requests
+        coalescing = CounterMetricFamily(
+            "openbao_secret_reads",
+            "Số lần đọc secret tới Vault theo kết quả gộp (gửi request/chờ chung).",
+            labels=("result",),
+        )
+        coalescing.add_metric(("leader",), cache["coalesce_leaders"])
+        coalescing.add_metric(("coalesced",), cache["coalesced"])
+        yield coalescing
+        yield GaugeMetricFamily(
+            "openbao_secret_cache_entries",
+            "Số secret đang nằm trong cache.",
+            value=cache["entries"],
+        )
+
+        checked_out = GaugeMetricFamily(
+            "openbao_db_pool_checked_out",
+            "Số kết nối cơ sở dữ liệu đang được sử dụng.",
+            labels=("app",),
+        )
+        size = GaugeMetricFamily(
+            "openbao_db_pool_size",
+            "Kích thước pool kết nối cơ sở dữ liệu.",
+            labels=("app",),
+        )
+        overflow = GaugeMetricFamily(
+            "openbao_db_pool_overflow",
+            "Số kết nối đang mở vượt quá kích thước pool.",
+            labels=("app",),
+        )
+        ingest_pending = GaugeMetricFamily(
+            "openbao_attendance_ingest_pending",
+            "Số sự kiện chấm công đang chờ ghi.",
+            labels=("app",),
+        )
+        with _apps_lock:
+            apps = dict(_apps)
+        for name, (app, engine) in apps.items():
+            engine_pool = engine.pool
+            # Chỉ QueuePool (PostgreSQL) có các bộ đếm này
+            if hasattr(engine_pool, "checkedout"):
+                checked_out.add_metric((name,), engine_pool.checkedout())
+                size.add_metric((name,), engine_pool.size())
+                overflow.add_metric((name,), max(0, engine_pool.overflow()))
+            ingester = app.extensions.get("attendance_ingest")
+            if ingester is not None:
+                ingest_pending.add_metric((name,), ingester.stats()["pending"])
+        yield checked_out
+        yield size
+        yield overflow
+        yield ingest_pending
+
+
+REGISTRY.register(_PoolCollector())
+add_request_observer(_observe_vault_request)
+
+
+def metrics_view():
+    return Response(generate_latest(REGISTRY), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    """
+    Bật thu thập metrics cho ứng dụng và đăng ký endpoint /metrics.
+
+    Vault được đo tại vault_http (mọi request tới OpenBao đi qua đó), SQL qua
+    sự kiện cursor của engine và request Flask qua before/after_request, nên
+    không cần sửa từng helper.
+
+    Args:
+        app (Flask): Ứng dụng Flask.
+    """
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+    with _apps_lock:
+        _apps[app.name] = (app, engine)
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            HTTP_REQUEST_SECONDS.labels(
+                request.endpoint or "unmatched", request.method, response.status_code
+            ).observe(time.perf_counter() - started)
+        return response
+
+    app.add_url_rule("/metrics", "metrics", metrics_view)
@@ -1,17 +1,443 @@
-from werkzeug.security import generate_password_hash, check_password_hash
+import asyncio
+from datetime import date
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .vault_config import get_sensitive_storage_mode
 from .vault_integration import (
-    store_password_in_vault,
     retrieve_password_from_vault,
+    delete_password_from_vault,
     store_secret_in_vault,
-    retrieve_secret_from_vault,
+    store_secret_document,
+    store_secret_documents,
+    destroy_secret_documents,
+    patch_secret_document,
+    retrieve_secret_document,
+    retrieve_secret_refs,
+    make_secret_ref,
+    split_secret_ref,
+    resolve_secret_ref,
+)
+from .vault_transit import (
+    is_transit_ciphertext,
+    ciphertext_key_version,
+    transit_encrypt_batch,
+    transit_decrypt_batch,
+    transit_rewrap_batch,
+    get_transit_key_version,
+)
+from .vault_envelope import (
+    is_envelope_ciphertext,
+    envelope_encrypt_batch,
+    envelope_decrypt_batch,
+)
+from .passwords import (
+    hash_password,
+    hash_password_async,
+    verify_password,
+    verify_password_async,
+    needs_rehash,
+    compare_legacy_password,
+)
+from .vault_async import (
+    retrieve_password_from_vault_async,
+    store_secret_in_vault_async,
+    store_secret_document_async,
+    retrieve_secret_documents_async,
 )
 
 db = SQLAlchemy()
 
 
-class Employee(db.Model):
+def to_base36(number):
+    """Biểu diễn một số nguyên không âm dưới dạng base36 (chữ hoa)."""
+    digits = []
+    while number:
+        number, remainder = divmod(number, 36)
+        digits.append("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"[remainder])
+    return "".join(reversed(digits)) or "0"
+
+
+def month_range(year, month):
+    """Trả về (ngày đầu tháng, ngày đầu tháng kế tiếp)."""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def resolve_sensitive_values(values, max_workers=1, deadline=None, contexts=None):
+    """
+    Giải các giá trị cột *_key thành dữ liệu gốc.
+
+    Ciphertext transit được giải mã bằng một yêu cầu batch, ciphertext envelope
+    được giải mã cục bộ; các khóa tham chiếu KV được đọc theo document như
+    retrieve_secret_refs().
+
+    Args:
+        values (list): Giá trị các cột *_key, có thể chứa None.
+        max_workers (int): Số request KV đồng thời tối đa.
+        deadline (float): Thời hạn tổng khi đọc KV song song, tính bằng giây.
+        contexts (list): Ngữ cảnh của từng giá trị (xem
+            SensitiveDataMixin.sensitive_context), cần cho ciphertext envelope.
+
+    Returns:
+        list: Dữ liệu theo đúng thứ tự đầu vào.
+    """
+    kinds = [
+        "envelope"
+        if is_envelope_ciphertext(value)
+        else "transit"
+        if is_transit_ciphertext(value)
+        else "kv"
+        for value in values
+    ]
+    by_kind = {
+        kind: [value if k == kind else None for value, k in zip(values, kinds)]
+        for kind in ("envelope", "transit", "kv")
+    }
+    resolved = {
+        "envelope": envelope_decrypt_batch(by_kind["envelope"], contexts),
+        "transit": transit_decrypt_batch(by_kind["transit"]),
+        "kv": retrieve_secret_refs(
+            by_kind["kv"], max_workers=max_workers, deadline=deadline
+        ),
+    }
+    return [resolved[kind][index] for index, kind in enumerate(kinds)]
+
+
+def _is_column_ciphertext(value):
+    return is_transit_ciphertext(value) or is_envelope_ciphertext(value)
+
+
+class SensitiveDataMixin:
+    """
+    Lưu các trường nhạy cảm của bản ghi trong Vault.
+
+    Mỗi trường trong sensitive_fields có một cột "<field>_key". Ở chế độ
+    "packed", mọi trường của bản ghi nằm trong một document duy nhất tại
+    sensitive_document_path(); ở chế độ "per_field", mỗi trường là một secret
+    riêng tại "<sensitive_document_path()>/<field>". Ở hai chế độ này cột chứa
+    khóa tham chiếu. Ở chế độ "transit", cột chứa trực tiếp ciphertext do
+    transit engine tạo ra; ở chế độ "envelope", cột chứa ciphertext được mã hóa
+    cục bộ bằng data key của transit.
+    """
+
+    sensitive_fields = ()
+    # Cột mã nghiệp vụ (có trước khi bản ghi được insert) dùng trong ngữ cảnh mã hóa
+    sensitive_id_column = None
+
+    def sensitive_document_path(self):
+        raise NotImplementedError
+
+    @classmethod
+    def sensitive_context(cls, record, field):
+        """
+        Ngữ cảnh "<bảng>:<mã bản ghi>:<trường>" của một giá trị, dùng làm
+        associated data khi mã hóa envelope để ciphertext không dùng được ở ô
+        khác. record có thể là đối tượng ORM hoặc một dòng kết quả truy vấn.
+        """
+        record_id = getattr(record, cls.sensitive_id_column)
+        return f"{cls.__tablename__}:{record_id}:{field}"
+
+    def _store_sensitive_fields(self, values):
+        """Ghi các trường nhạy cảm và cập nhật các cột *_key."""
+        path = self.sensitive_document_path()
+        mode = get_sensitive_storage_mode()
+        if mode in ("transit", "envelope"):
+            fields = list(values)
+            plaintexts = [values[field] for field in fields]
+            if mode == "transit":
+                ciphertexts = transit_encrypt_batch(plaintexts)
+            else:
+                contexts = [self.sensitive_context(self, field) for field in fields]
+                ciphertexts = envelope_encrypt_batch(plaintexts, contexts)
+            for field, ciphertext in zip(fields, ciphertexts):
+                setattr(self, f"{field}_key", ciphertext)
+        elif mode == "packed":
+            version = store_secret_document(path, values)
+            self._sensitive_version = version
+            for field in values:
+                setattr(
+                    self,
+                    f"{field}_key",
+                    make_secret_ref(path, field) if version is not None else None,
+                )
+        else:
+            for field, value in values.items():
+                setattr(
+                    self,
+                    f"{field}_key",
+                    store_secret_in_vault(f"{path}/{field}", value),
+                )
+
+    async def _store_sensitive_fields_async(self, values):
+        """Bản async của _store_sensitive_fields; các secret riêng lẻ được ghi đồng thời."""
+        path = self.sensitive_document_path()
+        mode = get_sensitive_storage_mode()
+        if mode in ("transit", "envelope"):
+            await asyncio.to_thread(self._store_sensitive_fields, values)
+        elif mode == "packed":
+            version = await store_secret_document_async(path, values)
+            self._sensitive_version = version
+            for field in values:
+                setattr(
+                    self,
+                    f"{field}_key",
+                    make_secret_ref(path, field) if version is not None else None,
+                )
+        else:
+            fields = list(values)
+            secret_refs = await asyncio.gather(
+                *(
+                    store_secret_in_vault_async(f"{path}/{field}", values[field])
+                    for field in fields
+                )
+            )
+            for field, secret_ref in zip(fields, secret_refs):
+                setattr(self, f"{field}_key", secret_ref)
+
+    async def _load_sensitive_fields_async(self, fields=None):
+        """Bản async của _load_sensitive_fields; các document được đọc đồng thời."""
+        fields = fields or self.sensitive_fields
+        secret_refs = [getattr(self, f"{field}_key") for field in fields]
+        if any(_is_column_ciphertext(secret_ref) for secret_ref in secret_refs):
+            return await asyncio.to_thread(self._load_sensitive_fields, fields)
+        documents = await retrieve_secret_documents_async(
+            split_secret_ref(secret_ref)[0] for secret_ref in secret_refs if secret_ref
+        )
+        return tuple(
+            resolve_secret_ref(secret_ref, documents) for secret_ref in secret_refs
+        )
+
+    def _load_sensitive_fields(self, fields=None):
+        """Đọc các trường nhạy cảm; các trường cùng document chỉ tốn một GET."""
+        fields = fields or self.sensitive_fields
+        secret_refs = [getattr(self, f"{field}_key") for field in fields]
+        document_path = self._packed_document_path(secret_refs)
+        if document_path is None:
+            contexts = [self.sensitive_context(self, field) for field in fields]
+            return tuple(resolve_sensitive_values(secret_refs, contexts=contexts))
+        data, version = retrieve_secret_document(document_path)
+        self._sensitive_version = version
+        data = data or {}
+        return tuple(
+            data.get(split_secret_ref(secret_ref)[1]) for secret_ref in secret_refs
+        )
+
+    def _packed_document_path(self, secret_refs):
+        """Trả về đường dẫn document nếu mọi khóa đều trỏ vào cùng một document."""
+        paths = set()
+        for secret_ref in secret_refs:
+            if not secret_ref or _is_column_ciphertext(secret_ref):
+                return None
+            path, field = split_secret_ref(secret_ref)
+            if field is None:
+                return None
+            paths.add(path)
+        return paths.pop() if len(paths) == 1 else None
+
+    @classmethod
+    def load_sensitive_batch(cls, records, fields=None, max_workers=None, deadline=None):
+        """
+        Đọc các trường nhạy cảm của nhiều bản ghi bằng một nhóm request song song.
+
+        Các document trùng nhau chỉ được đọc một lần. Số request đồng thời và
+        thời hạn tổng được giới hạn cho từng lần gọi để một node Vault chậm
+        không làm treo cả trang.
+
+        Args:
+            records (list): Các bản ghi cùng loại (Employee hoặc Salary).
+            fields (list): Các trường cần đọc; mặc định là tất cả.
+            max_workers (int): Số request đồng thời tối đa.
+            deadline (float): Thời hạn tổng tính bằng giây.
+
+        Returns:
+            list: Mỗi phần tử là dict trường -> giá trị, theo đúng thứ tự records.
+        """
+        fields = tuple(fields or cls.sensitive_fields)
+        secret_refs = [
+            getattr(record, f"{field}_key") for record in records for field in fields
+        ]
+        contexts = [
+            cls.sensitive_context(record, field)
+            for record in records
+            for field in fields
+        ]
+        values = resolve_sensitive_values(
+            secret_refs, max_workers=max_workers, deadline=deadline, contexts=contexts
+        )
+        width = len(fields)
+        return [
+            dict(zip(fields, values[index * width : (index + 1) * width]))
+            for index in range(len(records))
+        ]
+
+    @classmethod
+    def store_sensitive_batch(cls, records, values_list, max_workers=None):
+        """
+        Ghi các trường nhạy cảm của nhiều bản ghi cùng lúc.
+
+        Ở chế độ "transit", toàn bộ giá trị được mã hóa bằng một yêu cầu batch;
+        ở chế độ "envelope", giá trị được mã hóa cục bộ; ở các chế độ KV, các
+        document được ghi song song.
+
+        Args:
+            records (list): Các bản ghi cùng loại.
+            values_list (list): dict trường -> giá trị cho từng bản ghi.
+            max_workers (int): Số request KV đồng thời tối đa.
+        """
+        mode = get_sensitive_storage_mode()
+        if mode in ("transit", "envelope"):
+            targets = [
+                (record, field, value)
+                for record, values in zip(records, values_list)
+                for field, value in values.items()
+            ]
+            plaintexts = [value for _, _, value in targets]
+            if mode == "transit":
+                ciphertexts = transit_encrypt_batch(plaintexts)
+            else:
+                contexts = [
+                    cls.sensitive_context(record, field) for record, field, _ in targets
+                ]
+                ciphertexts = envelope_encrypt_batch(plaintexts, contexts)
+            for (record, field, _), ciphertext in zip(targets, ciphertexts):
+                setattr(record, f"{field}_key", ciphertext)
+            return
+
+        documents = {}
+        targets = []
+        for record, values in zip(records, values_list):
+            path = record.sensitive_document_path()
+            if mode == "packed":
+                documents[path] = values
+                targets.extend((record, field, path, field) for field in values)
+            else:
+                for field, value in values.items():
+                    documents[f"{path}/{field}"] = {"value": value}
+                    targets.append((record, field, f"{path}/{field}", None))
+        versions = store_secret_documents(documents, max_workers=max_workers)
+        for record, field, path, ref_field in targets:
+            if versions.get(path) is None:
+                secret_ref = None
+            elif ref_field is None:
+                secret_ref = path
+            else:
+                secret_ref = make_secret_ref(path, ref_field)
+            setattr(record, f"{field}_key", secret_ref)
+
+    @classmethod
+    def discard_sensitive_batch(cls, records, max_workers=None):
+        """
+        Xóa vĩnh viễn các document Vault mà store_sensitive_batch() đã ghi cho
+        các bản ghi cuối cùng không được lưu vào DB.
+
+        Ciphertext transit/envelope chỉ nằm trong cột nên không cần xóa.
+
+        Args:
+            records (list): Các bản ghi cùng loại.
+            max_workers (int): Số request KV đồng thời tối đa.
+        """
+        paths = set()
+        for record in records:
+            for field in cls.sensitive_fields:
+                secret_ref = getattr(record, f"{field}_key")
+                if secret_ref and not _is_column_ciphertext(secret_ref):
+                    paths.add(split_secret_ref(secret_ref)[0])
+        results = destroy_secret_documents(paths, max_workers=max_workers)
+        for path, destroyed in results.items():
+            if not destroyed:
+                print(f"Failed to delete orphaned secret {path} from Vault.")
+
+    @classmethod
+    def rewrap_sensitive_columns(cls, batch_size=500):
+        """
+        Mã hóa lại các ciphertext transit đang dùng phiên bản khóa cũ.
+
+        Chỉ các giá trị có phiên bản khóa nhỏ hơn latest_version được gửi đi;
+        mỗi trang bản ghi tốn một yêu cầu rewrap và một lần commit.
+
+        Returns:
+            dict: Phiên bản khóa mới nhất và số giá trị đã được mã hóa lại,
+            hoặc None nếu không đọc được thông tin khóa.
+        """
+        latest_version = get_transit_key_version()
+        if latest_version is None:
+            return None
+        columns = [f"{field}_key" for field in cls.sensitive_fields]
+        last_id = 0
+        rewrapped = 0
+        while True:
+            records = (
+                cls.query.filter(cls.id > last_id)
+                .order_by(cls.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not records:
+                break
+            last_id = records[-1].id
+            targets = [
+                (record, column)
+                for record in records
+                for column in columns
+                if is_transit_ciphertext(getattr(record, column))
+                and ciphertext_key_version(getattr(record, column)) < latest_version
+            ]
+            if targets:
+                ciphertexts = transit_rewrap_batch(
+                    [getattr(record, column) for record, column in targets]
+                )
+                for (record, column), ciphertext in zip(targets, ciphertexts):
+                    if ciphertext:
+                        setattr(record, column, ciphertext)
+                        rewrapped += 1
+                db.session.commit()
+            db.session.expunge_all()
+        return {"latest_version": latest_version, "rewrapped": rewrapped}
+
+    def update_sensitive_data(self, **values):
+        """
+        Cập nhật một phần các trường nhạy cảm.
+
+        Với bản ghi dạng document, chỉ các trường thay đổi được gửi đi bằng
+        KV v2 patch, kèm check-and-set nếu đã biết phiên bản hiện tại. Bản ghi
+        kiểu cũ được chuyển sang dạng document khi ở chế độ "packed". Ở chế độ
+        "transit" và "envelope", chỉ các trường thay đổi được mã hóa lại.
+
+        Returns:
+            bool: True nếu cập nhật thành công, ngược lại là False.
+        """
+        unknown = set(values) - set(self.sensitive_fields)
+        if unknown:
+            raise ValueError(f"Unknown sensitive fields: {sorted(unknown)}")
+        if get_sensitive_storage_mode() != "packed":
+            self._store_sensitive_fields(values)
+            return all(getattr(self, f"{field}_key") for field in values)
+
+        path = self.sensitive_document_path()
+        secret_refs = [getattr(self, f"{field}_key") for field in self.sensitive_fields]
+        if self._packed_document_path(secret_refs) != path:
+            # Bản ghi kiểu cũ: đọc lại giá trị hiện có và ghi thành một document
+            current = dict(zip(self.sensitive_fields, retrieve_secret_refs(secret_refs)))
+            current.update(values)
+            self._store_sensitive_fields(current)
+            return getattr(self, "_sensitive_version", None) is not None
+
+        version = patch_secret_document(
+            path, values, cas=getattr(self, "_sensitive_version", None)
+        )
+        if version is None:
+            return False
+        self._sensitive_version = version
+        return True
+
+
+class Employee(SensitiveDataMixin, db.Model):
     __tablename__ = "employees"
+    sensitive_fields = ("phone_number", "email", "position", "department")
+    sensitive_id_column = "employee_id"
 
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.String(10), unique=True, nullable=False)
@@ -19,35 +445,46 @@ class Employee(db.Model):
     gender = db.Column(db.String(10))
     date_of_birth = db.Column(db.Date)
     address = db.Column(db.String(200))
-    phone_number_key = db.Column(db.String(50))  # Chứa khóa tham chiếu đến Vault
-    email_key = db.Column(db.String(50))  # Chứa khóa tham chiếu đến Vault
-    position_key = db.Column(db.String(50))  # Chứa khóa tham chiếu đến Vault
-    department_key = db.Column(db.String(50))  #
+    phone_number_key = db.Column(db.Text)  # Chứa khóa tham chiếu hoặc ciphertext Vault
+    email_key = db.Column(db.Text)  # Chứa khóa tham chiếu hoặc ciphertext Vault
+    position_key = db.Column(db.Text)  # Chứa khóa tham chiếu hoặc ciphertext Vault
+    department_key = db.Column(db.Text)  # Chứa khóa tham chiếu hoặc ciphertext Vault
     status = db.Column(db.String(20))
 
+    def sensitive_document_path(self):
+        return f"employee/{self.employee_id}"
+
     def set_sensitive_data(self, phone_number, email, position, department):
         """Lưu trữ dữ liệu nhạy cảm trong Vault."""
-        self.phone_number_key = store_secret_in_vault(
-            f"employee/{self.employee_id}/phone_number", phone_number
-        )
-        self.email_key = store_secret_in_vault(
-            f"employee/{self.employee_id}/email", email
-        )
-        self.position_key = store_secret_in_vault(
-            f"employee/{self.employee_id}/position", position
-        )
-        self.department_key = store_secret_in_vault(
-            f"employee/{self.employee_id}/department", department
+        self._store_sensitive_fields(
+            {
+                "phone_number": phone_number,
+                "email": email,
+                "position": position,
+                "department": department,
+            }
         )
 
     def get_sensitive_data(self):
         """Lấy dữ liệu nhạy cảm từ Vault."""
-        phone_number = retrieve_secret_from_vault(self.phone_number_key)
-        email = retrieve_secret_from_vault(self.email_key)
-        position = retrieve_secret_from_vault(self.position_key)
-        department = retrieve_secret_from_vault(self.department_key)
+        phone_number, email, position, department = self._load_sensitive_fields()
         return phone_number, email, position, department
 
+    async def set_sensitive_data_async(self, phone_number, email, position, department):
+        """Bản async của set_sensitive_data."""
+        await self._store_sensitive_fields_async(
+            {
+                "phone_number": phone_number,
+                "email": email,
+                "position": position,
+                "department": department,
+            }
+        )
+
+    async def get_sensitive_data_async(self):
+        """Bản async của get_sensitive_data."""
+        return await self._load_sensitive_fields_async()
+
     def __repr__(self):
         return f"<Employee {self.name}>"
 
@@ -80,47 +517,154 @@ class Position(db.Model):
 
 class Attendance(db.Model):
     __tablename__ = "attendances"
+    # Trên PostgreSQL bảng được chia partition theo tháng của cột date (xem
+    # migration b7e3c9d1f2a4 và app/attendance_partitions.py), nên mọi truy vấn
+    # nên lọc theo khoảng date để chỉ quét các partition liên quan.
+    __table_args__ = (
+        db.UniqueConstraint("attendance_id", "date"),
+        db.Index("uq_attendances_employee_id_date", "employee_id", "date", unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    attendance_id = db.Column(db.String(10), unique=True, nullable=False)
+    attendance_id = db.Column(db.String(10), nullable=False)
     employee_id = db.Column(db.Integer, db.ForeignKey("employees.id"))
-    date = db.Column(db.Date)
+    date = db.Column(db.Date, nullable=False)
     check_in_time = db.Column(db.Time)
     check_out_time = db.Column(db.Time)
 
+    @classmethod
+    def for_employee_month(cls, employee_id, year, month):
+        """
+        Lấy các bản ghi chấm công của một nhân viên trong một tháng.
+
+        Điều kiện được viết dưới dạng khoảng date (không dùng extract()) để
+        PostgreSQL loại bỏ các partition khác và dùng chỉ mục (employee_id, date).
+
+        Returns:
+            list: Các bản ghi Attendance theo thứ tự ngày.
+        """
+        start, end = month_range(year, month)
+        return (
+            cls.query.filter(
+                cls.employee_id == employee_id, cls.date >= start, cls.date < end
+            )
+            .order_by(cls.date)
+            .all()
+        )
+
     def __repr__(self):
         return f"<Attendance {self.attendance_id}>"
 
 
-class Salary(db.Model):
+class AttendanceSummary(db.Model):
+    """
+    Tổng hợp chấm công theo nhân viên và tháng, được cập nhật mỗi khi bảng
+    attendances thay đổi (xem app/attendance_summary.py).
+    """
+
+    __tablename__ = "attendance_summaries"
+
+    employee_id = db.Column(
+        db.Integer, db.ForeignKey("employees.id"), primary_key=True
+    )
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    days_present = db.Column(db.Integer, nullable=False, default=0)
+    total_minutes = db.Column(db.Integer, nullable=False, default=0)
+    late_arrivals = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime)
+
+    @property
+    def total_hours(self):
+        return round(self.total_minutes / 60, 2)
+
+    def to_dict(self):
+        return {
+            "employee_id": self.employee_id,
+            "year": self.year,
+            "month": self.month,
+            "days_present": self.days_present,
+            "total_hours": self.total_hours,
+            "late_arrivals": self.late_arrivals,
+        }
+
+    def __repr__(self):
+        return f"<AttendanceSummary {self.employee_id} {self.year}-{self.month:02d}>"
+
+
+class Salary(SensitiveDataMixin, db.Model):
     __tablename__ = "salaries"
+    __table_args__ = (db.UniqueConstraint("employee_id", "year", "month"),)
+    sensitive_fields = (
+        "basic_salary",
+        "salary_coefficient",
+        "bonus",
+        "deduction",
+        "total_salary",
+    )
+    sensitive_id_column = "salary_id"
 
     id = db.Column(db.Integer, primary_key=True)
     salary_id = db.Column(db.String(10), unique=True, nullable=False)
     employee_id = db.Column(db.Integer, db.ForeignKey("employees.id"))
-    basic_salary_key = db.Column(db.String(50))  # Chứa khóa tham chiếu đến Vault
-    salary_coefficient_key = db.Column(db.String(50))  # Chứa khóa tham chiếu đến Vault
-    total_salary_key = db.Column(db.String(50))  # Chứa khóa tham chiếu đến Vault
-
-    def set_salary_data(self, basic_salary, salary_coefficient, total_salary):
+    month = db.Column(db.Integer)
+    year = db.Column(db.Integer)
+    worked_days = db.Column(db.Integer)  # Số ngày công dùng cho lần tính lương gần nhất
+    basic_salary_key = db.Column(db.Text)  # Chứa khóa tham chiếu hoặc ciphertext Vault
+    salary_coefficient_key = db.Column(db.Text)  # Chứa khóa tham chiếu hoặc ciphertext Vault
+    bonus_key = db.Column(db.Text)  # Chứa khóa tham chiếu hoặc ciphertext Vault
+    deduction_key = db.Column(db.Text)  # Chứa khóa tham chiếu hoặc ciphertext Vault
+    total_salary_key = db.Column(db.Text)  # Chứa khóa tham chiếu hoặc ciphertext Vault
+
+    @staticmethod
+    def make_salary_id(employee_id, year, month):
+        """Sinh salary_id xác định (base36) cho một nhân viên trong một tháng."""
+        return to_base36((employee_id * 10000 + year) * 100 + month)
+
+    def sensitive_document_path(self):
+        return f"salary/{self.salary_id}"
+
+    def set_salary_data(
+        self, basic_salary, salary_coefficient, total_salary, bonus=None, deduction=None
+    ):
         """Lưu trữ dữ liệu lương trong Vault."""
-        self.basic_salary_key = store_secret_in_vault(
-            f"salary/{self.salary_id}/basic_salary", basic_salary
-        )
-        self.salary_coefficient_key = store_secret_in_vault(
-            f"salary/{self.salary_id}/salary_coefficient", salary_coefficient
-        )
-        self.total_salary_key = store_secret_in_vault(
-            f"salary/{self.salary_id}/total_salary", total_salary
+        self._store_sensitive_fields(
+            {
+                "basic_salary": basic_salary,
+                "salary_coefficient": salary_coefficient,
+                "bonus": bonus,
+                "deduction": deduction,
+                "total_salary": total_salary,
+            }
         )
 
     def get_salary_data(self):
         """Lấy dữ liệu lương từ Vault."""
-        basic_salary = retrieve_secret_from_vault(self.basic_salary_key)
-        salary_coefficient = retrieve_secret_from_vault(self.salary_coefficient_key)
-        total_salary = retrieve_secret_from_vault(self.total_salary_key)
+        basic_salary, salary_coefficient, total_salary = self._load_sensitive_fields(
+            ("basic_salary", "salary_coefficient", "total_salary")
+        )
         return basic_salary, salary_coefficient, total_salary
 
+    async def set_salary_data_async(
+        self, basic_salary, salary_coefficient, total_salary, bonus=None, deduction=None
+    ):
+        """Bản async của set_salary_data."""
+        await self._store_sensitive_fields_async(
+            {
+                "basic_salary": basic_salary,
+                "salary_coefficient": salary_coefficient,
+                "bonus": bonus,
+                "deduction": deduction,
+                "total_salary": total_salary,
+            }
+        )
+
+    async def get_salary_data_async(self):
+        """Bản async của get_salary_data."""
+        return await self._load_sensitive_fields_async(
+            ("basic_salary", "salary_coefficient", "total_salary")
+        )
+
     def __repr__(self):
         return f"<Salary {self.salary_id}>"
 
@@ -143,19 +687,80 @@ class Users(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), index=True, unique=True)
     email = db.Column(db.String(120), index=True, unique=True)
+    password_hash = db.Column(db.String(256))
 
     def set_password(self, password):
-        # Lưu mật khẩu vào OpenBao thay vì lưu trong cơ sở dữ liệu
-        success = store_password_in_vault(self.username, password)
-        if not success:
-            raise Exception("Failed to store password in Vault.")
+        # Chỉ lưu chuỗi băm có salt (kèm pepper từ OpenBao nếu có) trong cơ sở
+        # dữ liệu; việc kiểm tra mật khẩu không cần gọi tới Vault
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        # Truy xuất mật khẩu từ OpenBao và so sánh với mật khẩu nhập vào
+        # Người dùng đã có chuỗi băm: kiểm tra cục bộ, băm lại nếu độ khó đã đổi
+        if self.password_hash:
+            if not verify_password(self.password_hash, password):
+                return False
+            if needs_rehash(self.password_hash):
+                self.set_password(password)
+            return True
+
+        # Người dùng cũ: so sánh với mật khẩu trong OpenBao rồi chuyển sang
+        # chuỗi băm (người gọi cần commit phiên làm việc; mật khẩu trong
+        # OpenBao bị xóa sau khi commit thành công)
         stored_password = retrieve_password_from_vault(self.username)
         if stored_password is None:
             raise Exception("Failed to retrieve password from Vault.")
-        return stored_password == password
+        if not compare_legacy_password(stored_password, password):
+            return False
+        self.set_password(password)
+        self._legacy_password_migrated = True
+        return True
+
+    async def set_password_async(self, password):
+        """Bản async của set_password."""
+        self.password_hash = await hash_password_async(password)
+
+    async def check_password_async(self, password):
+        """Bản async của check_password."""
+        if self.password_hash:
+            if not await verify_password_async(self.password_hash, password):
+                return False
+            if needs_rehash(self.password_hash):
+                await self.set_password_async(password)
+            return True
+
+        stored_password = await retrieve_password_from_vault_async(self.username)
+        if stored_password is None:
+            raise Exception("Failed to retrieve password from Vault.")
+        if not compare_legacy_password(stored_password, password):
+            return False
+        await self.set_password_async(password)
+        self._legacy_password_migrated = True
+        return True
 
     def __repr__(self):
         return f"<User {self.username}>"
+
+
+@event.listens_for(Session, "after_flush")
+def _track_migrated_passwords(session, flush_context):
+    # Ghi nhận người dùng vừa chuyển từ mật khẩu trong OpenBao sang chuỗi băm
+    usernames = session.info.setdefault("migrated_password_users", set())
+    for obj in session.dirty:
+        if isinstance(obj, Users) and obj.__dict__.pop(
+            "_legacy_password_migrated", False
+        ):
+            usernames.add(obj.username)
+
+
+@event.listens_for(Session, "after_commit")
+def _delete_migrated_passwords(session):
+    # Chỉ xóa mật khẩu dạng rõ sau khi chuỗi băm đã được commit, để lỗi khi
+    # commit không khóa người dùng khỏi tài khoản
+    for username in session.info.pop("migrated_password_users", ()):
+        if not delete_password_from_vault(username):
+            print(f"Failed to delete migrated password of {username} from Vault.")
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_migrated_passwords(session):
+    session.info.pop("migrated_password_users", None)
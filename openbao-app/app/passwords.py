@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import hmac
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+from . import vault_client
+from .vault_config import get_password_settings
+
+# Việc băm/kiểm tra mật khẩu tốn CPU theo chủ ý nên được chạy trong một pool
+# luồng có giới hạn: số lần băm đồng thời không vượt quá số luồng đã chọn dù có
+# bao nhiêu request đăng nhập cùng lúc.
+_executor = None
+_executor_lock = threading.Lock()
+
+_pepper = None
+_pepper_loaded = False
+_pepper_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_password_settings()["workers"],
+                    thread_name_prefix="password-hash",
+                )
+    return _executor
+
+
+def get_pepper():
+    """
+    Trả về pepper dùng khi băm mật khẩu, đọc từ OpenBao một lần rồi giữ trong bộ nhớ.
+
+    Returns:
+        bytes: Pepper, hoặc None nếu không cấu hình PASSWORD_PEPPER_PATH.
+    """
+    global _pepper, _pepper_loaded
+    if _pepper_loaded:
+        return _pepper
+    with _pepper_lock:
+        if _pepper_loaded:
+            return _pepper
+        pepper_path = get_password_settings()["pepper_path"]
+        if pepper_path:
+            # Không qua cache: pepper chỉ được đọc một lần và giữ trong bộ nhớ
+            data, _ = vault_client.read_kv(pepper_path, cacheable=False)
+            if not data or "pepper" not in data:
+                raise Exception(
+                    f"Failed to retrieve password pepper from Vault: {pepper_path}"
+                )
+            _pepper = data["pepper"].encode("utf-8")
+        _pepper_loaded = True
+        return _pepper
+
+
+def _peppered(password):
+    pepper = get_pepper()
+    if pepper is None:
+        return password
+    return hmac.new(pepper, password.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _current_method_prefix():
+    # werkzeug ghi phương thức kèm tham số đầy đủ vào đầu chuỗi băm
+    # ("scrypt:32768:8:1$..."). Tiền tố được suy ra từ cấu hình theo cùng quy
+    # tắc điền mặc định của werkzeug thay vì băm mẫu, vì needs_rehash() còn
+    # được gọi trên event loop (check_password_async)
+    method, *args = get_password_settings()["method"].split(":")
+    if method == "scrypt":
+        n, r, p = map(int, args) if args else (2**15, 8, 1)
+        return f"scrypt:{n}:{r}:{p}"
+    if method == "pbkdf2" and len(args) <= 2:
+        hash_name = args[0] if args else "sha256"
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    raise ValueError(f"Invalid hash method '{method}'.")
+
+
+def _hash(password):
+    return generate_password_hash(
+        _peppered(password), method=get_password_settings()["method"]
+    )
+
+
+def _verify(password_hash, password):
+    return check_password_hash(password_hash, _peppered(password))
+
+
+def hash_password(password):
+    """
+    Băm mật khẩu bằng phương thức và độ khó đã cấu hình.
+
+    Args:
+        password (str): Mật khẩu dạng plaintext.
+
+    Returns:
+        str: Chuỗi băm có salt theo định dạng của werkzeug.
+    """
+    return _get_executor().submit(_hash, password).result()
+
+
+def verify_password(password_hash, password):
+    """
+    Kiểm tra mật khẩu với chuỗi băm đã lưu, hoàn toàn cục bộ.
+
+    Args:
+        password_hash (str): Chuỗi băm đã lưu.
+        password (str): Mật khẩu người dùng nhập vào.
+
+    Returns:
+        bool: True nếu mật khẩu khớp, ngược lại là False.
+    """
+    return _get_executor().submit(_verify, password_hash, password).result()
+
+
+async def hash_password_async(password):
+    """Bản async của hash_password."""
+    return await asyncio.wrap_future(_get_executor().submit(_hash, password))
+
+
+async def verify_password_async(password_hash, password):
+    """Bản async của verify_password."""
+    return await asyncio.wrap_future(
+        _get_executor().submit(_verify, password_hash, password)
+    )
+
+
+def needs_rehash(password_hash):
+    """
+    Kiểm tra chuỗi băm có được tạo bằng phương thức/độ khó khác cấu hình hiện tại.
+    """
+    return password_hash.split("$", 1)[0] != _current_method_prefix()
+
+
+def compare_legacy_password(stored_password, password):
+    """So sánh mật khẩu plaintext cũ trong Vault với thời gian không đổi."""
+    return hmac.compare_digest(
+        stored_password.encode("utf-8"), password.encode("utf-8")
+    )
@@ -0,0 +1,188 @@
+import time
+
+import numpy as np
+from .models import db, Employee, Position, Salary, month_range
+from .attendance_summary import get_month_summaries
+from .vault_config import get_sensitive_storage_mode
+
+# Các trường đầu vào được đọc từ Vault cho mỗi bảng lương
+INPUT_FIELDS = ("basic_salary", "salary_coefficient", "bonus", "deduction")
+
+
+def standard_working_days(year, month):
+    """Số ngày làm việc tiêu chuẩn (thứ Hai - thứ Sáu) trong tháng."""
+    start, end = month_range(year, month)
+    return int(np.busday_count(start, end))
+
+
+def _to_float_array(values):
+    """Chuyển các giá trị (chuỗi, số hoặc None) thành mảng float; lỗi -> NaN."""
+    array = np.full(len(values), np.nan)
+    for index, value in enumerate(values):
+        if value is None or value == "":
+            continue
+        try:
+            array[index] = float(value)
+        except (TypeError, ValueError):
+            pass
+    return array
+
+
+def compute_totals(basic, coefficient, bonus, deduction, worked_days, standard_days):
+    """
+    Tính lương thực nhận cho cả mảng nhân viên cùng lúc.
+
+    total = basic * coefficient * min(worked_days, standard_days) / standard_days
+            + bonus - deduction
+
+    Bất kỳ đầu vào nào thiếu (NaN) cũng cho kết quả NaN: bảng lương đó bị bỏ
+    qua thay vì được tính với bonus/deduction bằng 0.
+
+    Returns:
+        numpy.ndarray: Lương thực nhận, làm tròn 2 chữ số thập phân.
+    """
+    ratio = np.minimum(worked_days, standard_days) / standard_days
+    totals = basic * coefficient * ratio
+    totals += bonus - deduction
+    return np.round(totals, 2)
+
+
+def run_payroll(year, month, employee_ids=None, standard_days=None, max_workers=None):
+    """
+    Tính lương của một tháng cho mọi bảng lương (hoặc các nhân viên được chọn).
+
+    Các giai đoạn:
+      - load: đọc bảng lương, hệ số chức vụ và số ngày công (bảng tổng hợp)
+      - decrypt: đọc dữ liệu lương (và chức vụ khi thiếu hệ số) từ Vault theo lô
+      - compute: tính toán vector hóa bằng NumPy
+      - persist: ghi total_salary theo lô và commit một lần
+
+    Args:
+        year (int): Năm.
+        month (int): Tháng.
+        employee_ids (list): Chỉ tính cho các nhân viên này (mặc định: tất cả).
+        standard_days (int): Số ngày công chuẩn, mặc định là số ngày thường
+            trong tháng.
+        max_workers (int): Số request Vault đồng thời tối đa.
+
+    Returns:
+        dict: Số bảng lương đã tính, bị bỏ qua (kèm salary_id và số bảng lương
+        thiếu mỗi trường đầu vào) và thời gian (ms) của từng giai đoạn.
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    def mark(stage):
+        nonlocal started
+        now = time.perf_counter()
+        timings[stage] = round((now - started) * 1000, 3)
+        started = now
+
+    # load
+    query = Salary.query.filter_by(year=year, month=month)
+    if employee_ids is not None:
+        query = query.filter(Salary.employee_id.in_(employee_ids))
+    salaries = query.order_by(Salary.id).all()
+    # Số ngày công lấy từ bảng tổng hợp tháng thay vì quét bảng attendances
+    worked_by_employee = {
+        employee_id: summary.days_present
+        for employee_id, summary in get_month_summaries(year, month).items()
+    }
+    coefficient_by_position = {
+        name: coefficient
+        for name, coefficient in db.session.query(
+            Position.position_name, Position.salary_coefficient
+        )
+    }
+    mark("load")
+
+    # decrypt
+    inputs = Salary.load_sensitive_batch(
+        salaries, fields=INPUT_FIELDS, max_workers=max_workers
+    )
+    # Bảng lương không có hệ số riêng dùng hệ số của chức vụ của nhân viên
+    position_by_employee = {}
+    missing = [
+        index
+        for index, values in enumerate(inputs)
+        if values.get("salary_coefficient") in (None, "")
+    ]
+    if missing:
+        employees = Employee.query.filter(
+            Employee.id.in_({salaries[index].employee_id for index in missing})
+        ).all()
+        positions = Employee.load_sensitive_batch(
+            employees, fields=("position",), max_workers=max_workers
+        )
+        position_by_employee = {
+            employee.id: values["position"]
+            for employee, values in zip(employees, positions)
+        }
+    mark("decrypt")
+
+    # compute
+    basic = _to_float_array([values.get("basic_salary") for values in inputs])
+    coefficient = _to_float_array(
+        [values.get("salary_coefficient") for values in inputs]
+    )
+    for index in missing:
+        # Chức vụ không có hệ số (hoặc không đọc được) để NaN: bảng lương bị bỏ qua
+        position = position_by_employee.get(salaries[index].employee_id)
+        position_coefficient = coefficient_by_position.get(position)
+        if position_coefficient is not None:
+            coefficient[index] = position_coefficient
+    bonus = _to_float_array([values.get("bonus") for values in inputs])
+    deduction = _to_float_array([values.get("deduction") for values in inputs])
+    skipped_reasons = {
+        field: int(np.isnan(array).sum())
+        for field, array in (
+            ("basic_salary", basic),
+            ("salary_coefficient", coefficient),
+            ("bonus", bonus),
+            ("deduction", deduction),
+        )
+        if np.isnan(array).any()
+    }
+    worked = np.array(
+        [worked_by_employee.get(salary.employee_id, 0) for salary in salaries],
+        dtype=np.float64,
+    )
+    standard = standard_days or standard_working_days(year, month)
+    totals = compute_totals(basic, coefficient, bonus, deduction, worked, standard)
+    valid = ~np.isnan(totals)
+    if not valid.all():
+        print(
+            f"Skipped {int((~valid).sum())} salaries for {year}-{month:02d} "
+            f"with missing inputs: {skipped_reasons}"
+        )
+    mark("compute")
+
+    # persist
+    packed = get_sensitive_storage_mode() == "packed"
+    records, values_list = [], []
+    for index in np.flatnonzero(valid):
+        salary = salaries[index]
+        salary.worked_days = int(worked[index])
+        values = {"total_salary": float(totals[index])}
+        if packed:
+            # Chế độ packed ghi lại cả document nên phải gửi kèm các trường khác
+            values = dict(inputs[index], **values)
+        records.append(salary)
+        values_list.append(values)
+    Salary.store_sensitive_batch(records, values_list, max_workers=max_workers)
+    db.session.commit()
+    mark("persist")
+
+    return {
+        "year": year,
+        "month": month,
+        "standard_days": standard,
+        "computed": len(records),
+        "skipped": int((~valid).sum()),
+        "skipped_reasons": skipped_reasons,
+        "skipped_salaries": [
+            salaries[index].salary_id for index in np.flatnonzero(~valid)
+        ],
+        "total_payroll": round(float(totals[valid].sum()), 2),
+        "timings_ms": timings,
+    }
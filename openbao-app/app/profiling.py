@@ -0,0 +1,295 @@
+import cProfile
+import functools
+import hashlib
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from inspect import iscoroutinefunction
+
+from flask import (
+    Response,
+    abort,
+    g,
+    has_request_context,
+    render_template,
+    request,
+)
+
+# Request được profile khi mang token hợp lệ ở header hoặc tham số query này
+PROFILE_HEADER = "X-Profile-Token"
+PROFILE_QUERY_ARG = "_profile"
+# Số hàm hiển thị trong báo cáo dạng text
+REPORT_LIMIT = 40
+SORT_KEYS = ("cumulative", "tottime", "ncalls")
+
+_CAPTURE_ID = re.compile(r"^\d{8}T\d{6}-[0-9a-f]{8}$")
+
+# cProfile không chạy tốt khi nhiều profiler cùng bật, nên mỗi tiến trình chỉ
+# profile một request tại một thời điểm
+_capture_lock = threading.Lock()
+
+
+def _signature(secret, expires):
+    message = f"profile:{expires}".encode("utf-8")
+    return hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def make_token(secret, ttl=600):
+    """
+    Tạo token ký bằng PROFILE_SECRET cho phép profile request trong ttl giây.
+
+    Args:
+        secret (str): Khóa ký (PROFILE_SECRET).
+        ttl (int): Thời hạn của token (giây).
+
+    Returns:
+        str: Token dạng "<expires>.<hmac-sha256>".
+    """
+    expires = int(time.time() + ttl)
+    return f"{expires}.{_signature(secret, expires)}"
+
+
+def verify_token(secret, token):
+    """Kiểm tra chữ ký và thời hạn của token."""
+    expires, _, signature = (token or "").partition(".")
+    if not secret or not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(secret, int(expires)))
+
+
+def _request_token():
+    return request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_QUERY_ARG)
+
+
+class ProfileStore:
+    """
+    Ring buffer các bản profile trên đĩa.
+
+    Mỗi bản gồm file pstats (<id>.prof, mở được bằng pstats/snakeviz) và file
+    metadata (<id>.json). Khi vượt quá max_captures, các bản cũ nhất bị xóa.
+
+    Args:
+        directory (str): Thư mục lưu profile.
+        max_captures (int): Số bản profile tối đa được giữ lại.
+    """
+
+    def __init__(self, directory, max_captures=50):
+        self.directory = directory
+        self.max_captures = max_captures
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, capture_id, suffix):
+        if not _CAPTURE_ID.match(capture_id):
+            return None
+        return os.path.join(self.directory, f"{capture_id}{suffix}")
+
+    def save(self, profiler, metadata):
+        """
+        Lưu một bản profile và xóa các bản cũ vượt quá giới hạn.
+
+        Returns:
+            str: Mã của bản profile.
+        """
+        started = datetime.now(timezone.utc)
+        capture_id = f"{started:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        metadata = dict(metadata, id=capture_id, captured_at=started.isoformat())
+        prof_path = self._path(capture_id, ".prof")
+        meta_path = self._path(capture_id, ".json")
+        # Ghi ra file tạm rồi đổi tên để danh sách không thấy bản ghi dở
+        profiler.dump_stats(prof_path + ".tmp")
+        os.replace(prof_path + ".tmp", prof_path)
+        with open(meta_path + ".tmp", "w") as handle:
+            json.dump(metadata, handle)
+        os.replace(meta_path + ".tmp", meta_path)
+        self._prune()
+        return capture_id
+
+    def _prune(self):
+        with self._lock:
+            captures = sorted(
+                name[:-5]
+                for name in os.listdir(self.directory)
+                if name.endswith(".json")
+            )
+            for capture_id in captures[: max(0, len(captures) - self.max_captures)]:
+                for suffix in (".json", ".prof"):
+                    try:
+                        os.remove(self._path(capture_id, suffix))
+                    except FileNotFoundError:
+                        # Tiến trình khác đã xóa trước
+                        pass
+
+    def list(self):
+        """Trả về metadata các bản profile, mới nhất trước."""
+        captures = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as handle:
+                    captures.append(json.load(handle))
+            except (OSError, ValueError):
+                continue
+        return captures
+
+    def prof_path(self, capture_id):
+        """Đường dẫn file pstats của một bản profile (None nếu không tồn tại)."""
+        path = self._path(capture_id, ".prof")
+        return path if path and os.path.exists(path) else None
+
+    def report(self, capture_id, sort="cumulative", limit=REPORT_LIMIT):
+        """
+        Báo cáo dạng text của một bản profile.
+
+        Returns:
+            str: Kết quả của pstats.print_stats, hoặc None nếu không tồn tại.
+        """
+        path = self.prof_path(capture_id)
+        if path is None:
+            return None
+        output = io.StringIO()
+        stats = pstats.Stats(path, stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+
+def _profiled(func, profiler):
+    # View async chạy trên event loop của asgiref ở thread khác, nên profiler
+    # phải được bật ngay trong thread đó thay vì trong thread của request
+    if iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            profiler.enable()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                profiler.disable()
+
+    else:
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.disable()
+
+    return wrapper
+
+
+def init_profiling(app):
+    """
+    Bật profile theo yêu cầu cho từng request.
+
+    Request mang token ký bằng PROFILE_SECRET (header X-Profile-Token hoặc
+    tham số ?_profile=) được chạy dưới cProfile; bản profile được lưu vào
+    ring buffer PROFILE_DIR và mã của nó trả về ở header X-Profile-Capture.
+    Các bản gần đây được liệt kê tại /admin/profiles (cũng yêu cầu token).
+    Lời gọi OpenBao qua vault_async chạy trên loop riêng nên chỉ hiện là thời
+    gian chờ trong view.
+
+    Args:
+        app (Flask): Ứng dụng Flask.
+    """
+    secret = app.config["PROFILE_SECRET"]
+    store = ProfileStore(app.config["PROFILE_DIR"], app.config["PROFILE_MAX_CAPTURES"])
+    app.extensions["profile_store"] = store
+    ensure_sync = app.ensure_sync
+
+    def _ensure_sync(func):
+        profiler = g.get("profiler") if has_request_context() else None
+        if profiler is None or func is not app.view_functions.get(request.endpoint):
+            return ensure_sync(func)
+        return ensure_sync(_profiled(func, profiler))
+
+    app.ensure_sync = _ensure_sync
+
+    @app.before_request
+    def _start_profile():
+        token = _request_token()
+        if not token or request.endpoint in ("profiles", "profile_capture"):
+            return
+        if not verify_token(secret, token):
+            abort(403)
+        if not _capture_lock.acquire(blocking=False):
+            g.profile_capture = "busy"
+            return
+        g.profiler = cProfile.Profile()
+        g.profile_started = time.perf_counter()
+
+    @app.after_request
+    def _save_profile(response):
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            try:
+                g.profile_capture = store.save(
+                    profiler,
+                    {
+                        "method": request.method,
+                        "path": request.path,
+                        "endpoint": request.endpoint,
+                        "status": response.status_code,
+                        "duration_ms": round(
+                            (time.perf_counter() - g.profile_started) * 1000, 3
+                        ),
+                    },
+                )
+            except OSError as e:
+                print(f"Error saving profile: {e}")
+            finally:
+                _capture_lock.release()
+        if g.get("profile_capture"):
+            response.headers["X-Profile-Capture"] = g.profile_capture
+        return response
+
+    @app.teardown_request
+    def _release_profile(exc=None):
+        # Request lỗi không đi qua after_request
+        if g.pop("profiler", None) is not None:
+            _capture_lock.release()
+
+    def _require_token():
+        token = _request_token()
+        if not verify_token(secret, token):
+            abort(403)
+        return token
+
+    def profiles_view():
+        token = _require_token()
+        return render_template("profiles.html", captures=store.list(), token=token)
+
+    def profile_capture_view(capture_id):
+        _require_token()
+        if request.args.get("format") == "prof":
+            path = store.prof_path(capture_id)
+            if path is None:
+                abort(404)
+            with open(path, "rb") as handle:
+                data = handle.read()
+            return Response(
+                data,
+                mimetype="application/octet-stream",
+                headers={
+                    "Content-Disposition": f"attachment; filename={capture_id}.prof"
+                },
+            )
+        sort = request.args.get("sort", "cumulative")
+        report = store.report(capture_id, sort if sort in SORT_KEYS else "cumulative")
+        if report is None:
+            abort(404)
+        return Response(report, mimetype="text/plain")
+
+    app.add_url_rule("/admin/profiles", "profiles", profiles_view)
+    app.add_url_rule(
+        "/admin/profiles/<capture_id>", "profile_capture", profile_capture_view
+    )
@@ -0,0 +1,469 @@
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from flask import g, request
+from sqlalchemy import event
+
+from .models import db
+from .vault_http import add_request_observer
+
+# Loại span theo OTLP
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+# Số ký tự tối đa của câu lệnh SQL được lưu trong span
+MAX_STATEMENT_LENGTH = 500
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_exporter = None
+
+
+class Span:
+    """Một span với thời gian (ns), thuộc tính và trạng thái."""
+
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "status",
+    )
+
+    def __init__(
+        self, name, trace_id, parent_id=None, kind=KIND_INTERNAL, start_ns=None
+    ):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.attributes = {}
+        self.status = STATUS_UNSET
+
+    def child(self, name, kind=KIND_INTERNAL, start_ns=None):
+        return Span(name, self.trace_id, self.span_id, kind, start_ns)
+
+    def end(self, end_ns=None):
+        self.end_ns = end_ns or time.time_ns()
+        if _exporter is not None:
+            _exporter.export(self)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.status == STATUS_ERROR,
+        }
+
+
+def current_span():
+    """Span đang mở trong context hiện tại (None nếu request không được lấy mẫu)."""
+    return _current_span.get()
+
+
+@contextmanager
+def trace_span(name, **attributes):
+    """
+    Mở một span con của span hiện tại, ví dụ quanh một bước xử lý trong view.
+
+    Không làm gì nếu request hiện tại không được lấy mẫu.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    span = parent.child(name)
+    span.attributes.update(attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except Exception:
+        span.status = STATUS_ERROR
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans, service_name):
+    """Chuyển các span sang OTLP/JSON (ExportTraceServiceRequest)."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": _otlp_value(service_name)}
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "app.tracing"},
+                        "spans": [
+                            {
+                                "traceId": span.trace_id,
+                                "spanId": span.span_id,
+                                "parentSpanId": span.parent_id or "",
+                                "name": span.name,
+                                "kind": span.kind,
+                                "startTimeUnixNano": str(span.start_ns),
+                                "endTimeUnixNano": str(span.end_ns),
+                                "attributes": [
+                                    {"key": key, "value": _otlp_value(value)}
+                                    for key, value in span.attributes.items()
+                                ],
+                                "status": {"code": span.status},
+                            }
+                            for span in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class SpanExporter:
+    """
+    Xuất span theo lô từ một thread nền để không chặn request.
+
+    Span được ghi thành JSON lines vào file, hoặc gửi tới collector OTLP/HTTP
+    (POST <endpoint>/v1/traces, mã hóa JSON). Khi hàng đợi đầy, span mới bị
+    bỏ và được đếm trong stats(). File được xoay vòng khi vượt max_file_bytes.
+
+    Args:
+        file_path (str): File JSON lines để ghi span.
+        max_file_bytes (int): Kích thước tối đa của file trước khi xoay vòng
+            (0 để không giới hạn).
+        file_backups (int): Số file cũ được giữ lại khi xoay vòng.
+        otlp_endpoint (str): Địa chỉ collector OTLP/HTTP.
+        service_name (str): Tên dịch vụ trong resource của OTLP.
+        max_queue (int): Số span tối đa đang chờ xuất.
+        batch_size (int): Số span tối đa mỗi lần xuất.
+        interval (float): Thời gian chờ tối đa (giây) giữa hai lần xuất.
+    """
+
+    def __init__(
+        self,
+        file_path=None,
+        max_file_bytes=50 << 20,
+        file_backups=3,
+        otlp_endpoint=None,
+        service_name="openbao-app",
+        max_queue=10000,
+        batch_size=512,
+        interval=1.0,
+    ):
+        self.file_path = file_path
+        self.max_file_bytes = max_file_bytes
+        self.file_backups = file_backups
+        self.otlp_endpoint = otlp_endpoint.rstrip("/") if otlp_endpoint else None
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_queue = max_queue
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stats = {"exported": 0, "dropped": 0, "failed": 0}
+        self._lock = threading.Lock()
+        self._session = None
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        """
+        Khởi động thread xuất span của tiến trình hiện tại.
+
+        Thread được tạo ở span đầu tiên chứ không phải trong create_app, và tạo
+        lại trong tiến trình con sau khi fork (gunicorn --preload), nơi thread
+        của tiến trình cha không tồn tại.
+        """
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                # Span còn trong hàng đợi thuộc tiến trình cha
+                self._queue = queue.Queue(maxsize=self.max_queue)
+            # Session riêng để việc gửi span không bị tính là request tới OpenBao
+            self._session = requests.Session() if self.otlp_endpoint else None
+            self._thread = threading.Thread(
+                target=self._run, name="trace-exporter", daemon=True
+            )
+            self._pid = pid
+            self._thread.start()
+
+    def export(self, span):
+        self.start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, pending=self._queue.qsize())
+
+    def flush(self):
+        """Xuất ngay các span đang chờ (dùng trong benchmark và khi tắt)."""
+        self.start()
+        spans = self._drain()
+        while spans:
+            self._write(spans)
+            spans = self._drain()
+
+    def _drain(self, first=None):
+        spans = [first] if first is not None else []
+        while len(spans) < self.batch_size:
+            try:
+                spans.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return spans
+
+    def _write(self, spans):
+        if not spans:
+            return
+        try:
+            if self.file_path:
+                self._rotate()
+                with open(self.file_path, "a") as handle:
+                    for span in spans:
+                        handle.write(json.dumps(span.to_dict()) + "\n")
+            if self.otlp_endpoint:
+                response = self._session.post(
+                    f"{self.otlp_endpoint}/v1/traces",
+                    json=to_otlp(spans, self.service_name),
+                    timeout=5,
+                )
+                response.raise_for_status()
+            with self._lock:
+                self._stats["exported"] += len(spans)
+        except (OSError, requests.exceptions.RequestException) as e:
+            print(f"Error exporting spans: {e}")
+            with self._lock:
+                self._stats["failed"] += len(spans)
+
+    def _rotate(self):
+        # Chỉ thread xuất span ghi file nên không cần khóa
+        if not self.max_file_bytes:
+            return
+        try:
+            if os.path.getsize(self.file_path) < self.max_file_bytes:
+                return
+        except FileNotFoundError:
+            return
+        for index in range(self.file_backups - 1, 0, -1):
+            source = f"{self.file_path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.file_path}.{index + 1}")
+        if self.file_backups > 0:
+            os.replace(self.file_path, f"{self.file_path}.1")
+        else:
+            os.remove(self.file_path)
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.interval)
+            except queue.Empty:
+                continue
+            self._write(self._drain(first))
+
+
+def get_exporter():
+    """Trả về SpanExporter của tiến trình (None nếu tracing chưa được bật)."""
+    return _exporter
+
+
+def _parse_traceparent(header):
+    # W3C traceparent: 00-<trace_id 32 hex>-<span_id 16 hex>-<flags>
+    parts = (header or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2], parts[3] == "01"
+
+
+def _start_request_span(sample_rate, trust_traceparent=False):
+    parent = _parse_traceparent(request.headers.get("traceparent"))
+    sampled = sample_rate >= 1 or random.random() < sample_rate
+    if parent is not None:
+        trace_id, parent_id, parent_sampled = parent
+        # Client bất kỳ có thể gửi cờ sampled để ép tracing mọi request, nên
+        # cờ chỉ được tin khi TRACE_TRUST_TRACEPARENT; nếu không vẫn giới hạn
+        # theo TRACE_SAMPLE_RATE (trace vẫn nối vào trace của client)
+        sampled = parent_sampled and (trust_traceparent or sampled)
+    else:
+        trace_id, parent_id = None, None
+    if not sampled:
+        return
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    span = Span(
+        f"{request.method} {route}",
+        trace_id or f"{random.getrandbits(128):032x}",
+        parent_id,
+        KIND_SERVER,
+    )
+    span.attributes.update(
+        {
+            "http.method": request.method,
+            "http.target": request.path,
+            "http.route": request.endpoint or "unmatched",
+        }
+    )
+    g.trace_token = _current_span.set(span)
+    g.trace_span = span
+
+
+def _observe_vault_request(method, url, status, seconds):
+    parent = _current_span.get()
+    if parent is None:
+        return
+    end_ns = time.time_ns()
+    path = urlsplit(url).path
+    # /v1/<mount>/<operation>/...
+    parts = path.split("/", 4)
+    span = parent.child(
+        f"vault {method} {'/'.join(parts[2:4])}",
+        KIND_CLIENT,
+        start_ns=end_ns - int(seconds * 1e9),
+    )
+    span.attributes.update(
+        {"http.method": method, "vault.path": path, "http.status_code": status or 0}
+    )
+    if status is None or status >= 500:
+        span.status = STATUS_ERROR
+    span.end(end_ns)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    parent = _current_span.get()
+    if parent is None:
+        return
+    operation = statement.lstrip()[:7].split(None, 1)
+    span = parent.child(
+        f"sql {operation[0].upper() if operation else ''}".rstrip(), KIND_CLIENT
+    )
+    span.attributes.update(
+        {
+            "db.system": conn.dialect.name,
+            "db.statement": statement[:MAX_STATEMENT_LENGTH],
+            "db.executemany": executemany,
+        }
+    )
+    conn.info.setdefault("trace_spans", []).append(span)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("trace_spans")
+    if spans and _current_span.get() is not None:
+        span = spans.pop()
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            span.attributes["db.rowcount"] = cursor.rowcount
+        span.end()
+
+
+def _handle_error(context):
+    spans = context.connection.info.get("trace_spans") if context.connection else None
+    if spans and _current_span.get() is not None:
+        span = spans.pop()
+        span.status = STATUS_ERROR
+        span.attributes["error.type"] = type(context.original_exception).__name__
+        span.end()
+
+
+def init_tracing(app):
+    """
+    Bật tracing theo request cho ứng dụng.
+
+    Mỗi request được lấy mẫu (TRACE_SAMPLE_RATE, hoặc theo header traceparent
+    khi TRACE_TRUST_TRACEPARENT) có một span gốc; mỗi request tới OpenBao (qua vault_http) và mỗi câu lệnh
+    SQL là một span con. Request không được lấy mẫu không tạo span nào.
+
+    Args:
+        app (Flask): Ứng dụng Flask.
+    """
+    global _exporter
+    sample_rate = app.config["TRACE_SAMPLE_RATE"]
+    trust_traceparent = app.config["TRACE_TRUST_TRACEPARENT"]
+    if _exporter is None:
+        _exporter = SpanExporter(
+            file_path=app.config["TRACE_FILE"],
+            max_file_bytes=app.config["TRACE_FILE_MAX_BYTES"],
+            file_backups=app.config["TRACE_FILE_BACKUPS"],
+            otlp_endpoint=app.config["TRACE_OTLP_ENDPOINT"],
+            service_name=app.config["TRACE_SERVICE_NAME"],
+        )
+    add_request_observer(_observe_vault_request)
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+    @app.before_request
+    def _start_trace():
+        _start_request_span(sample_rate, trust_traceparent)
+
+    @app.after_request
+    def _record_status(response):
+        span = g.get("trace_span")
+        if span is not None:
+            span.attributes["http.status_code"] = response.status_code
+            if response.status_code >= 500:
+                span.status = STATUS_ERROR
+            # Trả trace id cho client để tra cứu span
+            response.headers["traceparent"] = f"00-{span.trace_id}-{span.span_id}-01"
+        return response
+
+    @app.teardown_request
+    def _end_trace(exc=None):
+        span = g.pop("trace_span", None)
+        if span is None:
+            return
+        if exc is not None:
+            span.status = STATUS_ERROR
+            span.attributes["error.type"] = type(exc).__name__
+        try:
+            _current_span.reset(g.pop("trace_token"))
+        except ValueError:
+            # Token thuộc context khác (ví dụ teardown chạy ở thread khác)
+            _current_span.set(None)
+        span.end()
+
@@ -0,0 +1,293 @@
+import asyncio
+import contextvars
+import json
+import os
+import threading
+import time
+
+import aiohttp
+
+from .vault_config import (
+    get_vault_addr,
+    get_headers,
+    get_pool_settings,
+    get_cache_settings,
+)
+from .vault_cache import (
+    get_secret_cache,
+    get_single_flight,
+    invalidate_secret,
+    parse_kv_read,
+)
+from .vault_client import (
+    RETRYABLE_STATUSES,
+    backoff_delay,
+    get_circuit_breaker,
+    plan_request,
+)
+from .vault_http import notify_observers
+
+# Flask chạy mỗi view async trong một event loop riêng cho từng request, nên
+# session aiohttp được đặt trên một event loop nền dùng chung cho cả tiến trình.
+# Nhờ vậy kết nối keep-alive tới OpenBao được tái sử dụng giữa các request.
+_loop = None
+_loop_pid = None
+_session = None
+_loop_lock = threading.Lock()
+# Task đọc document đang chạy theo đường dẫn; chỉ được truy cập trên loop nền
+_in_flight = {}
+
+
+def _get_loop():
+    # Thread của loop nền không tồn tại trong tiến trình con sau khi fork
+    # (gunicorn --preload), nên mỗi tiến trình dựng loop và session riêng
+    global _loop, _loop_pid, _session
+    pid = os.getpid()
+    if _loop is not None and _loop_pid == pid:
+        return _loop
+    with _loop_lock:
+        if _loop is None or _loop_pid != pid:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever, name="vault-async", daemon=True
+            )
+            thread.start()
+            # Session và các task cũ thuộc về loop của tiến trình cha
+            _session = None
+            _in_flight.clear()
+            _loop = loop
+            _loop_pid = pid
+    return _loop
+
+
+async def _get_session():
+    global _session
+    if _session is None or _session.closed:
+        settings = get_pool_settings()
+        connect_timeout, read_timeout = settings["timeout"]
+        _session = aiohttp.ClientSession(
+            headers=get_headers(),
+            connector=aiohttp.TCPConnector(
+                limit=settings["pool_maxsize"] * settings["pool_connections"],
+                limit_per_host=settings["pool_maxsize"],
+            ),
+            timeout=aiohttp.ClientTimeout(
+                sock_connect=connect_timeout, sock_read=read_timeout
+            ),
+        )
+    return _session
+
+
+async def _run(coro):
+    """Chạy coroutine trên event loop của client và chờ kết quả từ loop hiện tại."""
+    loop = _get_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    # Giữ context của request (span tracing hiện tại) khi chạy trên loop nền
+    context = contextvars.copy_context()
+
+    async def run_in_context():
+        return await loop.create_task(coro, context=context)
+
+    return await asyncio.wrap_future(
+        asyncio.run_coroutine_threadsafe(run_in_context(), loop)
+    )
+
+
+async def _request(method, path, payload=None):
+    # Dùng chung circuit breaker, thời hạn và chính sách thử lại với vault_client
+    breaker = get_circuit_breaker()
+    if not breaker.allow():
+        print(f"Request error: OpenBao circuit breaker is open: {method} {path}")
+        return None, {}, ""
+    status = None
+    # Như vault_client.request: record() luôn được gọi sau allow()
+    try:
+        session = await _get_session()
+        url = f"{get_vault_addr()}/v1/{path}"
+        attempts, expires_at = plan_request(method)
+        connect_timeout, read_timeout = get_pool_settings()["timeout"]
+        attempt = 0
+        while True:
+            remaining = max(expires_at - time.monotonic(), 0.001)
+            timeout = aiohttp.ClientTimeout(
+                total=remaining,
+                sock_connect=min(connect_timeout, remaining),
+                sock_read=min(read_timeout, remaining),
+            )
+            started = time.perf_counter()
+            status = None
+            result = None, {}, ""
+            try:
+                async with session.request(
+                    method, url, json=payload, timeout=timeout
+                ) as response:
+                    status = response.status
+                    text = await response.text()
+                    result = status, json.loads(text) if text else {}, text
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Request error: {e}")
+            except ValueError as e:
+                print(f"Request error: {e}")
+                return result
+            finally:
+                notify_observers(method, url, status, time.perf_counter() - started)
+            attempt += 1
+            if attempt >= attempts or (
+                status is not None and status not in RETRYABLE_STATUSES
+            ):
+                return result
+            delay = backoff_delay(attempt)
+            if time.monotonic() + delay >= expires_at:
+                return result
+            breaker.count_retry()
+            await asyncio.sleep(delay)
+    finally:
+        breaker.record(status)
+
+
+async def _store_document(secret_path, secret_data):
+    status, body, text = await _request(
+        "POST", f"secret/data/{secret_path}", {"data": secret_data}
+    )
+    invalidate_secret(secret_path)
+    _in_flight.pop(secret_path, None)
+    if status == 200:
+        return body.get("data", {}).get("version")
+    if status is not None:
+        print(f"Error storing secret in Vault: {status} - {text}")
+    return None
+
+
+def _forget_in_flight(secret_path, task):
+    if _in_flight.get(secret_path) is task:
+        del _in_flight[secret_path]
+
+
+async def _fetch_document(secret_path):
+    # Thế hệ của cache được lấy trước khi đọc, để bản đọc bắt đầu trước một lần
+    # ghi không được lưu đè vào cache sau khi lần ghi đó đã invalidate
+    generation = get_secret_cache().generation()
+    status, body, text = await _request("GET", f"secret/data/{secret_path}")
+    if status == 200:
+        return (*parse_kv_read(body), generation)
+    if status is not None:
+        print(f"Error retrieving secret from Vault: {status} - {text}")
+    return None, None, generation
+
+
+async def _retrieve_document(secret_path, cacheable=True):
+    # Dùng chung cache với client đồng bộ. Entry quá hạn đối chiếu được đọc lại
+    # cả document (không gọi metadata để tránh HTTP đồng bộ trên event loop)
+    cache = get_secret_cache()
+    cacheable = cacheable and cache.is_cacheable(secret_path)
+    if cacheable:
+        entry = cache.get("secret", secret_path)
+        revalidate_after = get_cache_settings()["revalidate_after"]
+        if entry is not None and (
+            not revalidate_after
+            or time.monotonic() - entry["validated_at"] < revalidate_after
+        ):
+            return entry["data"], entry["version"]
+    if not get_cache_settings()["coalesce_reads"]:
+        data, version, generation = await _fetch_document(secret_path)
+    else:
+        # Mọi lần đọc async đều chạy trên loop nền nên các request đồng thời
+        # (từ mọi thread) cho cùng đường dẫn chờ chung một task
+        task = _in_flight.get(secret_path)
+        get_single_flight().count_coalesced(leader=task is None)
+        if task is None:
+            task = _in_flight[secret_path] = asyncio.ensure_future(
+                _fetch_document(secret_path)
+            )
+            task.add_done_callback(lambda done: _forget_in_flight(secret_path, done))
+        # shield: một caller bị hủy không được hủy request của các caller khác
+        data, version, generation = await asyncio.shield(task)
+        if data is not None:
+            data = dict(data)
+    if data is not None and cacheable:
+        cache.put("secret", secret_path, data, version, generation=generation)
+    return data, version
+
+
+async def store_secret_document_async(secret_path, secret_data):
+    """
+    Ghi một document bí mật vào Vault (bản async của store_secret_document).
+
+    Returns:
+        int: Phiên bản mới của document, hoặc None nếu có lỗi xảy ra.
+    """
+    return await _run(_store_document(secret_path, secret_data))
+
+
+async def retrieve_secret_document_async(secret_path, cacheable=True):
+    """
+    Đọc một document bí mật từ Vault (bản async của retrieve_secret_document).
+
+    Returns:
+        tuple: (dữ liệu, phiên bản) hoặc (None, None) nếu có lỗi xảy ra.
+    """
+    return await _run(_retrieve_document(secret_path, cacheable))
+
+
+async def retrieve_secret_documents_async(secret_paths):
+    """
+    Đọc đồng thời nhiều document bí mật, mỗi đường dẫn chỉ đọc một lần.
+
+    Returns:
+        dict: Ánh xạ đường dẫn -> dữ liệu (None nếu có lỗi xảy ra).
+    """
+    paths = list(dict.fromkeys(secret_paths))
+
+    async def gather_documents():
+        results = await asyncio.gather(*(_retrieve_document(path) for path in paths))
+        return {path: data for path, (data, _) in zip(paths, results)}
+
+    return await _run(gather_documents())
+
+
+async def store_password_in_vault_async(username, password):
+    """
+    Lưu trữ mật khẩu của người dùng vào Vault.
+
+    Returns:
+        bool: True nếu lưu trữ thành công, ngược lại là False.
+    """
+    return await store_secret_document_async(username, {"password": password}) is not None
+
+
+async def retrieve_password_from_vault_async(username):
+    """
+    Truy xuất mật khẩu của người dùng từ Vault.
+
+    Returns:
+        str: Mật khẩu của người dùng nếu truy xuất thành công, ngược lại là None.
+    """
+    data, _ = await retrieve_secret_document_async(
+        username, cacheable=get_cache_settings()["cache_passwords"]
+    )
+    return data.get("password") if data is not None else None
+
+
+async def store_secret_in_vault_async(secret_path, secret_value):
+    """Lưu trữ giá trị bí mật vào Vault, trả về đường dẫn làm khóa tham chiếu."""
+    version = await store_secret_document_async(secret_path, {"value": secret_value})
+    return secret_path if version is not None else None
+
+
+async def retrieve_secret_from_vault_async(secret_path):
+    """Lấy giá trị bí mật từ Vault."""
+    data, _ = await retrieve_secret_document_async(secret_path)
+    return data.get("value") if data is not None else None
+
+
+async def gather_secrets(secret_paths):
+    """
+    Đọc đồng thời nhiều giá trị bí mật kiểu một-secret-một-trường.
+
+    Returns:
+        list: Giá trị theo đúng thứ tự secret_paths.
+    """
+    return await asyncio.gather(
+        *(retrieve_secret_from_vault_async(path) for path in secret_paths)
+    )
@@ -0,0 +1,363 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+
+from . import vault_config
+
+# Số khóa được ghi nhớ thế hệ invalidate gần nhất (xem SecretCache.generation)
+GENERATION_HISTORY = 4096
+
+
+class SecretCache:
+    """
+    Cache LRU + TTL trong tiến trình cho các secret KV v2, khóa theo (mount, path).
+
+    Bộ nhớ được giới hạn theo cả số entry lẫn tổng kích thước (ước lượng bằng
+    độ dài JSON của dữ liệu). Entry cũ nhất bị loại khi vượt giới hạn.
+
+    Args:
+        max_entries (int): Số entry tối đa.
+        max_bytes (int): Tổng kích thước tối đa của dữ liệu được cache.
+        ttl (float): Thời gian sống của một entry, tính bằng giây.
+        exclude_prefixes (list): Các tiền tố đường dẫn không bao giờ được cache.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=1 << 20, ttl=60, exclude_prefixes=()):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.exclude_prefixes = tuple(exclude_prefixes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Bộ đếm thế hệ tăng sau mỗi lần invalidate; _invalidated giữ thế hệ
+        # invalidate gần nhất của từng khóa, _generation_floor là thế hệ lớn
+        # nhất của các khóa đã bị loại khỏi _invalidated
+        self._generation = 0
+        self._generation_floor = 0
+        self._invalidated = OrderedDict()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "revalidations": 0,
+            "stale_puts": 0,
+        }
+
+    def is_cacheable(self, path):
+        return self.max_entries > 0 and not path.startswith(self.exclude_prefixes)
+
+    def get(self, mount, path):
+        """
+        Trả về entry còn hạn dạng dict(data, version, validated_at), hoặc None.
+        """
+        key = (mount, path)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if now - entry["stored_at"] > self.ttl:
+                self._remove(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return dict(entry, data=dict(entry["data"]))
+
+    def generation(self):
+        """
+        Thế hệ hiện tại, lấy trước khi đọc secret từ Vault và truyền lại cho put().
+        """
+        with self._lock:
+            return self._generation
+
+    def put(self, mount, path, data, version, generation=None):
+        """
+        Lưu dữ liệu của một secret vào cache.
+
+        Args:
+            generation (int): Giá trị generation() lấy trước khi đọc. Nếu secret
+                đã bị invalidate sau thời điểm đó (đã được ghi trong lúc đọc),
+                dữ liệu có thể đã cũ và không được lưu.
+        """
+        size = len(json.dumps(data, default=str))
+        if size > self.max_bytes:
+            return
+        key = (mount, path)
+        now = time.monotonic()
+        with self._lock:
+            if generation is not None and (
+                self._invalidated.get(key, self._generation_floor) > generation
+            ):
+                self._stats["stale_puts"] += 1
+                return
+            current = self._entries.get(key)
+            if (
+                current is not None
+                and current["version"] is not None
+                and version is not None
+                and version < current["version"]
+            ):
+                # Không ghi đè phiên bản mới hơn bằng một lần đọc chậm hơn
+                self._stats["stale_puts"] += 1
+                return
+            if current is not None:
+                self._remove(key)
+            self._entries[key] = {
+                "data": dict(data),
+                "version": version,
+                "size": size,
+                "stored_at": now,
+                "validated_at": now,
+            }
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def touch(self, mount, path):
+        """Gia hạn entry sau khi đã xác nhận phiên bản vẫn là mới nhất."""
+        with self._lock:
+            entry = self._entries.get((mount, path))
+            if entry is not None:
+                entry["stored_at"] = entry["validated_at"] = time.monotonic()
+                self._stats["revalidations"] += 1
+
+    def invalidate(self, mount, path):
+        """Xóa entry của một secret khỏi cache (nếu có) và tăng thế hệ của nó."""
+        key = (mount, path)
+        with self._lock:
+            self._generation += 1
+            self._invalidated[key] = self._generation
+            self._invalidated.move_to_end(key)
+            if len(self._invalidated) > GENERATION_HISTORY:
+                _, oldest = self._invalidated.popitem(last=False)
+                self._generation_floor = max(self._generation_floor, oldest)
+            if key in self._entries:
+                self._remove(key)
+                self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            # Lần đọc đang chạy không được lưu lại dữ liệu từ trước khi xóa
+            self._generation += 1
+            self._generation_floor = self._generation
+            self._invalidated.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Bộ đếm hit/miss/eviction, số entry và tổng kích thước hiện tại.
+        """
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=self._bytes)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry["size"]
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Gộp các lần đọc đồng thời cùng một khóa thành một lời gọi duy nhất.
+
+    Lời gọi đầu tiên (leader) thực hiện fetch; các lời gọi đến trong lúc fetch
+    đang chạy chờ và nhận cùng kết quả (hoặc cùng exception) thay vì gửi thêm
+    request tới Vault.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"leaders": 0, "coalesced": 0}
+
+    def do(self, key, fn):
+        """
+        Gọi fn() cho khóa key, hoặc chờ lời gọi fn() đang chạy cho cùng khóa.
+
+        Returns:
+            tuple: (kết quả của fn, True nếu kết quả được chia sẻ từ leader)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._stats["leaders" if leader else "coalesced"] += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.event.set()
+
+    def forget(self, key):
+        """
+        Tách lời gọi đang chạy khỏi khóa để lần đọc sau (ví dụ ngay sau khi ghi)
+        gửi request mới thay vì nhận kết quả có thể đã cũ.
+        """
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def count_coalesced(self, leader):
+        """Đếm một lần đọc được gộp ở nơi khác (ví dụ client async)."""
+        with self._lock:
+            self._stats["leaders" if leader else "coalesced"] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._calls))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_flights = SingleFlight()
+
+
+def get_secret_cache():
+    """Trả về cache secret dùng chung cho toàn tiến trình."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                settings = vault_config.get_cache_settings()
+                _cache = SecretCache(
+                    max_entries=settings["max_entries"],
+                    max_bytes=settings["max_bytes"],
+                    ttl=settings["ttl"],
+                    exclude_prefixes=settings["exclude_prefixes"],
+                )
+    return _cache
+
+
+def _current_version(mount, path):
+    """Đọc phiên bản hiện tại của secret từ KV v2 metadata."""
+    from .vault_client import request
+
+    try:
+        response = request("GET", f"{mount}/metadata/{path}")
+        if response.status_code == 200:
+            return response.json().get("data", {}).get("current_version")
+        return None
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return None
+
+
+def parse_kv_read(body):
+    """
+    Tách dữ liệu và phiên bản từ body JSON của một lần đọc KV v2
+    (GET <mount>/data/<path>).
+
+    Returns:
+        tuple: (dữ liệu, phiên bản)
+    """
+    document = (body or {}).get("data") or {}
+    return document.get("data") or {}, (document.get("metadata") or {}).get("version")
+
+
+def get_single_flight():
+    """Trả về bộ gộp lần đọc đồng thời dùng chung cho toàn tiến trình."""
+    return _flights
+
+
+def cached_read(path, fetch, mount="secret", cacheable=True):
+    """
+    Đọc một secret qua cache (read-through).
+
+    Khi cache không có dữ liệu, các lần đọc đồng thời cùng (mount, path) chỉ
+    gửi một request tới Vault (xem SingleFlight), kể cả khi không được cache.
+
+    Args:
+        path (str): Đường dẫn secret trong mount.
+        fetch (callable): Hàm không tham số đọc secret từ Vault, trả về
+            (dữ liệu, phiên bản) hoặc (None, None) nếu lỗi.
+        mount (str): Tên mount KV v2.
+        cacheable (bool): False để bỏ qua cache cho lần đọc này
+            (ví dụ mật khẩu người dùng).
+
+    Returns:
+        tuple: (dữ liệu, phiên bản) như fetch().
+    """
+    cache = get_secret_cache()
+    if not cacheable or not cache.is_cacheable(path):
+        return _coalesced_fetch(mount, path, fetch)
+
+    entry = cache.get(mount, path)
+    if entry is not None:
+        revalidate_after = vault_config.get_cache_settings()["revalidate_after"]
+        if (
+            not revalidate_after
+            or entry["version"] is None
+            or time.monotonic() - entry["validated_at"] < revalidate_after
+        ):
+            return entry["data"], entry["version"]
+        if _current_version(mount, path) == entry["version"]:
+            cache.touch(mount, path)
+            return entry["data"], entry["version"]
+
+    def fetch_and_store():
+        # Lấy thế hệ trước khi đọc: nếu secret được ghi trong lúc đọc, kết quả
+        # có thể là bản cũ và put() bỏ qua
+        generation = cache.generation()
+        data, version = fetch()
+        if data is not None:
+            cache.put(mount, path, data, version, generation=generation)
+        return data, version
+
+    return _coalesced_fetch(mount, path, fetch_and_store)
+
+
+def _coalesced_fetch(mount, path, fetch):
+    if not vault_config.get_cache_settings()["coalesce_reads"]:
+        return fetch()
+    (data, version), shared = _flights.do((mount, path), fetch)
+    # Mỗi caller nhận bản sao riêng để không sửa nhầm dữ liệu của nhau
+    if shared and data is not None:
+        data = dict(data)
+    return data, version
+
+
+def invalidate_secret(path, mount="secret"):
+    """Xóa secret khỏi cache sau khi được ghi, cập nhật hoặc xóa trong Vault."""
+    get_secret_cache().invalidate(mount, path)
+    _flights.forget((mount, path))
+
+
+def get_cache_stats():
+    """Trả về bộ đếm của cache secret và của việc gộp lần đọc đồng thời."""
+    flights = _flights.stats()
+    return dict(
+        get_secret_cache().stats(),
+        coalesce_leaders=flights["leaders"],
+        coalesced=flights["coalesced"],
+    )
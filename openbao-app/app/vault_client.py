@@ -0,0 +1,384 @@
+import json
+import random
+import threading
+import time
+
+import requests
+
+from . import vault_config
+from .vault_cache import cached_read, invalidate_secret, parse_kv_read
+from .vault_http import get_session
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Mã lỗi được thử lại với thao tác idempotent (OpenBao trả 503 khi bị seal
+# hoặc là standby, 429 khi vượt rate limit)
+RETRYABLE_STATUSES = frozenset((429, 500, 502, 503, 504))
+# Mã lỗi cho thấy OpenBao không khỏe, được tính là lỗi của circuit breaker
+FAILURE_STATUSES = frozenset((500, 502, 503, 504))
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Lời gọi bị từ chối ngay vì circuit breaker đang mở."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker cho các lời gọi tới OpenBao.
+
+    Sau failure_threshold thao tác lỗi liên tiếp (lỗi kết nối, timeout hoặc 5xx
+    sau khi đã thử lại) breaker chuyển sang OPEN và từ chối mọi lời gọi trong
+    reset_timeout giây. Sau đó một lời gọi thử được cho qua (HALF_OPEN): thành
+    công thì đóng lại, lỗi thì mở tiếp.
+
+    Args:
+        failure_threshold (int): Số lỗi liên tiếp để mở breaker.
+        reset_timeout (float): Số giây giữ trạng thái OPEN trước khi thử lại.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._stats = {"rejected": 0, "retries": 0}
+        self._transitions = {}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def _transition(self, state):
+        key = (self._state, state)
+        self._transitions[key] = self._transitions.get(key, 0) + 1
+        print(f"Vault circuit breaker: {self._state} -> {state}")
+        self._state = state
+
+    def allow(self):
+        """
+        Kiểm tra một lời gọi có được phép đi tiếp hay không.
+
+        Returns:
+            bool: False nếu breaker đang mở (lời gọi bị tính là bị từ chối).
+        """
+        with self._lock:
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at >= self.reset_timeout:
+                    self._transition(HALF_OPEN)
+                else:
+                    self._stats["rejected"] += 1
+                    return False
+            if self._state == HALF_OPEN:
+                # Chỉ một lời gọi thử tại một thời điểm
+                if self._probe_in_flight:
+                    self._stats["rejected"] += 1
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record(self, status):
+        """
+        Ghi nhận kết quả của một lời gọi đã được allow() cho qua.
+
+        Args:
+            status (int): Mã HTTP, hoặc None nếu lỗi kết nối/timeout.
+        """
+        failed = status is None or status in FAILURE_STATUSES
+        with self._lock:
+            self._probe_in_flight = False
+            if not failed:
+                self._failures = 0
+                if self._state != CLOSED:
+                    self._transition(CLOSED)
+                return
+            self._failures += 1
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._transition(OPEN)
+                self._opened_at = time.monotonic()
+
+    def count_retry(self):
+        with self._lock:
+            self._stats["retries"] += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: Trạng thái, số lỗi liên tiếp, số lời gọi bị từ chối, số lần
+            thử lại và số lần chuyển trạng thái theo (từ, đến).
+        """
+        with self._lock:
+            return dict(
+                self._stats,
+                state=self._state,
+                consecutive_failures=self._failures,
+                transitions=dict(self._transitions),
+            )
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker():
+    """Trả về circuit breaker dùng chung cho mọi lời gọi tới OpenBao của tiến trình."""
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                settings = vault_config.get_resilience_settings()
+                _breaker = CircuitBreaker(
+                    failure_threshold=settings["breaker_failure_threshold"],
+                    reset_timeout=settings["breaker_reset_timeout"],
+                )
+    return _breaker
+
+
+def get_breaker_stats():
+    """Trả về bộ đếm của circuit breaker."""
+    return get_circuit_breaker().stats()
+
+
+def backoff_delay(attempt):
+    """Thời gian chờ (giây) trước lần thử lại thứ attempt, có jitter đầy đủ."""
+    settings = vault_config.get_resilience_settings()
+    cap = min(settings["retry_backoff_max"], settings["retry_backoff"] * 2**attempt)
+    return random.uniform(0, cap)
+
+
+def plan_request(method, idempotent=None, deadline=None):
+    """
+    Tính số lần thử và thời điểm hết hạn (time.monotonic()) của một thao tác.
+
+    Args:
+        method (str): Phương thức HTTP; GET mặc định là idempotent.
+        idempotent (bool): Ghi đè việc thao tác có được thử lại hay không.
+        deadline (float): Thời hạn tổng (giây); mặc định theo loại thao tác.
+
+    Returns:
+        tuple: (số lần thử tối đa, thời điểm hết hạn)
+    """
+    settings = vault_config.get_resilience_settings()
+    if idempotent is None:
+        idempotent = method == "GET"
+    if deadline is None:
+        deadline = settings["read_deadline" if idempotent else "write_deadline"]
+    attempts = max(1, settings["retry_attempts"]) if idempotent else 1
+    return attempts, time.monotonic() + deadline
+
+
+def request(method, path, idempotent=None, deadline=None, headers=None, **kwargs):
+    """
+    Gửi một request tới OpenBao qua session dùng chung.
+
+    Mỗi lần thử bị giới hạn bởi thời hạn còn lại của thao tác. Thao tác
+    idempotent được thử lại với backoff ngẫu nhiên khi lỗi kết nối, timeout
+    hoặc gặp mã lỗi tạm thời; mọi lời gọi đều đi qua circuit breaker.
+
+    Args:
+        method (str): Phương thức HTTP.
+        path (str): Đường dẫn API sau /v1/, ví dụ "secret/data/foo".
+        idempotent (bool): Có được thử lại hay không (mặc định: chỉ GET).
+        deadline (float): Thời hạn tổng (giây) của thao tác.
+        headers (dict): Header bổ sung ngoài token.
+        **kwargs: Tham số khác của requests (json, data, ...).
+
+    Returns:
+        requests.Response: Response của lần thử cuối.
+
+    Raises:
+        requests.exceptions.RequestException: Khi không nhận được response,
+            kể cả CircuitOpenError khi breaker đang mở.
+    """
+    breaker = get_circuit_breaker()
+    if not breaker.allow():
+        raise CircuitOpenError(f"OpenBao circuit breaker is open: {method} {path}")
+    response = None
+    # Mọi bước sau allow() nằm trong try để record() luôn được gọi; nếu không,
+    # một lời gọi thử HALF_OPEN lỗi khi chuẩn bị sẽ giữ breaker ở trạng thái
+    # "đang thử" mãi mãi
+    try:
+        attempts, expires_at = plan_request(method, idempotent, deadline)
+        url = f"{vault_config.get_vault_addr()}/v1/{path}"
+        headers = dict(vault_config.get_headers(), **(headers or {}))
+        connect_timeout, read_timeout = vault_config.get_pool_settings()["timeout"]
+        attempt = 0
+        while True:
+            remaining = max(expires_at - time.monotonic(), 0.001)
+            try:
+                response = get_session().request(
+                    method,
+                    url,
+                    headers=headers,
+                    timeout=(
+                        min(connect_timeout, remaining),
+                        min(read_timeout, remaining),
+                    ),
+                    **kwargs,
+                )
+                retry = response.status_code in RETRYABLE_STATUSES
+            except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+            ):
+                response = None
+                if attempt + 1 >= attempts:
+                    raise
+                retry = True
+            attempt += 1
+            if not retry or attempt >= attempts:
+                return response
+            delay = backoff_delay(attempt)
+            # Không thử lại nếu không còn đủ thời gian cho lần thử tiếp theo
+            if time.monotonic() + delay >= expires_at:
+                if response is None:
+                    raise requests.exceptions.Timeout(
+                        f"Vault deadline exceeded: {method} {path}"
+                    )
+                return response
+            breaker.count_retry()
+            time.sleep(delay)
+    finally:
+        # Breaker ghi nhận kết quả cuối của thao tác, không phải từng lần thử
+        breaker.record(response.status_code if response is not None else None)
+
+
+def _kv_data_path(path, mount):
+    return f"{mount}/data/{path}"
+
+
+def read_kv(path, mount="secret", cacheable=True):
+    """
+    Đọc một document KV v2 qua cache (read-through).
+
+    Args:
+        path (str): Đường dẫn document trong mount.
+        mount (str): Tên mount KV v2.
+        cacheable (bool): False để bỏ qua cache (ví dụ mật khẩu người dùng).
+
+    Returns:
+        tuple: (dữ liệu, phiên bản) hoặc (None, None) nếu có lỗi xảy ra.
+    """
+
+    def fetch():
+        try:
+            response = request("GET", _kv_data_path(path, mount))
+            if response.status_code == 200:
+                return parse_kv_read(response.json())
+            else:
+                print(
+                    f"Error retrieving secret: {response.status_code} - {response.text}"
+                )
+                return None, None
+        except requests.exceptions.RequestException as e:
+            print(f"Request error: {e}")
+            return None, None
+
+    return cached_read(path, fetch, mount=mount, cacheable=cacheable)
+
+
+def write_kv(path, data, cas=None, mount="secret"):
+    """
+    Ghi toàn bộ một document KV v2.
+
+    Args:
+        path (str): Đường dẫn document.
+        data (dict): Dữ liệu các trường.
+        cas (int): Phiên bản hiện tại để check-and-set; 0 nghĩa là chỉ ghi khi
+            document chưa tồn tại. None để ghi đè không điều kiện.
+        mount (str): Tên mount KV v2.
+
+    Returns:
+        int: Phiên bản mới của document, hoặc None nếu có lỗi xảy ra.
+    """
+    payload = {"data": data}
+    if cas is not None:
+        payload["options"] = {"cas": cas}
+    try:
+        response = request("POST", _kv_data_path(path, mount), json=payload)
+        invalidate_secret(path, mount)
+        if response.status_code == 200:
+            return response.json().get("data", {}).get("version")
+        else:
+            print(f"Error storing secret: {response.status_code} - {response.text}")
+            return None
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return None
+
+
+def patch_kv(path, data, cas=None, mount="secret"):
+    """
+    Cập nhật một phần document KV v2 (JSON merge patch).
+
+    Returns:
+        int: Phiên bản mới của document, hoặc None nếu có lỗi xảy ra
+        (kể cả khi phiên bản cas không còn khớp).
+    """
+    payload = {"data": data}
+    if cas is not None:
+        payload["options"] = {"cas": cas}
+    try:
+        response = request(
+            "PATCH",
+            _kv_data_path(path, mount),
+            headers={"Content-Type": "application/merge-patch+json"},
+            data=json.dumps(payload),
+        )
+        invalidate_secret(path, mount)
+        if response.status_code == 200:
+            return response.json().get("data", {}).get("version")
+        else:
+            print(f"Error patching secret: {response.status_code} - {response.text}")
+            return None
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return None
+
+
+def destroy_kv(path, mount="secret"):
+    """
+    Xóa vĩnh viễn mọi phiên bản và metadata của một document KV v2.
+
+    Returns:
+        bool: True nếu xóa thành công, ngược lại là False.
+    """
+    try:
+        response = request("DELETE", f"{mount}/metadata/{path}", idempotent=True)
+        invalidate_secret(path, mount)
+        if response.status_code == 204:
+            return True
+        else:
+            print(f"Error destroying secret: {response.status_code} - {response.text}")
+            return False
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return False
+
+
+def delete_kv(path, mount="secret"):
+    """
+    Xóa phiên bản mới nhất của một document KV v2.
+
+    Returns:
+        bool: True nếu xóa thành công, ngược lại là False.
+    """
+    try:
+        # Xóa nhiều lần cho cùng kết quả nên được phép thử lại
+        response = request("DELETE", _kv_data_path(path, mount), idempotent=True)
+        invalidate_secret(path, mount)
+        if response.status_code == 204:
+            return True
+        else:
+            print(f"Error deleting secret: {response.status_code} - {response.text}")
+            return False
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return False
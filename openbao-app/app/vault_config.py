@@ -1,4 +1,3 @@
-import requests
 import os
 from dotenv import load_dotenv
 
@@ -10,6 +9,77 @@ vault_addr = os.getenv("VAULT_ADDR", "http://127.0.0.1:8200")
 vault_token = os.getenv("VAULT_TOKEN", "s.vBZzrwXBqW0MpdJ1Oh57gKhK")
 headers = {"X-Vault-Token": vault_token}
 
+# Cấu hình connection pool dùng chung cho mọi lời gọi HTTP tới OpenBao
+pool_connections = int(os.getenv("VAULT_POOL_CONNECTIONS", "4"))
+pool_maxsize = int(os.getenv("VAULT_POOL_MAXSIZE", "20"))
+pool_block = os.getenv("VAULT_POOL_BLOCK", "false").lower() in ("1", "true", "yes")
+connect_timeout = float(os.getenv("VAULT_CONNECT_TIMEOUT", "3.05"))
+read_timeout = float(os.getenv("VAULT_READ_TIMEOUT", "10"))
+
+# Thời hạn tổng (giây) của một thao tác đọc/ghi tới OpenBao, tính cả các lần thử lại
+read_deadline = float(os.getenv("VAULT_READ_DEADLINE", "5"))
+write_deadline = float(os.getenv("VAULT_WRITE_DEADLINE", "10"))
+# Số lần thử tối đa của thao tác idempotent và thời gian chờ (giây) giữa các lần
+# thử: ngẫu nhiên trong [0, min(retry_backoff_max, retry_backoff * 2^lần thử)]
+retry_attempts = int(os.getenv("VAULT_RETRY_ATTEMPTS", "3"))
+retry_backoff = float(os.getenv("VAULT_RETRY_BACKOFF", "0.05"))
+retry_backoff_max = float(os.getenv("VAULT_RETRY_BACKOFF_MAX", "1"))
+# Circuit breaker: mở sau số lỗi liên tiếp này và cho một request thử lại sau
+# breaker_reset_timeout giây
+breaker_failure_threshold = int(os.getenv("VAULT_BREAKER_FAILURE_THRESHOLD", "5"))
+breaker_reset_timeout = float(os.getenv("VAULT_BREAKER_RESET_TIMEOUT", "30"))
+
+# Giới hạn song song và thời hạn tổng (giây) khi đọc dữ liệu nhạy cảm theo lô
+batch_max_workers = int(os.getenv("VAULT_BATCH_MAX_WORKERS", "8"))
+batch_deadline = float(os.getenv("VAULT_BATCH_DEADLINE", "5"))
+
+# Cache đọc secret KV trong tiến trình (VAULT_CACHE_MAX_ENTRIES=0 để tắt)
+cache_max_entries = int(os.getenv("VAULT_CACHE_MAX_ENTRIES", "4096"))
+cache_max_bytes = int(os.getenv("VAULT_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+cache_ttl = float(os.getenv("VAULT_CACHE_TTL", "300"))
+# Sau bao nhiêu giây thì đối chiếu lại phiên bản với KV v2 metadata. Lần ghi ở
+# tiến trình khác chỉ được thấy qua bước này, nên đây là độ cũ tối đa giữa các
+# worker; 0 để tắt, khi đó độ cũ tối đa là VAULT_CACHE_TTL
+cache_revalidate_after = float(os.getenv("VAULT_CACHE_REVALIDATE_AFTER", "5"))
+cache_exclude_prefixes = [
+    prefix.strip()
+    for prefix in os.getenv("VAULT_CACHE_EXCLUDE_PREFIXES", "").split(",")
+    if prefix.strip()
+]
+# Gộp các lần đọc đồng thời cùng một secret thành một request tới Vault
+coalesce_reads = os.getenv("VAULT_COALESCE_READS", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Mật khẩu người dùng nằm ngay tại secret/<username> nên được bật/tắt riêng
+cache_passwords = os.getenv("VAULT_CACHE_PASSWORDS", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Cách lưu dữ liệu nhạy cảm: "packed" (một document/bản ghi), "per_field",
+# "transit" (ciphertext của transit engine nằm ngay trong cột *_key) hoặc
+# "envelope" (mã hóa cục bộ bằng data key lấy từ transit)
+sensitive_storage_mode = os.getenv("SENSITIVE_STORAGE_MODE", "packed")
+
+# Transit engine dùng cho chế độ "transit"
+transit_mount = os.getenv("VAULT_TRANSIT_MOUNT", "transit")
+transit_key = os.getenv("VAULT_TRANSIT_KEY", "openbao-app")
+transit_batch_size = int(os.getenv("VAULT_TRANSIT_BATCH_SIZE", "1000"))
+
+# Giới hạn vòng đời của data key dùng cho chế độ "envelope"
+envelope_key_max_age = float(os.getenv("ENVELOPE_KEY_MAX_AGE", "300"))
+envelope_key_max_uses = int(os.getenv("ENVELOPE_KEY_MAX_USES", "100000"))
+envelope_key_cache_size = int(os.getenv("ENVELOPE_KEY_CACHE_SIZE", "64"))
+
+# Băm mật khẩu người dùng: phương thức/độ khó của werkzeug, số luồng băm tối đa
+# và đường dẫn KV của pepper (để trống nếu không dùng pepper)
+password_hash_method = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+password_hash_workers = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+password_pepper_path = os.getenv("PASSWORD_PEPPER_PATH", "")
+
 
 def get_vault_addr():
     """
@@ -25,6 +95,91 @@ def get_headers():
     return headers
 
 
+def get_pool_settings():
+    """
+    Trả về cấu hình connection pool và timeout cho client HTTP tới Vault.
+    """
+    return {
+        "pool_connections": pool_connections,
+        "pool_maxsize": pool_maxsize,
+        "pool_block": pool_block,
+        "timeout": (connect_timeout, read_timeout),
+    }
+
+
+def get_resilience_settings():
+    """
+    Trả về thời hạn, cấu hình thử lại và circuit breaker cho các lời gọi tới Vault.
+    """
+    return {
+        "read_deadline": read_deadline,
+        "write_deadline": write_deadline,
+        "retry_attempts": retry_attempts,
+        "retry_backoff": retry_backoff,
+        "retry_backoff_max": retry_backoff_max,
+        "breaker_failure_threshold": breaker_failure_threshold,
+        "breaker_reset_timeout": breaker_reset_timeout,
+    }
+
+
+def get_batch_settings():
+    """
+    Trả về số luồng tối đa và thời hạn tổng mặc định cho các lần đọc theo lô.
+    """
+    return {"max_workers": batch_max_workers, "deadline": batch_deadline}
+
+
+def get_cache_settings():
+    """
+    Trả về cấu hình của cache secret trong tiến trình.
+    """
+    return {
+        "max_entries": cache_max_entries,
+        "max_bytes": cache_max_bytes,
+        "ttl": cache_ttl,
+        "revalidate_after": cache_revalidate_after,
+        "exclude_prefixes": cache_exclude_prefixes,
+        "cache_passwords": cache_passwords,
+        "coalesce_reads": coalesce_reads,
+    }
+
+
+def get_sensitive_storage_mode():
+    """
+    Trả về chế độ lưu dữ liệu nhạy cảm của Employee và Salary.
+    """
+    return sensitive_storage_mode
+
+
+def get_transit_settings():
+    """
+    Trả về mount, tên khóa và kích thước lô tối đa của transit engine.
+    """
+    return {"mount": transit_mount, "key": transit_key, "batch_size": transit_batch_size}
+
+
+def get_envelope_settings():
+    """
+    Trả về giới hạn tuổi, số lần dùng và số data key giải mã được giữ trong bộ nhớ.
+    """
+    return {
+        "max_age": envelope_key_max_age,
+        "max_uses": envelope_key_max_uses,
+        "cache_size": envelope_key_cache_size,
+    }
+
+
+def get_password_settings():
+    """
+    Trả về phương thức băm, số luồng băm và đường dẫn pepper của mật khẩu.
+    """
+    return {
+        "method": password_hash_method,
+        "workers": password_hash_workers,
+        "pepper_path": password_pepper_path,
+    }
+
+
 def get_secret(secret_name):
     """
     Truy xuất một secret từ Vault.
@@ -35,17 +190,10 @@ def get_secret(secret_name):
     Returns:
         dict: Dữ liệu của secret hoặc None nếu không tìm thấy.
     """
-    try:
-        url = f"{vault_addr}/v1/secret/data/{secret_name}"
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            return response.json().get("data", {}).get("data", None)
-        else:
-            print(f"Error retrieving secret: {response.status_code} - {response.text}")
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"Request error: {e}")
-        return None
+    # Import muộn: vault_client đọc cấu hình từ module này khi được import
+    from .vault_client import read_kv
+
+    return read_kv(secret_name)[0]
 
 
 def store_secret(secret_name, secret_data):
@@ -59,18 +207,9 @@ def store_secret(secret_name, secret_data):
     Returns:
         bool: True nếu lưu trữ thành công, ngược lại là False.
     """
-    try:
-        url = f"{vault_addr}/v1/secret/data/{secret_name}"
-        data = {"data": secret_data}
-        response = requests.post(url, headers=headers, json=data)
-        if response.status_code == 200 or response.status_code == 204:
-            return True
-        else:
-            print(f"Error storing secret: {response.status_code} - {response.text}")
-            return False
-    except requests.exceptions.RequestException as e:
-        print(f"Request error: {e}")
-        return False
+    from .vault_client import write_kv
+
+    return write_kv(secret_name, secret_data) is not None
 
 
 def delete_secret(secret_name):
@@ -83,14 +222,6 @@ def delete_secret(secret_name):
     Returns:
         bool: True nếu xóa thành công, ngược lại là False.
     """
-    try:
-        url = f"{vault_addr}/v1/secret/data/{secret_name}"
-        response = requests.delete(url, headers=headers)
-        if response.status_code == 204:
-            return True
-        else:
-            print(f"Error deleting secret: {response.status_code} - {response.text}")
-            return False
-    except requests.exceptions.RequestException as e:
-        print(f"Request error: {e}")
-        return False
+    from .vault_client import delete_kv
+
+    return delete_kv(secret_name)
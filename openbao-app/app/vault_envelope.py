@@ -0,0 +1,258 @@
+import base64
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from .vault_config import get_envelope_settings
+from .vault_transit import transit_decrypt_batch, transit_generate_data_key
+
+# Giá trị mã hóa có dạng "env:v2:<data key đã bọc>:<base64(nonce + ciphertext)>".
+# Data key đã bọc là ciphertext transit ("vault:vN:...") nên phần payload được
+# tách bằng dấu ":" cuối cùng. Ngữ cảnh của giá trị (bảng, bản ghi, trường) là
+# associated data của AES-GCM, nên ciphertext chép sang ô khác không giải mã được.
+ENVELOPE_PREFIX = "env:v2:"
+NONCE_SIZE = 12
+
+
+def is_envelope_ciphertext(value):
+    """Kiểm tra một giá trị cột có phải ciphertext envelope hay không."""
+    return isinstance(value, str) and value.startswith(ENVELOPE_PREFIX)
+
+
+def _associated_data(context):
+    return (context or "").encode("utf-8")
+
+
+class DataKeyManager:
+    """
+    Quản lý data key cho mã hóa envelope.
+
+    Data key dùng để mã hóa được lấy từ endpoint datakey của transit và chỉ
+    được giữ plaintext trong bộ nhớ; nó bị thay mới khi quá tuổi hoặc quá số
+    lần dùng. Các data key dùng để giải mã được giải bọc theo lô và giữ trong
+    một cache LRU có giới hạn kích thước và tuổi.
+
+    Args:
+        max_age (float): Tuổi tối đa của một data key, tính bằng giây.
+        max_uses (int): Số lần mã hóa tối đa với một data key.
+        cache_size (int): Số data key giải mã được giữ trong bộ nhớ.
+    """
+
+    def __init__(self, max_age=300, max_uses=100000, cache_size=64):
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self.cache_size = cache_size
+        self._current = None
+        self._unwrapped = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "key_fetches": 0,
+            "key_unwraps": 0,
+            "key_unwrap_requests": 0,
+            "local_encrypts": 0,
+            "local_decrypts": 0,
+        }
+
+    def _expired(self, entry, now):
+        return now - entry["created_at"] > self.max_age
+
+    def _usable_key(self, now):
+        current = self._current
+        if (
+            current is None
+            or self._expired(current, now)
+            or current["uses"] >= self.max_uses
+        ):
+            return None
+        return current
+
+    def _use(self, current):
+        current["uses"] += 1
+        self._stats["local_encrypts"] += 1
+        return current["cipher"], current["wrapped"]
+
+    def encryption_key(self):
+        """
+        Trả về (AESGCM, data key đã bọc) để mã hóa, lấy key mới khi cần.
+
+        Data key mới được lấy từ Vault ngoài khóa để các luồng đang mã hóa hoặc
+        giải mã bằng key trong bộ nhớ không phải chờ request đó.
+        """
+        with self._lock:
+            current = self._usable_key(time.monotonic())
+            if current is not None:
+                return self._use(current)
+
+        plaintext, wrapped = transit_generate_data_key()
+        if plaintext is None:
+            raise RuntimeError("Failed to fetch data key from Vault.")
+        now = time.monotonic()
+        with self._lock:
+            self._stats["key_fetches"] += 1
+            # Luồng khác có thể đã thay key trong lúc chờ; khi đó dùng key của nó
+            current = self._usable_key(now)
+            if current is None:
+                current = {
+                    "cipher": AESGCM(plaintext),
+                    "wrapped": wrapped,
+                    "created_at": now,
+                    "uses": 0,
+                }
+                self._current = current
+                self._remember(wrapped, current["cipher"], now)
+            return self._use(current)
+
+    def decryption_keys(self, wrapped_keys):
+        """
+        Trả về ánh xạ data key đã bọc -> AESGCM; các key chưa có trong cache được
+        giải bọc bằng một yêu cầu transit decrypt duy nhất.
+        """
+        now = time.monotonic()
+        ciphers = {}
+        missing = []
+        with self._lock:
+            for wrapped in dict.fromkeys(wrapped_keys):
+                entry = self._unwrapped.get(wrapped)
+                if entry is not None and not self._expired(entry, now):
+                    self._unwrapped.move_to_end(wrapped)
+                    ciphers[wrapped] = entry["cipher"]
+                else:
+                    missing.append(wrapped)
+        if missing:
+            plaintexts = transit_decrypt_batch(missing, raw=True)
+            with self._lock:
+                self._stats["key_unwrap_requests"] += 1
+                for wrapped, plaintext in zip(missing, plaintexts):
+                    if plaintext is None:
+                        continue
+                    self._stats["key_unwraps"] += 1
+                    ciphers[wrapped] = AESGCM(plaintext)
+                    self._remember(wrapped, ciphers[wrapped], now)
+        return ciphers
+
+    def count_decrypts(self, count):
+        with self._lock:
+            self._stats["local_decrypts"] += count
+
+    def _remember(self, wrapped, cipher, now):
+        self._unwrapped[wrapped] = {"cipher": cipher, "created_at": now}
+        self._unwrapped.move_to_end(wrapped)
+        while len(self._unwrapped) > self.cache_size:
+            self._unwrapped.popitem(last=False)
+
+    def clear(self):
+        """Xóa mọi data key khỏi bộ nhớ."""
+        with self._lock:
+            self._current = None
+            self._unwrapped.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Số lần lấy/giải bọc data key từ Vault so với số thao tác cục bộ.
+        """
+        with self._lock:
+            return dict(self._stats, cached_keys=len(self._unwrapped))
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_data_key_manager():
+    """Trả về DataKeyManager dùng chung cho toàn tiến trình."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = DataKeyManager(**get_envelope_settings())
+    return _manager
+
+
+def envelope_encrypt_batch(values, contexts=None):
+    """
+    Mã hóa cục bộ nhiều giá trị bằng data key hiện tại.
+
+    Args:
+        values (list): Các giá trị cần mã hóa; None được giữ nguyên.
+        contexts (list): Ngữ cảnh của từng giá trị (ví dụ
+            "employees:E001:email"), dùng làm associated data; phải được truyền
+            lại y hệt khi giải mã.
+
+    Returns:
+        list: Ciphertext envelope theo đúng thứ tự đầu vào.
+    """
+    manager = get_data_key_manager()
+    contexts = contexts or [None] * len(values)
+    results = []
+    for value, context in zip(values, contexts):
+        if value is None:
+            results.append(None)
+            continue
+        cipher, wrapped = manager.encryption_key()
+        nonce = os.urandom(NONCE_SIZE)
+        payload = nonce + cipher.encrypt(
+            nonce, str(value).encode("utf-8"), _associated_data(context)
+        )
+        results.append(
+            f"{ENVELOPE_PREFIX}{wrapped}:{base64.b64encode(payload).decode('ascii')}"
+        )
+    return results
+
+
+def _parse(value):
+    # Trả về (data key đã bọc, payload base64)
+    if not value:
+        return None
+    wrapped, _, payload = value[len(ENVELOPE_PREFIX) :].rpartition(":")
+    return wrapped, payload
+
+
+def envelope_decrypt_batch(values, contexts=None):
+    """
+    Giải mã cục bộ nhiều ciphertext envelope.
+
+    Vault chỉ được gọi (một lần) cho các data key chưa có trong cache.
+
+    Args:
+        values (list): Các ciphertext envelope, có thể chứa None.
+        contexts (list): Ngữ cảnh đã dùng khi mã hóa từng giá trị.
+
+    Returns:
+        list: Giá trị đã giải mã theo đúng thứ tự đầu vào (None nếu lỗi).
+    """
+    parsed = [_parse(value) for value in values]
+    contexts = contexts or [None] * len(values)
+    manager = get_data_key_manager()
+    ciphers = manager.decryption_keys(item[0] for item in parsed if item)
+    results = []
+    decrypted = 0
+    for item, context in zip(parsed, contexts):
+        cipher = ciphers.get(item[0]) if item else None
+        if cipher is None:
+            results.append(None)
+            continue
+        try:
+            # Giá trị hỏng chỉ làm hỏng chính nó, không làm hỏng cả lô
+            payload = base64.b64decode(item[1], validate=True)
+            plaintext = cipher.decrypt(
+                payload[:NONCE_SIZE],
+                payload[NONCE_SIZE:],
+                _associated_data(context),
+            )
+        except Exception as e:
+            print(f"Error decrypting envelope value: {e}")
+            results.append(None)
+            continue
+        results.append(plaintext.decode("utf-8"))
+        decrypted += 1
+    manager.count_decrypts(decrypted)
+    return results
+
+
+def get_envelope_stats():
+    """Trả về bộ đếm của DataKeyManager dùng chung."""
+    return get_data_key_manager().stats()
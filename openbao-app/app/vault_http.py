@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from . import vault_config
+
+# Bộ đếm hit/miss của connection pool, dùng chung cho toàn tiến trình
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "misses": 0}
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+# Các hàm được gọi sau mỗi request tới OpenBao (metrics, tracing, ...)
+_observers = []
+
+
+def _count(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def add_request_observer(observer):
+    """
+    Đăng ký hàm được gọi sau mỗi request HTTP tới OpenBao.
+
+    Mọi lời gọi (requests, hvac và client aiohttp) đều đi qua đây nên không cần
+    sửa từng helper.
+
+    Args:
+        observer (callable): Nhận (method, url, status, seconds); status là None
+            khi request lỗi kết nối hoặc timeout.
+    """
+    if observer not in _observers:
+        _observers.append(observer)
+
+
+def remove_request_observer(observer):
+    """Hủy đăng ký một observer đã thêm bằng add_request_observer()."""
+    if observer in _observers:
+        _observers.remove(observer)
+
+
+def notify_observers(method, url, status, seconds):
+    """Báo kết quả một request cho các observer; lỗi của observer bị bỏ qua."""
+    for observer in _observers:
+        try:
+            observer(method, url, status, seconds)
+        except Exception as e:
+            print(f"Error in Vault request observer: {e}")
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    """HTTPConnectionPool đếm số kết nối được tái sử dụng và số kết nối mới."""
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout=timeout)
+        _count("requests")
+        return conn
+
+    def _new_conn(self):
+        _count("misses")
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    """Phiên bản HTTPS của _CountingHTTPConnectionPool."""
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout=timeout)
+        _count("requests")
+        return conn
+
+    def _new_conn(self):
+        _count("misses")
+        return super()._new_conn()
+
+
+class PooledVaultAdapter(HTTPAdapter):
+    """
+    HTTPAdapter giữ kết nối keep-alive theo từng host và luôn áp dụng timeout.
+
+    Args:
+        timeout (tuple): (connect_timeout, read_timeout) mặc định cho mọi request.
+    """
+
+    def __init__(self, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        if not _observers:
+            return super().send(request, **kwargs)
+        started = time.perf_counter()
+        status = None
+        try:
+            response = super().send(request, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            notify_observers(
+                request.method, request.url, status, time.perf_counter() - started
+            )
+
+
+def _build_session():
+    settings = vault_config.get_pool_settings()
+    adapter = PooledVaultAdapter(
+        timeout=settings["timeout"],
+        pool_connections=settings["pool_connections"],
+        pool_maxsize=settings["pool_maxsize"],
+        pool_block=settings["pool_block"],
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session():
+    """
+    Trả về requests.Session dùng chung cho mọi lời gọi tới OpenBao.
+
+    Session được tạo lười ở lần gọi đầu tiên và tạo lại sau khi tiến trình
+    bị fork (ví dụ worker của gunicorn) để không chia sẻ socket giữa các tiến trình.
+
+    Returns:
+        requests.Session: Session có connection pool và timeout mặc định.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            _session = _build_session()
+            _session_pid = pid
+    return _session
+
+
+def get_pool_stats():
+    """
+    Trả về bộ đếm của connection pool.
+
+    Returns:
+        dict: Số request đã lấy kết nối, số lần tái sử dụng (hits)
+        và số kết nối TCP mới phải mở (misses).
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["hits"] = stats["requests"] - stats["misses"]
+    return stats
+
+
+def reset_pool_stats():
+    """Đặt lại bộ đếm của connection pool về 0."""
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
@@ -1,9 +1,8 @@
-import requests
-from .vault_config import get_vault_addr, get_headers
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
 
-# Lấy địa chỉ Vault và headers từ cấu hình
-vault_addr = get_vault_addr()
-headers = get_headers()
+from .vault_config import get_batch_settings, get_cache_settings
+from .vault_client import read_kv, write_kv, patch_kv, delete_kv, destroy_kv
 
 
 def store_password_in_vault(username, password):
@@ -17,20 +16,7 @@ def store_password_in_vault(username, password):
     Returns:
         bool: True nếu lưu trữ thành công, ngược lại là False.
     """
-    try:
-        url = f"{vault_addr}/v1/secret/data/{username}"
-        data = {"data": {"password": password}}
-        response = requests.post(url, headers=headers, json=data)
-        if response.status_code == 200 or response.status_code == 204:
-            return True
-        else:
-            print(
-                f"Error storing password in Vault: {response.status_code} - {response.text}"
-            )
-            return False
-    except requests.exceptions.RequestException as e:
-        print(f"Request error: {e}")
-        return False
+    return write_kv(username, {"password": password}) is not None
 
 
 def retrieve_password_from_vault(username):
@@ -43,20 +29,11 @@ def retrieve_password_from_vault(username):
     Returns:
         str: Mật khẩu của người dùng nếu truy xuất thành công, ngược lại là None.
     """
-    try:
-        url = f"{vault_addr}/v1/secret/data/{username}"
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            secret_data = response.json().get("data", {}).get("data", {})
-            return secret_data.get("password")
-        else:
-            print(
-                f"Error retrieving password from Vault: {response.status_code} - {response.text}"
-            )
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"Request error: {e}")
-        return None
+    # Mật khẩu chỉ được cache khi bật VAULT_CACHE_PASSWORDS
+    secret_data, _ = read_kv(
+        username, cacheable=get_cache_settings()["cache_passwords"]
+    )
+    return secret_data.get("password") if secret_data is not None else None
 
 
 def update_password_in_vault(username, new_password):
@@ -75,7 +52,8 @@ def update_password_in_vault(username, new_password):
 
 def delete_password_from_vault(username):
     """
-    Xóa mật khẩu của người dùng khỏi Vault.
+    Xóa vĩnh viễn mật khẩu của người dùng khỏi Vault (mọi phiên bản, để mật
+    khẩu dạng rõ không khôi phục được bằng undelete).
 
     Args:
         username (str): Tên người dùng.
@@ -83,70 +61,209 @@ def delete_password_from_vault(username):
     Returns:
         bool: True nếu xóa thành công, ngược lại là False.
     """
-    try:
-        url = f"{vault_addr}/v1/secret/data/{username}"
-        response = requests.delete(url, headers=headers)
-        if response.status_code == 204:
-            return True
-        else:
-            print(
-                f"Error deleting password from Vault: {response.status_code} - {response.text}"
-            )
-            return False
-    except requests.exceptions.RequestException as e:
-        print(f"Request error: {e}")
-        return False
+    return destroy_kv(username)
 
 
 def store_secret_in_vault(secret_path, secret_value):
     """Lưu trữ giá trị bí mật vào Vault."""
-    url = f"{vault_addr}/v1/secret/data/{secret_path}"
-    data = {"data": {"value": secret_value}}
-    response = requests.post(url, headers=headers, json=data)
-    if response.status_code in [200, 204]:
-        return secret_path  # Trả về đường dẫn bí mật làm khóa tham chiếu
-    else:
-        print(
-            f"Error storing secret in Vault: {response.status_code} - {response.text}"
-        )
-        return None
+    version = write_kv(secret_path, {"value": secret_value})
+    # Trả về đường dẫn bí mật làm khóa tham chiếu
+    return secret_path if version is not None else None
 
 
 def retrieve_secret_from_vault(secret_path):
     """Lấy giá trị bí mật từ Vault."""
-    url = f"{vault_addr}/v1/secret/data/{secret_path}"
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        return response.json().get("data", {}).get("data", {}).get("value")
-    else:
-        print(
-            f"Error retrieving secret from Vault: {response.status_code} - {response.text}"
-        )
-        return None
+    data, _ = retrieve_secret_document(secret_path)
+    return data.get("value") if data is not None else None
 
 
-def store_secret_in_vault(secret_path, secret_value):
-    """Lưu trữ giá trị bí mật vào Vault."""
-    url = f"{vault_addr}/v1/secret/data/{secret_path}"
-    data = {"data": {"value": secret_value}}
-    response = requests.post(url, headers=headers, json=data)
-    if response.status_code in [200, 204]:
-        return secret_path  # Trả về đường dẫn bí mật làm khóa tham chiếu
-    else:
-        print(
-            f"Error storing secret in Vault: {response.status_code} - {response.text}"
-        )
-        return None
+def make_secret_ref(document_path, field):
+    """
+    Tạo khóa tham chiếu tới một trường trong document bí mật.
+
+    Khóa có dạng "<document_path>#<field>" và được lưu trong các cột *_key.
+    """
+    return f"{document_path}#{field}"
 
 
-def retrieve_secret_from_vault(secret_path):
-    """Lấy giá trị bí mật từ Vault."""
-    url = f"{vault_addr}/v1/secret/data/{secret_path}"
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        return response.json().get("data", {}).get("data", {}).get("value")
-    else:
-        print(
-            f"Error retrieving secret from Vault: {response.status_code} - {response.text}"
-        )
+def split_secret_ref(secret_ref):
+    """
+    Tách khóa tham chiếu thành đường dẫn document và tên trường.
+
+    Khóa kiểu cũ (một secret cho mỗi trường, giá trị nằm trong "value")
+    không có dấu "#", khi đó tên trường trả về là None.
+
+    Returns:
+        tuple: (document_path, field)
+    """
+    path, sep, field = secret_ref.partition("#")
+    return path, (field if sep else None)
+
+
+def store_secret_document(secret_path, secret_data, cas=None):
+    """
+    Ghi toàn bộ một document bí mật (nhiều trường) vào Vault.
+
+    Args:
+        secret_path (str): Đường dẫn document.
+        secret_data (dict): Dữ liệu các trường.
+        cas (int): Phiên bản hiện tại để check-and-set; 0 nghĩa là chỉ ghi khi
+            document chưa tồn tại. None để ghi đè không điều kiện.
+
+    Returns:
+        int: Phiên bản mới của document, hoặc None nếu có lỗi xảy ra.
+    """
+    return write_kv(secret_path, secret_data, cas=cas)
+
+
+def store_secret_documents(documents, max_workers=None):
+    """
+    Ghi song song nhiều document bí mật.
+
+    Args:
+        documents (dict): Ánh xạ đường dẫn -> dữ liệu của document.
+        max_workers (int): Số request đồng thời tối đa.
+
+    Returns:
+        dict: Ánh xạ đường dẫn -> phiên bản mới (None nếu có lỗi xảy ra).
+    """
+    max_workers = max_workers or get_batch_settings()["max_workers"]
+    if len(documents) <= 1 or max_workers <= 1:
+        return {path: store_secret_document(path, data) for path, data in documents.items()}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(documents))) as executor:
+        paths = list(documents)
+        # Mỗi tác vụ chạy trong bản sao context của request (span tracing hiện tại)
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run,
+                store_secret_document,
+                path,
+                documents[path],
+            )
+            for path in paths
+        ]
+        versions = [future.result() for future in futures]
+        return dict(zip(paths, versions))
+
+
+def destroy_secret_documents(secret_paths, max_workers=None):
+    """
+    Xóa vĩnh viễn (mọi phiên bản) nhiều document bí mật song song.
+
+    Args:
+        secret_paths (iterable): Các đường dẫn document.
+        max_workers (int): Số request đồng thời tối đa.
+
+    Returns:
+        dict: Ánh xạ đường dẫn -> True nếu xóa thành công.
+    """
+    paths = list(dict.fromkeys(secret_paths))
+    max_workers = max_workers or get_batch_settings()["max_workers"]
+    if len(paths) <= 1 or max_workers <= 1:
+        return {path: destroy_kv(path) for path in paths}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, destroy_kv, path)
+            for path in paths
+        ]
+        return dict(zip(paths, (future.result() for future in futures)))
+
+
+def patch_secret_document(secret_path, secret_data, cas=None):
+    """
+    Cập nhật một phần document bí mật bằng KV v2 patch.
+
+    Args:
+        secret_path (str): Đường dẫn document.
+        secret_data (dict): Các trường cần cập nhật.
+        cas (int): Phiên bản hiện tại để check-and-set, hoặc None.
+
+    Returns:
+        int: Phiên bản mới của document, hoặc None nếu có lỗi xảy ra
+        (kể cả khi phiên bản cas không còn khớp).
+    """
+    return patch_kv(secret_path, secret_data, cas=cas)
+
+
+def retrieve_secret_document(secret_path):
+    """
+    Đọc một document bí mật từ Vault.
+
+    Returns:
+        tuple: (dữ liệu, phiên bản) hoặc (None, None) nếu có lỗi xảy ra.
+    """
+    return read_kv(secret_path)
+
+
+def retrieve_secret_documents(secret_paths, max_workers=None, deadline=None):
+    """
+    Đọc song song nhiều document bí mật, mỗi đường dẫn chỉ đọc một lần.
+
+    Args:
+        secret_paths (iterable): Các đường dẫn document, có thể trùng lặp.
+        max_workers (int): Số request tối đa chạy đồng thời trong lần gọi này.
+        deadline (float): Thời hạn tổng tính bằng giây; các document chưa đọc
+            xong khi hết hạn sẽ có giá trị None.
+
+    Returns:
+        dict: Ánh xạ đường dẫn -> dữ liệu (None nếu lỗi hoặc quá hạn).
+    """
+    settings = get_batch_settings()
+    max_workers = max_workers or settings["max_workers"]
+    deadline = settings["deadline"] if deadline is None else deadline
+    paths = list(dict.fromkeys(secret_paths))
+    if len(paths) <= 1 or max_workers <= 1:
+        return {path: retrieve_secret_document(path)[0] for path in paths}
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(paths)))
+    try:
+        futures = {
+            executor.submit(
+                contextvars.copy_context().run, retrieve_secret_document, path
+            ): path
+            for path in paths
+        }
+        done, not_done = wait(futures, timeout=deadline)
+        if not_done:
+            print(f"Vault batch read deadline exceeded: {len(not_done)} pending")
+        documents = dict.fromkeys(paths)
+        for future in done:
+            documents[futures[future]] = future.result()[0]
+        return documents
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def retrieve_secret_refs(secret_refs, max_workers=1, deadline=None):
+    """
+    Giải một danh sách khóa tham chiếu thành giá trị, mỗi document chỉ đọc một lần.
+
+    Hỗ trợ cả khóa dạng document ("<path>#<field>") lẫn khóa kiểu cũ
+    (một secret cho mỗi trường).
+
+    Args:
+        secret_refs (list): Các khóa tham chiếu, có thể chứa None.
+        max_workers (int): Số request đồng thời tối đa; mặc định đọc tuần tự.
+        deadline (float): Thời hạn tổng khi đọc song song, tính bằng giây.
+
+    Returns:
+        list: Giá trị tương ứng theo đúng thứ tự đầu vào (None nếu không đọc được).
+    """
+    paths = [split_secret_ref(secret_ref)[0] for secret_ref in secret_refs if secret_ref]
+    documents = retrieve_secret_documents(paths, max_workers, deadline)
+    return [resolve_secret_ref(secret_ref, documents) for secret_ref in secret_refs]
+
+
+def resolve_secret_ref(secret_ref, documents):
+    """
+    Lấy giá trị của một khóa tham chiếu từ các document đã đọc sẵn.
+
+    Args:
+        secret_ref (str): Khóa tham chiếu, có thể là None.
+        documents (dict): Ánh xạ đường dẫn document -> dữ liệu (hoặc None).
+    """
+    if not secret_ref:
         return None
+    path, field = split_secret_ref(secret_ref)
+    data = documents.get(path) or {}
+    return data.get(field or "value")
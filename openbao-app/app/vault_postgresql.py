@@ -1,27 +1,89 @@
 import requests
-from .vault_config import get_vault_addr, get_headers
+from . import vault_client
 import psycopg2
 
-# Lấy địa chỉ Vault và headers từ cấu hình
-vault_addr = get_vault_addr()
-headers = get_headers()
+# Định nghĩa role cấp thông tin đăng nhập động cho ứng dụng
+POSTGRESQL_ROLE = {
+    "db_name": "my-postgresql-database",  # Tên của cấu hình cơ sở dữ liệu
+    "creation_statements": [
+        "CREATE ROLE \"{{name}}\" WITH LOGIN PASSWORD '{{password}}';",
+        'GRANT SELECT, INSERT, UPDATE, DELETE ON ALL TABLES IN SCHEMA public TO "{{name}}";',
+        'GRANT USAGE, SELECT ON ALL SEQUENCES IN SCHEMA public TO "{{name}}";',
+    ],
+    "default_ttl": "1h",
+    "max_ttl": "24h",
+}
 
 
-def configure_postgresql():
+def postgresql_config_exists():
     """
-    Cấu hình plugin PostgreSQL trong OpenBao.
+    Kiểm tra cấu hình PostgreSQL đã tồn tại trong OpenBao hay chưa.
+
+    Returns:
+        bool: True nếu cấu hình đã tồn tại, False nếu chưa, None nếu có lỗi xảy ra.
     """
     try:
-        # Kiểm tra xem cấu hình PostgreSQL đã tồn tại hay chưa
-        response = requests.get(
-            f"{vault_addr}/v1/database/config/my-postgresql-database", headers=headers
+        response = vault_client.request("GET", "database/config/my-postgresql-database")
+        if response.status_code == 200:
+            return True
+        if response.status_code == 404:
+            return False
+        print(
+            f"Error checking PostgreSQL configuration: {response.status_code} - {response.text}"
         )
+        return None
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return None
+
+
+def postgresql_role_exists():
+    """
+    Kiểm tra role PostgreSQL đã tồn tại trong OpenBao với định nghĩa hiện tại
+    hay chưa.
+
+    Role đã có nhưng khác cấu hình (ví dụ role cũ chỉ được cấp quyền SELECT)
+    được coi là chưa có để create_postgresql_role() ghi lại định nghĩa mới.
+
+    Returns:
+        bool: True nếu role đã tồn tại và khớp POSTGRESQL_ROLE, False nếu chưa,
+        None nếu có lỗi xảy ra.
+    """
+    try:
+        response = vault_client.request("GET", "database/roles/my-role")
         if response.status_code == 200:
+            role = response.json().get("data", {})
+            return all(
+                role.get(field) == POSTGRESQL_ROLE[field]
+                for field in ("db_name", "creation_statements")
+            )
+        if response.status_code == 404:
+            return False
+        print(f"Error checking role: {response.status_code} - {response.text}")
+        return None
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return None
+
+
+def configure_postgresql(exists=None):
+    """
+    Cấu hình plugin PostgreSQL trong OpenBao.
+
+    Args:
+        exists (bool): Kết quả kiểm tra trước đó của postgresql_config_exists();
+            nếu None thì sẽ tự kiểm tra.
+
+    Returns:
+        bool: True nếu cấu hình đã có hoặc được tạo thành công, ngược lại là False.
+    """
+    try:
+        # Kiểm tra xem cấu hình PostgreSQL đã tồn tại hay chưa
+        if exists is None:
+            exists = postgresql_config_exists()
+        if exists:
             print("PostgreSQL configuration already exists.")
-            return
-        else:
-            print(f"Configuration not found. Status code: {response.status_code}")
-            print(f"Response: {response.text}")
+            return True
 
         # Dữ liệu cấu hình PostgreSQL
         data = {
@@ -35,49 +97,55 @@ def configure_postgresql():
         }
 
         # Gửi yêu cầu cấu hình đến Vault
-        response = requests.post(
-            f"{vault_addr}/v1/database/config/my-postgresql-database",
-            headers=headers,
-            json=data,
+        response = vault_client.request(
+            "POST", "database/config/my-postgresql-database", json=data
         )
         if response.status_code == 204:
             print("PostgreSQL database configured successfully.")
+            return True
         else:
             print(
                 f"Error configuring PostgreSQL: {response.status_code} - {response.text}"
             )
+            return False
 
     except requests.exceptions.RequestException as e:
         print(f"Request error: {e}")
+        return False
 
 
-def create_postgresql_role():
+def create_postgresql_role(exists=None):
     """
-    Tạo một role cho PostgreSQL trong OpenBao.
+    Tạo một role cho PostgreSQL trong OpenBao, hoặc ghi lại role đã có nhưng
+    khác POSTGRESQL_ROLE (ghi role là thao tác idempotent).
+
+    Args:
+        exists (bool): Kết quả kiểm tra trước đó của postgresql_role_exists();
+            nếu None thì sẽ tự kiểm tra.
+
+    Returns:
+        bool: True nếu role đã khớp hoặc được ghi thành công, ngược lại là False.
     """
     try:
-        data = {
-            "db_name": "my-postgresql-database",  # Tên của cấu hình cơ sở dữ liệu
-            "creation_statements": [
-                "CREATE ROLE \"{{name}}\" WITH LOGIN PASSWORD '{{password}}';",
-                'GRANT SELECT ON ALL TABLES IN SCHEMA public TO "{{name}}";',
-            ],
-            "default_ttl": "1h",
-            "max_ttl": "24h",
-        }
+        if exists is None:
+            exists = postgresql_role_exists()
+        if exists:
+            print("Role for PostgreSQL is up to date.")
+            return True
 
-        # Gửi yêu cầu tạo role đến Vault
-        response = requests.post(
-            f"{vault_addr}/v1/database/roles/my-role",
-            headers=headers,
-            json=data,
+        # Gửi yêu cầu tạo (hoặc ghi đè) role đến Vault
+        response = vault_client.request(
+            "POST", "database/roles/my-role", json=POSTGRESQL_ROLE
         )
         if response.status_code == 204:
             print("Role for PostgreSQL created successfully.")
+            return True
         else:
             print(f"Error creating role: {response.status_code} - {response.text}")
+            return False
     except requests.exceptions.RequestException as e:
         print(f"Request error: {e}")
+        return False
 
 
 def generate_postgresql_credentials():
@@ -88,9 +156,10 @@ def generate_postgresql_credentials():
         dict: Thông tin đăng nhập PostgreSQL hoặc None nếu có lỗi xảy ra.
     """
     try:
-        # Gửi yêu cầu tạo thông tin đăng nhập đến Vault
-        response = requests.get(
-            f"{vault_addr}/v1/database/creds/my-role", headers=headers
+        # Gửi yêu cầu tạo thông tin đăng nhập đến Vault; mỗi lần gọi tạo một
+        # lease mới nên không được thử lại
+        response = vault_client.request(
+            "GET", "database/creds/my-role", idempotent=False
         )
         if response.status_code == 200:
             credentials = response.json().get("data", {})
@@ -106,6 +175,90 @@ def generate_postgresql_credentials():
         return None
 
 
+def generate_postgresql_lease(role="my-role"):
+    """
+    Tạo thông tin đăng nhập tạm thời cho PostgreSQL kèm thông tin lease.
+
+    Args:
+        role (str): Tên role database trong OpenBao.
+
+    Returns:
+        dict: Gồm username, password, lease_id, lease_duration (giây) và
+        renewable, hoặc None nếu có lỗi xảy ra.
+    """
+    try:
+        response = vault_client.request(
+            "GET", f"database/creds/{role}", idempotent=False
+        )
+        if response.status_code == 200:
+            body = response.json()
+            data = body.get("data", {})
+            return {
+                "username": data.get("username"),
+                "password": data.get("password"),
+                "lease_id": body.get("lease_id"),
+                "lease_duration": body.get("lease_duration", 0),
+                "renewable": body.get("renewable", False),
+            }
+        else:
+            print(
+                f"Error generating credentials: {response.status_code} - {response.text}"
+            )
+            return None
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return None
+
+
+def renew_lease(lease_id, increment=None):
+    """
+    Gia hạn một lease trong OpenBao.
+
+    Args:
+        lease_id (str): ID của lease.
+        increment (int): Thời gian gia hạn mong muốn (giây).
+
+    Returns:
+        int: lease_duration mới (giây), hoặc None nếu không gia hạn được.
+    """
+    try:
+        data = {"lease_id": lease_id}
+        if increment:
+            data["increment"] = increment
+        response = vault_client.request(
+            "PUT", "sys/leases/renew", idempotent=True, json=data
+        )
+        if response.status_code == 200:
+            return response.json().get("lease_duration")
+        else:
+            print(f"Error renewing lease: {response.status_code} - {response.text}")
+            return None
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return None
+
+
+def revoke_lease(lease_id):
+    """
+    Thu hồi một lease trong OpenBao.
+
+    Returns:
+        bool: True nếu thu hồi thành công, ngược lại là False.
+    """
+    try:
+        response = vault_client.request(
+            "PUT", "sys/leases/revoke", idempotent=True, json={"lease_id": lease_id}
+        )
+        if response.status_code == 204:
+            return True
+        else:
+            print(f"Error revoking lease: {response.status_code} - {response.text}")
+            return False
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return False
+
+
 def query_postgresql(username, password):
     """
     Kết nối đến PostgreSQL và thực hiện truy vấn.
@@ -138,13 +291,3 @@ def query_postgresql(username, password):
         if connection:
             cursor.close()
             connection.close()
-
-
-# Cấu hình PostgreSQL khi khởi động
-configure_postgresql()
-create_postgresql_role()
-
-# Tạo thông tin đăng nhập PostgreSQL và thực hiện truy vấn mẫu
-credentials = generate_postgresql_credentials()
-if credentials:
-    query_postgresql(credentials["username"], credentials["password"])
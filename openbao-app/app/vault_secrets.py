@@ -1,9 +1,5 @@
 import requests
-from .vault_config import get_vault_addr, get_headers
-
-# Lấy địa chỉ Vault và headers từ cấu hình
-vault_addr = get_vault_addr()
-headers = get_headers()
+from . import vault_client
 
 
 def list_mounted_secrets():
@@ -14,7 +10,7 @@ def list_mounted_secrets():
         dict: Danh sách các secret engines hoặc None nếu có lỗi xảy ra.
     """
     try:
-        response = requests.get(f"{vault_addr}/v1/sys/mounts", headers=headers)
+        response = vault_client.request("GET", "sys/mounts")
         if response.status_code == 200:
             mounts = response.json()
             # Lọc chỉ những mục có cấu trúc giống secret engine
@@ -43,9 +39,7 @@ def enable_secret_engine(engine_name, engine_type):
     """
     try:
         data = {"type": engine_type}
-        response = requests.post(
-            f"{vault_addr}/v1/sys/mounts/{engine_name}", headers=headers, json=data
-        )
+        response = vault_client.request("POST", f"sys/mounts/{engine_name}", json=data)
         if response.status_code == 204:
             print(
                 f"Secret engine '{engine_name}' of type '{engine_type}' enabled successfully."
@@ -71,17 +65,7 @@ def read_secret(secret_path):
     Returns:
         dict: Dữ liệu của secret hoặc None nếu có lỗi xảy ra.
     """
-    try:
-        url = f"{vault_addr}/v1/secret/data/{secret_path}"
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            return response.json().get("data", {}).get("data", None)
-        else:
-            print(f"Error retrieving secret: {response.status_code} - {response.text}")
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"Request error: {e}")
-        return None
+    return vault_client.read_kv(secret_path)[0]
 
 
 def write_secret(secret_path, secret_data):
@@ -95,24 +79,7 @@ def write_secret(secret_path, secret_data):
     Returns:
         bool: True nếu ghi secret thành công, ngược lại là False.
     """
-    try:
-        url = f"{vault_addr}/v1/secret/data/{secret_path}"
-        data = {"data": secret_data}
-        response = requests.post(url, headers=headers, json=data)
-        if response.status_code == 200 or response.status_code == 204:
-            print(f"Secret at '{secret_path}' written successfully.")
-            return True
-        else:
-            print(f"Error writing secret: {response.status_code} - {response.text}")
-            return False
-    except requests.exceptions.RequestException as e:
-        print(f"Request error: {e}")
+    if vault_client.write_kv(secret_path, secret_data) is None:
         return False
-
-
-# Kiểm tra các secret engines đã được kích hoạt
-mounted_secrets = list_mounted_secrets()
-if mounted_secrets:
-    print("Mounted Secret Engines:")
-    for mount, details in mounted_secrets.items():
-        print(f"- Path: {mount}, Type: {details['type']}")
+    print(f"Secret at '{secret_path}' written successfully.")
+    return True
@@ -0,0 +1,197 @@
+import base64
+
+import requests
+from . import vault_client
+from .vault_config import get_transit_settings
+
+TRANSIT_PREFIX = "vault:v"
+
+
+def is_transit_ciphertext(value):
+    """Kiểm tra một giá trị cột có phải ciphertext của transit engine hay không."""
+    return isinstance(value, str) and value.startswith(TRANSIT_PREFIX)
+
+
+def ciphertext_key_version(ciphertext):
+    """
+    Trả về phiên bản khóa đã dùng để mã hóa ciphertext ("vault:v3:..." -> 3).
+    """
+    return int(ciphertext[len(TRANSIT_PREFIX) :].split(":", 1)[0])
+
+
+def _encode(value):
+    return base64.b64encode(str(value).encode("utf-8")).decode("ascii")
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _transit_batch(operation, batch_input, key_name):
+    """
+    Gửi một yêu cầu batch_input tới transit engine.
+
+    Khi một phần tử lỗi, transit mặc định trả về 400 cho cả lô; yêu cầu đặt
+    partial_failure_response_code để vẫn nhận 200 kèm lỗi của từng phần tử.
+    Máy chủ không hỗ trợ tham số này vẫn trả batch_results trong body 400.
+
+    Returns:
+        list: batch_results tương ứng, hoặc None nếu có lỗi xảy ra.
+    """
+    settings = get_transit_settings()
+    try:
+        path = f"{settings['mount']}/{operation}/{key_name or settings['key']}"
+        # encrypt/decrypt/rewrap không đổi trạng thái nên được phép thử lại
+        response = vault_client.request(
+            "POST",
+            path,
+            idempotent=True,
+            json={"batch_input": batch_input, "partial_failure_response_code": 200},
+        )
+        if response.status_code in (200, 400):
+            try:
+                batch_results = response.json().get("data", {}).get("batch_results")
+            except ValueError:
+                batch_results = None
+            if batch_results is not None:
+                return batch_results
+        if response.status_code == 200:
+            return []
+        else:
+            print(
+                f"Error calling transit {operation}: {response.status_code} - {response.text}"
+            )
+            return None
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return None
+
+
+def transit_encrypt_batch(plaintexts, key_name=None):
+    """
+    Mã hóa nhiều giá trị bằng một yêu cầu batch tới transit engine.
+
+    Args:
+        plaintexts (list): Các giá trị cần mã hóa; None được giữ nguyên.
+        key_name (str): Tên khóa transit, mặc định lấy từ cấu hình.
+
+    Returns:
+        list: Ciphertext theo đúng thứ tự đầu vào (None nếu lỗi).
+    """
+    results = [None] * len(plaintexts)
+    indexes = [index for index, value in enumerate(plaintexts) if value is not None]
+    for chunk in _chunks(indexes, get_transit_settings()["batch_size"]):
+        batch = _transit_batch(
+            "encrypt", [{"plaintext": _encode(plaintexts[i])} for i in chunk], key_name
+        )
+        if batch is None:
+            continue
+        for index, item in zip(chunk, batch):
+            if item.get("error"):
+                print(f"Error encrypting value: {item['error']}")
+            else:
+                results[index] = item.get("ciphertext")
+    return results
+
+
+def transit_decrypt_batch(ciphertexts, key_name=None, raw=False):
+    """
+    Giải mã nhiều ciphertext bằng một yêu cầu batch; ciphertext trùng chỉ gửi một lần.
+
+    Args:
+        ciphertexts (list): Các ciphertext, có thể chứa None.
+        key_name (str): Tên khóa transit, mặc định lấy từ cấu hình.
+        raw (bool): True để trả về bytes thay vì chuỗi UTF-8 (ví dụ data key).
+
+    Returns:
+        list: Giá trị đã giải mã theo đúng thứ tự đầu vào (None nếu lỗi).
+    """
+    unique = list(dict.fromkeys(value for value in ciphertexts if value))
+    plaintexts = {}
+    for chunk in _chunks(unique, get_transit_settings()["batch_size"]):
+        batch = _transit_batch(
+            "decrypt", [{"ciphertext": value} for value in chunk], key_name
+        )
+        if batch is None:
+            continue
+        for ciphertext, item in zip(chunk, batch):
+            if item.get("error"):
+                print(f"Error decrypting value: {item['error']}")
+            else:
+                plaintext = base64.b64decode(item.get("plaintext", ""))
+                plaintexts[ciphertext] = plaintext if raw else plaintext.decode("utf-8")
+    return [plaintexts.get(value) if value else None for value in ciphertexts]
+
+
+def transit_rewrap_batch(ciphertexts, key_name=None):
+    """
+    Mã hóa lại các ciphertext bằng phiên bản khóa mới nhất mà không lộ plaintext.
+
+    Returns:
+        list: Ciphertext mới theo đúng thứ tự đầu vào (None nếu lỗi).
+    """
+    results = [None] * len(ciphertexts)
+    indexes = [index for index, value in enumerate(ciphertexts) if value]
+    for chunk in _chunks(indexes, get_transit_settings()["batch_size"]):
+        batch = _transit_batch(
+            "rewrap", [{"ciphertext": ciphertexts[i]} for i in chunk], key_name
+        )
+        if batch is None:
+            continue
+        for index, item in zip(chunk, batch):
+            if item.get("error"):
+                print(f"Error rewrapping value: {item['error']}")
+            else:
+                results[index] = item.get("ciphertext")
+    return results
+
+
+def transit_generate_data_key(bits=256, key_name=None):
+    """
+    Sinh một data key mới từ endpoint datakey của transit engine.
+
+    Returns:
+        tuple: (plaintext bytes, ciphertext đã được bọc bởi khóa transit),
+        hoặc (None, None) nếu có lỗi xảy ra.
+    """
+    settings = get_transit_settings()
+    try:
+        path = f"{settings['mount']}/datakey/plaintext/{key_name or settings['key']}"
+        response = vault_client.request(
+            "POST", path, idempotent=True, json={"bits": bits}
+        )
+        if response.status_code == 200:
+            data = response.json().get("data", {})
+            return base64.b64decode(data["plaintext"]), data["ciphertext"]
+        else:
+            print(
+                f"Error generating data key: {response.status_code} - {response.text}"
+            )
+            return None, None
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return None, None
+
+
+def get_transit_key_version(key_name=None):
+    """
+    Đọc phiên bản mới nhất của khóa transit.
+
+    Returns:
+        int: latest_version của khóa, hoặc None nếu có lỗi xảy ra.
+    """
+    settings = get_transit_settings()
+    try:
+        path = f"{settings['mount']}/keys/{key_name or settings['key']}"
+        response = vault_client.request("GET", path)
+        if response.status_code == 200:
+            return response.json().get("data", {}).get("latest_version")
+        else:
+            print(
+                f"Error reading transit key: {response.status_code} - {response.text}"
+            )
+            return None
+    except requests.exceptions.RequestException as e:
+        print(f"Request error: {e}")
+        return None
@@ -1,4 +1,16 @@
-from flask import Blueprint, render_template, redirect, url_for, request, flash, session
+from flask import (
+    Blueprint,
+    render_template,
+    redirect,
+    url_for,
+    request,
+    flash,
+    session,
+    jsonify,
+    Response,
+    stream_with_context,
+    current_app,
+)
 from app.models import (
     db,
     Users,
@@ -15,18 +27,21 @@ from app.forms import (
     PositionForm,
     SalaryForm,
     AttendanceForm,
+    ImportEmployeesForm,
 )
 from .controllers import get_secret
-import hvac
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from .bulk_import import import_employees_upload
+from .bulk_export import CONTENT_TYPES, iter_employee_export
+from .employee_directory import get_employee_directory
+from .attendance_ingest import get_attendance_ingester
+from .attendance_summary import get_summary
+from .payroll import run_payroll
+from .tracing import trace_span
+from .vault_config import get_batch_settings
+import hmac
+import json
+from datetime import date
 
-# Khởi tạo Vault client
-vault_addr = os.getenv("VAULT_ADDR", "http://127.0.0.1:8200")
-vault_token = os.getenv("VAULT_TOKEN", "s.vBZzrwXBqW0MpdJ1Oh57gKhK")
-client = hvac.Client(url=vault_addr, token=vault_token)
 main = Blueprint("main", __name__)
 
 
@@ -51,13 +66,16 @@ def register():
 
 
 @main.route("/login", methods=["GET", "POST"])
-def login():
+async def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = Users.query.filter_by(username=form.username.data).first()
-        if user is None or not user.check_password(form.password.data):
+        if user is None or not await user.check_password_async(form.password.data):
             flash("Invalid username or password")
             return redirect(url_for("main.login"))
+        # Lưu chuỗi băm mới nếu người dùng vừa được chuyển đổi hoặc băm lại
+        if db.session.is_modified(user):
+            db.session.commit()
         session["username"] = user.username
         return redirect(url_for("main.index"))
     return render_template("login.html", form=form)
@@ -80,9 +98,11 @@ def manage_employees():
 
 
 @main.route("/add_employee", methods=["GET", "POST"])
-def add_employee():
+async def add_employee():
     form = EmployeeForm()
-    if form.validate_on_submit():
+    with trace_span("validate_form", form="EmployeeForm"):
+        valid = form.validate_on_submit()
+    if valid:
         new_employee = Employee(
             employee_id=form.employee_id.data,
             name=form.name.data,
@@ -93,7 +113,7 @@ def add_employee():
         )
 
         # Lưu dữ liệu nhạy cảm vào Vault
-        new_employee.set_sensitive_data(
+        await new_employee.set_sensitive_data_async(
             phone_number=form.phone_number.data,
             email=form.email.data,
             position=form.position.data,
@@ -101,7 +121,8 @@ def add_employee():
         )
 
         db.session.add(new_employee)
-        db.session.commit()
+        with trace_span("db.commit"):
+            db.session.commit()
 
         flash("Employee added successfully!")
         # Sử dụng đúng endpoint đã đăng ký
@@ -110,6 +131,68 @@ def add_employee():
     return render_template("add_employee.html", form=form)
 
 
+@main.route("/employees/import", methods=["POST"])
+def import_employees():
+    # Nhập nhân viên từ file CSV/JSONL được tải lên (trường "file"); tham số
+    # format và batch_size là tùy chọn. Form phải kèm csrf_token.
+    if "username" not in session:
+        return redirect(url_for("main.login"))
+    form = ImportEmployeesForm()
+    if not form.validate_on_submit():
+        return jsonify({"error": "invalid import request", "fields": form.errors}), 400
+    result = import_employees_upload(
+        form.file.data,
+        fmt=form.format.data or None,
+        batch_size=form.batch_size.data or 500,
+    )
+    return jsonify(result)
+
+
+@main.route("/employees/directory")
+def employee_directory():
+    # Danh bạ (id, name) phân trang; có tham số q thì tìm theo tiền tố tên
+    directory = get_employee_directory()
+    limit = min(request.args.get("limit", 20, type=int), 200)
+    query = request.args.get("q", "").strip()
+    if query:
+        items = directory.search(query, limit=limit)
+    else:
+        items = directory.page(request.args.get("offset", 0, type=int), limit)
+    return jsonify(
+        {
+            "total": len(directory),
+            "items": [{"id": key, "name": name} for key, name in items],
+        }
+    )
+
+
+@main.route("/employees/export")
+def export_employees():
+    # Xuất toàn bộ nhân viên kèm dữ liệu nhạy cảm dưới dạng response chunked.
+    # Chỉ người dùng đã đăng nhập mới được xuất dữ liệu nhạy cảm
+    if "username" not in session:
+        return redirect(url_for("main.login"))
+    fmt = request.args.get("format", "csv")
+    if fmt not in CONTENT_TYPES:
+        return jsonify({"error": f"unsupported format: {fmt}"}), 400
+    # Số request Vault đồng thời không vượt quá giới hạn cấu hình, để một
+    # request không thể mở hàng nghìn kết nối tới Vault
+    limit = get_batch_settings()["max_workers"]
+    max_workers = request.args.get("max_workers", limit, type=int)
+    chunks = iter_employee_export(
+        fmt,
+        batch_size=max(1, request.args.get("batch_size", 500, type=int)),
+        max_workers=min(max(1, max_workers), limit),
+    )
+    return Response(
+        stream_with_context(chunks),
+        mimetype=CONTENT_TYPES[fmt],
+        headers={
+            "Content-Disposition": f"attachment; filename=employees.{fmt}",
+        },
+    )
+
+
 @main.route("/departments", methods=["GET", "POST"])
 def manage_departments():
     form = DepartmentForm()
@@ -156,36 +239,51 @@ def manage_positions():
 
 @main.route("/secrets")
 def secret_view():
-    try:
-        secret_path = "my-secret"
-        secret = client.secrets.kv.v2.read_secret_version(path=secret_path)
-        secret_data = secret["data"]["data"]
-        return render_template("secret.html", data=secret_data)
-    except Exception as e:
-        flash(f"Could not retrieve secret: {e}", "danger")
+    # Đọc qua client Vault chung (cache, thời hạn, thử lại và circuit breaker)
+    secret_data = get_secret("my-secret")
+    if secret_data is None:
+        flash("Could not retrieve secret", "danger")
         return render_template("secret.html")
+    return render_template("secret.html", data=secret_data)
 
 
 @main.route("/add_salary", methods=["GET", "POST"])
-def add_salary():
+async def add_salary():
     form = SalaryForm()
     if form.validate_on_submit():
-        new_salary = Salary(
-            salary_id=form.salary_id.data, employee_id=form.employee_id.data
-        )
-
-        # Lưu dữ liệu lương vào Vault
-        new_salary.set_salary_data(
+        employee_id = int(form.employee_id.data)
+        month = int(form.month.data)
+        year = int(form.year.data)
+        salary = Salary.query.filter_by(
+            employee_id=employee_id, year=year, month=month
+        ).first()
+        if salary is None:
+            salary = Salary(
+                salary_id=Salary.make_salary_id(employee_id, year, month),
+                employee_id=employee_id,
+                month=month,
+                year=year,
+            )
+            db.session.add(salary)
+
+        # Lưu dữ liệu lương vào Vault; hệ số lấy theo chức vụ khi tính lương
+        await salary.set_salary_data_async(
             basic_salary=form.basic_salary.data,
-            salary_coefficient=form.salary_coefficient.data,
-            total_salary=form.total_salary.data,
+            salary_coefficient=None,
+            total_salary=None,
+            bonus=form.bonus.data,
+            deduction=form.deduction.data,
         )
-
-        db.session.add(new_salary)
         db.session.commit()
 
+        # Tính ngay lương thực nhận của bảng lương vừa nhập
+        result = run_payroll(year, month, employee_ids=[employee_id])
+        if result["skipped"]:
+            missing = ", ".join(result["skipped_reasons"])
+            flash(f"Total salary was not computed, missing: {missing}")
+
         flash("Salary information added successfully!")
-        return redirect(url_for("main.salary_list"))
+        return redirect(url_for("main.index"))
 
     return render_template("add_salary.html", form=form)
 
@@ -194,15 +292,96 @@ def add_salary():
 def manage_attendances():
     form = AttendanceForm()
     if form.validate_on_submit():
-        # Xử lý logic lưu trữ hoặc cập nhật thông tin chấm công
+        # Lưu chấm công qua cùng đường ghi với API nhận sự kiện
+        ingester = get_attendance_ingester()
+        result = ingester.submit(
+            [
+                {
+                    "employee_id": form.employee_id.data,
+                    "date": form.date.data.isoformat(),
+                    "check_in_time": form.check_in_time.data,
+                    "check_out_time": form.check_out_time.data,
+                }
+            ]
+        )
+        if result["rejected"]:
+            flash(f"Invalid attendance: {result['errors'][0]['error']}")
+            return render_template("attendances.html", form=form)
+        ingester.flush()
         flash("Attendance information saved successfully!")
         return redirect(url_for("main.index"))
     return render_template("attendances.html", form=form)
 
 
+def _ingest_authorized():
+    # Dữ liệu chấm công dùng để tính lương nên chỉ nhận từ người dùng đã đăng
+    # nhập hoặc từ thiết bị kèm ATTENDANCE_INGEST_TOKEN
+    if "username" in session:
+        return True
+    token = current_app.config.get("ATTENDANCE_INGEST_TOKEN")
+    supplied = request.headers.get("X-Ingest-Token", "")
+    return bool(token) and hmac.compare_digest(supplied.encode(), token.encode())
+
+
+@main.route("/attendances/ingest", methods=["POST"])
+def ingest_attendances():
+    # Nhận sự kiện chấm công theo lô: NDJSON (mỗi dòng một sự kiện), mảng JSON
+    # hoặc {"events": [...]}; sự kiện được ghi xuống cơ sở dữ liệu theo lô
+    if not _ingest_authorized():
+        return jsonify({"error": "unauthorized"}), 401
+    if request.mimetype == "application/x-ndjson":
+        try:
+            events = [
+                json.loads(line)
+                for line in request.get_data().splitlines()
+                if line.strip()
+            ]
+        except ValueError:
+            return jsonify({"error": "invalid NDJSON"}), 400
+    else:
+        payload = request.get_json(silent=True)
+        events = payload.get("events") if isinstance(payload, dict) else payload
+        if not isinstance(events, list):
+            return jsonify({"error": "expected a list of events"}), 400
+
+    ingester = get_attendance_ingester()
+    result = ingester.submit(events)
+    if request.args.get("flush", type=int):
+        ingester.flush()
+    return jsonify(result), 202
+
+
+@main.route("/attendances/ingest/stats")
+def attendance_ingest_stats():
+    if not _ingest_authorized():
+        return jsonify({"error": "unauthorized"}), 401
+    return jsonify(get_attendance_ingester().stats())
+
+
+@main.route("/attendances/summary/<int:employee_id>")
+def attendance_summary(employee_id):
+    # Tổng hợp chấm công tháng được đọc bằng một lần tra theo khóa chính
+    today = date.today()
+    year = request.args.get("year", today.year, type=int)
+    month = request.args.get("month", today.month, type=int)
+    summary = get_summary(employee_id, year, month)
+    if summary is None:
+        return jsonify({"error": "summary not found"}), 404
+    return jsonify(summary.to_dict())
+
+
 @main.route("/employee_details/<int:employee_id>")
-def employee_details(employee_id):
+async def employee_details(employee_id):
     # Lấy thông tin nhân viên từ cơ sở dữ liệu
     employee = Employee.query.get_or_404(employee_id)
-
-    return render_template("employee_details.html", employee=employee)
+    # Các trường nhạy cảm nằm chung một document nên chỉ tốn một lần gọi Vault
+    phone_number, email, position, department = await employee.get_sensitive_data_async()
+
+    return render_template(
+        "employee_detail.html",
+        employee=employee,
+        phone_number=phone_number,
+        email=email,
+        position=position,
+        department=department,
+    )
@@ -0,0 +1,218 @@
+"""
+Benchmark số request tới OpenBao khi nhiều thread cùng đọc một secret.
+
+Đo "khuếch đại request" (số request Vault trên mỗi đợt đọc đồng thời, hoặc trên
+mỗi lần đọc) khi bật và tắt gộp lần đọc (VAULT_COALESCE_READS), với các kịch bản:
+
+- burst: cache trống, N thread cùng đọc một đường dẫn qua client đồng bộ;
+- burst_async: như trên qua client async (đường đọc của employee_details);
+- uncached: N thread đọc liên tục một secret không được cache (như mật khẩu);
+- secrets_route: N request /secrets đồng thời qua Flask test client.
+
+OpenBao là server giả lập trong tiến trình với độ trễ cấu hình được:
+
+    python benchmarks/coalescing.py --threads 1 8 32 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from fake_openbao import FakeOpenBao  # noqa: E402
+from routes import current_commit, percentile  # noqa: E402
+
+SECRET_PATH = "bench/hot-secret"
+SCENARIOS = ("burst", "burst_async", "uncached", "secrets_route")
+
+
+class CoalescingBenchmark:
+    """
+    Chạy các kịch bản đọc đồng thời và đếm request tới OpenBao giả lập.
+
+    Args:
+        app: Ứng dụng Flask.
+        server (FakeOpenBao): Server giả lập đang chạy.
+        rounds (int): Số đợt đọc (burst) hoặc số lần đọc mỗi thread (uncached).
+    """
+
+    def __init__(self, app, server, rounds=20):
+        self.app = app
+        self.server = server
+        self.rounds = rounds
+
+    def setup(self):
+        from app.vault_secrets import write_secret
+
+        write_secret(SECRET_PATH, {"value": "hot"})
+        write_secret("my-secret", {"greeting": "hello", "owner": "benchmark"})
+
+    def _read_sync(self, index):
+        from app.vault_client import read_kv
+
+        return read_kv(SECRET_PATH)[0]
+
+    def _read_async(self, index):
+        from app.vault_async import retrieve_secret_document_async
+
+        # Như một view async của Flask: mỗi lần gọi có event loop riêng
+        return asyncio.run(retrieve_secret_document_async(SECRET_PATH))[0]
+
+    def _read_uncached(self, index):
+        from app.vault_client import read_kv
+
+        return read_kv(SECRET_PATH, cacheable=False)[0]
+
+    def _read_route(self, client):
+        response = client.get("/secrets")
+        return response.data if response.status_code == 200 else None
+
+    def _run_threads(self, threads, target):
+        latencies = []
+        failures = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads)
+
+        def worker(index):
+            barrier.wait()
+            started = time.perf_counter()
+            result = target(index)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+                if result is None:
+                    failures.append(index)
+
+        workers = [
+            threading.Thread(target=worker, args=(index,)) for index in range(threads)
+        ]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return latencies, len(failures)
+
+    def run(self, scenario, threads):
+        from app.vault_cache import invalidate_secret
+
+        latencies = []
+        errors = 0
+        reads = 0
+        self.server.reset_stats()
+        started = time.perf_counter()
+        if scenario == "uncached":
+
+            def target(index):
+                result = None
+                for _ in range(self.rounds):
+                    result = self._read_uncached(index)
+                return result
+
+            samples, errors = self._run_threads(threads, target)
+            # Độ trễ trung bình của một lần đọc trong mỗi thread
+            latencies = [sample / self.rounds for sample in samples]
+            reads = threads * self.rounds
+        else:
+            clients = [self.app.test_client() for _ in range(threads)]
+            targets = {
+                "burst": self._read_sync,
+                "burst_async": self._read_async,
+                "secrets_route": lambda index: self._read_route(clients[index]),
+            }
+            for _ in range(self.rounds):
+                # Mỗi đợt bắt đầu với cache trống
+                invalidate_secret(SECRET_PATH)
+                invalidate_secret("my-secret")
+                samples, failed = self._run_threads(threads, targets[scenario])
+                latencies.extend(samples)
+                errors += failed
+            reads = threads * self.rounds
+        duration = time.perf_counter() - started
+        vault_requests = self.server.stats()["by_route"]
+        # Chỉ đếm lần đọc KV (bỏ qua request khác như metadata)
+        vault_reads = sum(
+            count for route, count in vault_requests.items() if "GET" in route
+        )
+        latencies.sort()
+        per = self.rounds if scenario != "uncached" else reads
+        return {
+            "scenario": scenario,
+            "threads": threads,
+            "reads": reads,
+            "errors": errors,
+            "vault_requests": vault_reads,
+            # burst: request Vault trên mỗi đợt (lý tưởng là 1);
+            # uncached: request Vault trên mỗi lần đọc
+            "amplification": round(vault_reads / per, 3),
+            "p50_ms": round(percentile(latencies, 0.50), 3),
+            "p95_ms": round(percentile(latencies, 0.95), 3),
+            "throughput_rps": round(reads / duration, 2),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--output", help="Ghi kết quả JSON vào file thay vì stdout.")
+    args = parser.parse_args()
+
+    server = FakeOpenBao(latency=args.latency_ms / 1000, seed=42).start()
+    os.environ["VAULT_ADDR"] = server.url
+    workdir = tempfile.mkdtemp(prefix="openbao-bench-")
+    os.environ.setdefault(
+        "DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    )
+
+    # Import sau khi đặt VAULT_ADDR/DATABASE_URL vì cấu hình được đọc lúc import
+    from app import create_app
+    from app import vault_config
+
+    app = create_app()
+    benchmark = CoalescingBenchmark(app, server, args.rounds)
+    results = []
+    try:
+        benchmark.setup()
+        for scenario in args.scenarios:
+            for threads in args.threads:
+                for coalesce in (False, True):
+                    vault_config.coalesce_reads = coalesce
+                    entry = benchmark.run(scenario, threads)
+                    entry["coalesce"] = coalesce
+                    results.append(entry)
+                    print(
+                        f"{scenario} threads={threads} coalesce={coalesce}: "
+                        f"amplification={entry['amplification']} "
+                        f"p95={entry['p95_ms']}ms",
+                        file=sys.stderr,
+                    )
+    finally:
+        server.stop()
+
+    report = {
+        "commit": current_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {"rounds": args.rounds, "vault_latency_ms": args.latency_ms},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
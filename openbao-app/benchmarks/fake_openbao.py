@@ -0,0 +1,629 @@
+"""
+Server OpenBao giả lập chạy trong tiến trình, dùng cho kiểm thử và benchmark.
+
+Chỉ hỗ trợ phần HTTP API mà ứng dụng sử dụng:
+  - secret/data, secret/metadata (KV v2, kể cả cas và merge-patch)
+  - database/config, database/roles, database/creds, sys/leases/renew|revoke
+  - sys/mounts
+  - transit encrypt/decrypt/rewrap, datakey, keys (kể cả rotate)
+Dữ liệu chỉ nằm trong bộ nhớ; "mã hóa" transit chỉ là mã hóa base64 có gắn tên
+và phiên bản khóa, không phải mật mã thật.
+
+Có thể cấu hình độ trễ, tỉ lệ lỗi giả lập và đếm số request theo từng route.
+Dùng trong code (đặt VAULT_ADDR trước khi import app vì địa chỉ được đọc lúc
+import):
+
+    server = FakeOpenBao(latency=0.002).start()
+    os.environ["VAULT_ADDR"] = server.url
+    ...
+    print(server.stats())
+    server.stop()
+
+hoặc chạy như một tiến trình riêng:
+
+    python benchmarks/fake_openbao.py --port 8200 --latency-ms 2 --error-rate 0.01
+
+Khi chạy riêng, bộ đếm được đọc qua GET /_fake/stats, xóa qua POST /_fake/reset
+và lỗi/độ trễ được đổi qua POST /_fake/faults (JSON latency, jitter, error_rate).
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_MOUNTS = {
+    "secret/": {"type": "kv", "options": {"version": "2"}},
+    "database/": {"type": "database", "options": None},
+    "transit/": {"type": "transit", "options": None},
+    "sys/": {"type": "system", "options": None},
+}
+
+TTL_PATTERN = re.compile(r"^(\d+)([smhd]?)$")
+TTL_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class FakeError(Exception):
+    """Lỗi trả về cho client dưới dạng {"errors": [...]}."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def parse_ttl(value, default=0):
+    """Chuyển TTL kiểu OpenBao ("1h", "30m", 45) sang số giây."""
+    if value in (None, ""):
+        return default
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = TTL_PATTERN.match(str(value).strip())
+    if not match:
+        raise FakeError(400, f"invalid ttl {value!r}")
+    return int(match.group(1)) * TTL_UNITS[match.group(2)]
+
+
+class FakeOpenBao:
+    """
+    Server OpenBao giả lập.
+
+    Args:
+        host (str): Địa chỉ lắng nghe.
+        port (int): Cổng lắng nghe, 0 để chọn cổng trống bất kỳ.
+        token (str): Token hợp lệ; None để chấp nhận mọi X-Vault-Token.
+        latency (float): Độ trễ cố định (giây) thêm vào mỗi request.
+        jitter (float): Độ trễ ngẫu nhiên thêm tối đa (giây).
+        error_rate (float): Tỉ lệ request bị trả lỗi error_status (0..1).
+        error_status (int): Mã lỗi trả về khi giả lập lỗi.
+        seed (int): Seed cho bộ sinh ngẫu nhiên (độ trễ, lỗi, credentials).
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        token=None,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        error_status=503,
+        seed=None,
+    ):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+        self.mounts = {path: dict(mount) for path, mount in DEFAULT_MOUNTS.items()}
+        # path -> {"versions": [dữ liệu hoặc None nếu đã xóa], "created": [...]}
+        self.kv = {}
+        self.db_configs = {}
+        self.db_roles = {}
+        self.leases = {}
+        # tên khóa transit -> phiên bản mới nhất
+        self.transit_keys = {}
+        self.reset_stats()
+
+
+    @property
+    def url(self):
+        """Địa chỉ dùng cho VAULT_ADDR."""
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """Khởi động server trong một thread nền và trả về chính đối tượng."""
+        handler = type("Handler", (_Handler,), {"fake": self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="fake-openbao", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Dừng server."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def set_faults(self, latency=None, jitter=None, error_rate=None, error_status=None):
+        """Đổi độ trễ và tỉ lệ lỗi giả lập khi server đang chạy."""
+        with self._lock:
+            if latency is not None:
+                self.latency = float(latency)
+            if jitter is not None:
+                self.jitter = float(jitter)
+            if error_rate is not None:
+                self.error_rate = float(error_rate)
+            if error_status is not None:
+                self.error_status = int(error_status)
+
+    def put_secret(self, path, data):
+        """Ghi trực tiếp một secret KV v2 (không tính vào bộ đếm)."""
+        with self._lock:
+            return self._kv_write(path, dict(data))
+
+    def reset_stats(self):
+        """Xóa bộ đếm request."""
+        with self._lock:
+            self._requests = Counter()
+            self._errors = Counter()
+            self._injected = Counter()
+            self._batch_items = Counter()
+            self._busy_seconds = 0.0
+
+    def stats(self):
+        """
+        Trả về bộ đếm request.
+
+        Returns:
+            dict: Tổng số request, số request theo route, số lỗi (trả về thật
+            và giả lập), số phần tử batch transit và tổng thời gian xử lý (ms).
+        """
+        with self._lock:
+            return {
+                "requests": sum(self._requests.values()),
+                "by_route": dict(self._requests.most_common()),
+                "errors": dict(self._errors),
+                "injected_errors": dict(self._injected),
+                "batch_items": dict(self._batch_items),
+                "busy_ms": round(self._busy_seconds * 1000, 3),
+                "leases": len(self.leases),
+            }
+
+    def handle(self, method, path, query, token, body):
+        """
+        Xử lý một request tới /v1/<path>.
+
+        Returns:
+            tuple: (mã trạng thái, body dạng dict hoặc None).
+        """
+        started = time.perf_counter()
+        route = f"{method} {_route_name(path)}"
+        with self._lock:
+            self._requests[route] += 1
+            delay = self.latency + (self._random.random() * self.jitter)
+            inject = self.error_rate and self._random.random() < self.error_rate
+            error_status = self.error_status
+        if delay:
+            time.sleep(delay)
+        if inject:
+            with self._lock:
+                self._injected[route] += 1
+            return error_status, {"errors": ["injected failure"]}
+        try:
+            if self.token is not None and token != self.token:
+                raise FakeError(403, "permission denied")
+            with self._lock:
+                status, payload = self._dispatch(method, path, query, body, route)
+        except FakeError as e:
+            status, payload = e.status, {"errors": [e.message]}
+        with self._lock:
+            if status >= 400:
+                self._errors[route] += 1
+            self._busy_seconds += time.perf_counter() - started
+        return status, payload
+
+    def _dispatch(self, method, path, query, body, route):
+        if path == "sys/mounts" or path.startswith("sys/mounts/"):
+            return self._sys_mounts(method, path[len("sys/mounts/") :], body)
+        if path.startswith("sys/leases/"):
+            return self._sys_leases(method, path[len("sys/leases/") :], body)
+        mount, _, rest = path.partition("/")
+        info = self.mounts.get(mount + "/")
+        if info is None:
+            raise FakeError(404, f"no handler for route {path!r}")
+        if info["type"] == "kv":
+            return self._kv(method, rest, query, body)
+        if info["type"] == "database":
+            return self._database(method, mount, rest, body)
+        if info["type"] == "transit":
+            return self._transit(method, mount, rest, body, route)
+        raise FakeError(404, f"unsupported mount type {info['type']!r}")
+
+    def _sys_mounts(self, method, name, body):
+        if not name:
+            if method != "GET":
+                raise FakeError(405, "unsupported operation")
+            mounts = {path: dict(mount) for path, mount in self.mounts.items()}
+            return 200, dict(mounts, data=mounts)
+        key = name.rstrip("/") + "/"
+        if method in ("POST", "PUT"):
+            if key in self.mounts:
+                raise FakeError(400, f"path is already in use at {key}")
+            self.mounts[key] = {
+                "type": body.get("type"),
+                "options": body.get("options"),
+            }
+            return 204, None
+        if method == "DELETE":
+            self.mounts.pop(key, None)
+            return 204, None
+        raise FakeError(405, "unsupported operation")
+
+    def _sys_leases(self, method, action, body):
+        if method not in ("PUT", "POST"):
+            raise FakeError(405, "unsupported operation")
+        lease_id = body.get("lease_id")
+        lease = self.leases.get(lease_id)
+        if action == "revoke":
+            self.leases.pop(lease_id, None)
+            return 204, None
+        if action != "renew":
+            raise FakeError(404, f"unsupported lease operation {action!r}")
+        if lease is None or lease["expires_at"] <= time.time():
+            self.leases.pop(lease_id, None)
+            raise FakeError(400, "lease not found or lease is not renewable")
+        now = time.time()
+        increment = parse_ttl(body.get("increment"), lease["ttl"])
+        # Giống OpenBao: không gia hạn quá max_ttl tính từ lúc cấp
+        duration = max(0, min(increment, int(lease["max_expires_at"] - now)))
+        lease["expires_at"] = now + duration
+        return 200, {
+            "lease_id": lease_id,
+            "renewable": True,
+            "lease_duration": duration,
+            "data": None,
+        }
+
+    def _kv_write(self, path, data, cas=None):
+        entry = self.kv.setdefault(path, {"versions": [], "created": []})
+        if cas is not None and cas != len(entry["versions"]):
+            raise FakeError(
+                400,
+                "check-and-set parameter did not match the current version",
+            )
+        entry["versions"].append(data)
+        entry["created"].append(time.time())
+        return len(entry["versions"])
+
+    def _kv_current(self, path):
+        entry = self.kv.get(path)
+        if not entry or not entry["versions"] or entry["versions"][-1] is None:
+            return None, None
+        return entry["versions"][-1], len(entry["versions"])
+
+    def _kv(self, method, rest, query, body):
+        kind, _, path = rest.partition("/")
+        if not path:
+            raise FakeError(404, "missing secret path")
+        if kind == "data":
+            return self._kv_data(method, path, query, body)
+        if kind == "metadata":
+            return self._kv_metadata(method, path)
+        raise FakeError(404, f"unsupported KV endpoint {kind!r}")
+
+    def _kv_data(self, method, path, query, body):
+        if method == "GET":
+            entry = self.kv.get(path)
+            version = int((query.get("version") or ["0"])[0])
+            if entry and version:
+                data = (
+                    entry["versions"][version - 1]
+                    if version <= len(entry["versions"])
+                    else None
+                )
+            else:
+                data, version = self._kv_current(path)
+            if data is None:
+                raise FakeError(404, "secret not found")
+            return 200, {
+                "data": {
+                    "data": data,
+                    "metadata": {"version": version, "destroyed": False},
+                }
+            }
+        if method in ("POST", "PUT"):
+            cas = (body.get("options") or {}).get("cas")
+            version = self._kv_write(path, dict(body.get("data") or {}), cas)
+            return 200, {"data": {"version": version}}
+        if method == "PATCH":
+            current, version = self._kv_current(path)
+            if current is None:
+                raise FakeError(404, "secret not found")
+            cas = (body.get("options") or {}).get("cas")
+            merged = dict(current)
+            for field, value in (body.get("data") or {}).items():
+                if value is None:
+                    merged.pop(field, None)
+                else:
+                    merged[field] = value
+            return 200, {"data": {"version": self._kv_write(path, merged, cas)}}
+        if method == "DELETE":
+            entry = self.kv.get(path)
+            if entry and entry["versions"]:
+                entry["versions"][-1] = None
+            return 204, None
+        raise FakeError(405, "unsupported operation")
+
+    def _kv_metadata(self, method, path):
+        if method == "GET":
+            entry = self.kv.get(path)
+            if not entry:
+                raise FakeError(404, "secret not found")
+            return 200, {
+                "data": {
+                    "current_version": len(entry["versions"]),
+                    "oldest_version": 1,
+                    "versions": {
+                        str(index + 1): {"deleted": data is None}
+                        for index, data in enumerate(entry["versions"])
+                    },
+                }
+            }
+        if method == "DELETE":
+            self.kv.pop(path, None)
+            return 204, None
+        raise FakeError(405, "unsupported operation")
+
+    def _database(self, method, mount, rest, body):
+        kind, _, name = rest.partition("/")
+        store = {"config": self.db_configs, "roles": self.db_roles}.get(kind)
+        if store is not None:
+            if method == "GET":
+                if name not in store:
+                    raise FakeError(404, f"{kind} {name!r} not found")
+                return 200, {"data": store[name]}
+            if method in ("POST", "PUT"):
+                store[name] = dict(body)
+                return 204, None
+            if method == "DELETE":
+                store.pop(name, None)
+                return 204, None
+            raise FakeError(405, "unsupported operation")
+        if kind == "creds" and method == "GET":
+            role = self.db_roles.get(name)
+            if role is None:
+                raise FakeError(400, f"unknown role: {name}")
+            ttl = parse_ttl(role.get("default_ttl"), 3600)
+            max_ttl = parse_ttl(role.get("max_ttl"), 86400)
+            lease_id = f"{mount}/creds/{name}/{uuid.uuid4().hex}"
+            now = time.time()
+            self.leases[lease_id] = {
+                "ttl": ttl,
+                "expires_at": now + ttl,
+                "max_expires_at": now + max_ttl,
+            }
+            return 200, {
+                "lease_id": lease_id,
+                "lease_duration": ttl,
+                "renewable": True,
+                "data": {
+                    "username": f"v-fake-{name}-{self._random.getrandbits(32):08x}",
+                    "password": f"{self._random.getrandbits(128):032x}",
+                },
+            }
+        raise FakeError(404, f"unsupported database endpoint {kind!r}")
+
+    def _transit_encrypt(self, key, plaintext):
+        version = self.transit_keys.setdefault(key, 1)
+        sealed = base64.b64encode(f"{key}:{plaintext}".encode("ascii")).decode("ascii")
+        return f"vault:v{version}:{sealed}"
+
+    def _transit_decrypt(self, key, ciphertext):
+        try:
+            _, version, sealed = ciphertext.split(":", 2)
+            owner, plaintext = base64.b64decode(sealed).decode("ascii").split(":", 1)
+        except (AttributeError, ValueError):
+            raise FakeError(400, "invalid ciphertext")
+        if owner != key or int(version[1:]) > self.transit_keys.get(key, 0):
+            raise FakeError(400, "cipher: message authentication failed")
+        return plaintext
+
+    def _transit_item(self, operation, key, item):
+        if operation == "encrypt":
+            return {"ciphertext": self._transit_encrypt(key, item["plaintext"])}
+        if operation == "decrypt":
+            return {"plaintext": self._transit_decrypt(key, item["ciphertext"])}
+        plaintext = self._transit_decrypt(key, item["ciphertext"])
+        return {"ciphertext": self._transit_encrypt(key, plaintext)}
+
+    def _transit(self, method, mount, rest, body, route):
+        parts = rest.split("/")
+        operation = parts[0]
+        if operation == "keys" and len(parts) >= 2:
+            key = parts[1]
+            if len(parts) == 3 and parts[2] == "rotate" and method in ("POST", "PUT"):
+                self.transit_keys[key] = self.transit_keys.get(key, 0) + 1
+                return 204, None
+            if method in ("POST", "PUT"):
+                self.transit_keys.setdefault(key, 1)
+                return 204, None
+            if method == "GET":
+                if key not in self.transit_keys:
+                    raise FakeError(404, f"encryption key {key!r} not found")
+                latest = self.transit_keys[key]
+                created = int(time.time())
+                return 200, {
+                    "data": {
+                        "name": key,
+                        "latest_version": latest,
+                        "min_decryption_version": 1,
+                        "keys": {str(v): created for v in range(1, latest + 1)},
+                    }
+                }
+        if method not in ("POST", "PUT"):
+            raise FakeError(405, "unsupported operation")
+        if operation == "datakey" and len(parts) == 3:
+            key = parts[2]
+            bits = int(body.get("bits") or 256)
+            plaintext = base64.b64encode(os.urandom(bits // 8)).decode("ascii")
+            data = {"ciphertext": self._transit_encrypt(key, plaintext)}
+            if parts[1] == "plaintext":
+                data["plaintext"] = plaintext
+            return 200, {"data": data}
+        if operation in ("encrypt", "decrypt", "rewrap") and len(parts) == 2:
+            key = parts[1]
+            if "batch_input" not in body:
+                return 200, {"data": self._transit_item(operation, key, body)}
+            results = []
+            for item in body["batch_input"]:
+                try:
+                    results.append(self._transit_item(operation, key, item))
+                except (FakeError, KeyError) as e:
+                    results.append({"error": getattr(e, "message", str(e))})
+            self._batch_items[route] += len(results)
+            # Như OpenBao: một phần tử lỗi làm cả lô trả về 400 (vẫn kèm
+            # batch_results) trừ khi yêu cầu đặt partial_failure_response_code
+            status = 200
+            if any("error" in result for result in results):
+                status = int(body.get("partial_failure_response_code") or 400)
+            return status, {"data": {"batch_results": results}}
+        raise FakeError(404, f"unsupported transit endpoint {operation!r}")
+
+
+def _route_name(path):
+    """Chuẩn hóa đường dẫn để đếm, ví dụ secret/data/a/b -> secret/data/*."""
+    parts = path.split("/")
+    if parts[:2] == ["sys", "mounts"]:
+        return "sys/mounts" + ("/*" if len(parts) > 2 else "")
+    if parts[0] == "sys":
+        return "/".join(parts[:3])
+    if len(parts) >= 3 and parts[1] == "datakey":
+        return "/".join(parts[:3]) + "/*"
+    if len(parts) >= 3:
+        return "/".join(parts[:2]) + "/*"
+    return path
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Header và body được ghi riêng; tắt Nagle để không cộng thêm độ trễ delayed-ACK
+    disable_nagle_algorithm = True
+    fake = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.send_response(status)
+        if data:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if not raw:
+            return {}
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            return None
+        return body if isinstance(body, dict) else None
+
+    def _handle(self):
+        url = urlsplit(self.path)
+        body = self._body()
+        if url.path.startswith("/_fake/"):
+            return self._control(url.path[len("/_fake/") :], body or {})
+        if not url.path.startswith("/v1/"):
+            return self._send(404, {"errors": []})
+        if body is None:
+            return self._send(400, {"errors": ["failed to parse JSON input"]})
+        method = self.command
+        if method == "GET" and parse_qs(url.query).get("list"):
+            method = "LIST"
+        status, payload = self.fake.handle(
+            method,
+            url.path[len("/v1/") :].strip("/"),
+            parse_qs(url.query),
+            self.headers.get("X-Vault-Token"),
+            body,
+        )
+        self._send(status, payload)
+
+    def _control(self, action, body):
+        if action == "stats":
+            return self._send(200, self.fake.stats())
+        if action == "reset" and self.command == "POST":
+            self.fake.reset_stats()
+            return self._send(204, None)
+        if action == "faults" and self.command == "POST":
+            self.fake.set_faults(**body)
+            return self._send(204, None)
+        self._send(404, {"errors": []})
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_LIST = _handle
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument(
+        "--token", default=None, help="Token hợp lệ (mặc định: chấp nhận mọi token)."
+    )
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--bootstrap",
+        action="store_true",
+        help="Tạo sẵn cấu hình/role database và khóa transit như sau bootstrap.",
+    )
+    args = parser.parse_args()
+
+    server = FakeOpenBao(
+        host=args.host,
+        port=args.port,
+        token=args.token,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+    if args.bootstrap:
+        server.db_configs["my-postgresql-database"] = {
+            "plugin_name": "postgresql-database-plugin",
+            "allowed_roles": ["my-role"],
+        }
+        server.db_roles["my-role"] = {
+            "db_name": "my-postgresql-database",
+            "default_ttl": "1h",
+            "max_ttl": "24h",
+        }
+        server.transit_keys[os.getenv("VAULT_TRANSIT_KEY", "openbao-app")] = 1
+    server.start()
+    print(f"Fake OpenBao listening on {server.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
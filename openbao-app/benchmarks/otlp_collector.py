@@ -0,0 +1,165 @@
+"""
+Collector OTLP/HTTP tối giản thay cho collector thật khi đo tracing cục bộ.
+
+Nhận POST /v1/traces (OTLP mã hóa JSON, như app/tracing.py gửi), ghi từng span
+vào file JSON lines và in bảng phân rã thời gian theo route: tổng thời gian
+request, thời gian và số lời gọi OpenBao, thời gian và số câu lệnh SQL, phần
+còn lại (xử lý trong Python). Ví dụ:
+
+    python benchmarks/otlp_collector.py --port 4318 --output spans.jsonl
+    TRACE_SAMPLE_RATE=1 TRACE_OTLP_ENDPOINT=http://127.0.0.1:4318 flask run
+
+Gửi SIGINT (Ctrl+C) để in bảng tổng hợp.
+"""
+
+import argparse
+import json
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _attribute(value):
+    for key in ("stringValue", "intValue", "doubleValue", "boolValue"):
+        if key in value:
+            return int(value[key]) if key == "intValue" else value[key]
+    return None
+
+
+def parse_spans(payload):
+    """Chuyển ExportTraceServiceRequest (JSON) thành danh sách span dạng dict."""
+    spans = []
+    for resource_spans in payload.get("resourceSpans", []):
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                start = int(span["startTimeUnixNano"])
+                spans.append(
+                    {
+                        "trace_id": span["traceId"],
+                        "span_id": span["spanId"],
+                        "parent_id": span.get("parentSpanId") or None,
+                        "name": span["name"],
+                        "kind": span.get("kind"),
+                        "start_ns": start,
+                        "duration_ms": (int(span["endTimeUnixNano"]) - start) / 1e6,
+                        "attributes": {
+                            item["key"]: _attribute(item["value"])
+                            for item in span.get("attributes", [])
+                        },
+                        "error": (span.get("status") or {}).get("code") == 2,
+                    }
+                )
+    return spans
+
+
+class TraceStore:
+    """Giữ span theo trace và tổng hợp thời gian theo route."""
+
+    def __init__(self, output=None):
+        self.output = output
+        self._lock = threading.Lock()
+        self._traces = defaultdict(list)
+
+    def add(self, spans):
+        with self._lock:
+            for span in spans:
+                self._traces[span["trace_id"]].append(span)
+            if self.output:
+                with open(self.output, "a") as handle:
+                    for span in spans:
+                        handle.write(json.dumps(span) + "\n")
+
+    def breakdown(self):
+        """
+        Returns:
+            dict: route -> số request và thời gian trung bình (ms) của request,
+            OpenBao, SQL và phần còn lại.
+        """
+        routes = defaultdict(lambda: defaultdict(float))
+        with self._lock:
+            traces = list(self._traces.values())
+        for spans in traces:
+            roots = [span for span in spans if span["kind"] == 2]
+            if not roots:
+                continue
+            route = routes[roots[0]["name"]]
+            route["requests"] += 1
+            route["total_ms"] += roots[0]["duration_ms"]
+            for span in spans:
+                if span["name"].startswith("vault "):
+                    route["vault_ms"] += span["duration_ms"]
+                    route["vault_calls"] += 1
+                elif span["name"].startswith("sql"):
+                    route["sql_ms"] += span["duration_ms"]
+                    route["sql_statements"] += 1
+        report = {}
+        for name, route in routes.items():
+            count = route.pop("requests")
+            averages = {key: round(value / count, 3) for key, value in route.items()}
+            # Lời gọi OpenBao song song có thể làm phần còn lại âm
+            averages["other_ms"] = round(
+                averages["total_ms"]
+                - averages.get("vault_ms", 0)
+                - averages.get("sql_ms", 0),
+                3,
+            )
+            report[name] = dict(requests=int(count), **averages)
+        return report
+
+
+def make_handler(store):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return self._send(400, {"error": "invalid JSON"})
+            if self.path != "/v1/traces":
+                return self._send(404, {})
+            store.add(parse_spans(payload))
+            self._send(200, {})
+
+        def do_GET(self):
+            if self.path == "/summary":
+                return self._send(200, store.breakdown())
+            self._send(404, {})
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--output", help="File JSON lines để ghi span nhận được.")
+    args = parser.parse_args()
+
+    store = TraceStore(args.output)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(store))
+    print(f"OTLP collector listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(store.breakdown(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+"""
+Benchmark các route chính của ứng dụng qua Flask test client.
+
+Mỗi route được chạy tuần tự và với nhiều thread đồng thời; với mỗi lần chạy ghi
+lại p50/p95/p99, throughput, số câu lệnh SQL và số request tới OpenBao trên mỗi
+request. Mỗi lần chạy được đo cả khi tắt cache secret (cold: mọi lần đọc tới
+OpenBao, như VAULT_CACHE_MAX_ENTRIES=0) và khi bật cache (warm: cache đã được
+làm nóng bởi các request warmup). Mặc định OpenBao là server giả lập trong
+tiến trình (benchmarks/fake_openbao.py) và cơ sở dữ liệu là SQLite tạm, nên có thể chạy
+trên máy cá nhân hoặc CI:
+
+    python benchmarks/routes.py --requests 200 --threads 1 8 --output bench.json
+
+So sánh với kết quả của commit trước (thoát với mã 1 nếu có hồi quy, ví dụ thêm
+một lời gọi Vault cho mỗi request):
+
+    python benchmarks/routes.py --baseline bench.json
+
+Dùng --vault-addr để chạy với OpenBao thật hoặc fake_openbao.py chạy riêng (số
+request Vault chỉ được đếm khi server có endpoint /_fake/stats) và
+DATABASE_URL để chạy với PostgreSQL.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from fake_openbao import FakeOpenBao  # noqa: E402
+
+PASSWORD = "benchmark-password"
+ROUTES = (
+    "login",
+    "register",
+    "add_employee",
+    "add_salary",
+    "employee_details",
+    "secrets",
+)
+CACHE_MODES = ("cold", "warm")
+
+
+def percentile(samples, fraction):
+    """Percentile theo nearest-rank trên danh sách đã sắp xếp."""
+    if not samples:
+        return None
+    index = min(len(samples) - 1, max(0, int(round(fraction * len(samples))) - 1))
+    return samples[index]
+
+
+class VaultCounter:
+    """Đếm request tới OpenBao giả lập, trong tiến trình hoặc qua /_fake/stats."""
+
+    def __init__(self, server=None, addr=None):
+        self.server = server
+        self.addr = addr
+
+    def reset(self):
+        if self.server is not None:
+            self.server.reset_stats()
+        elif self.addr:
+            self._call("POST", "reset")
+
+    def count(self):
+        if self.server is not None:
+            return self.server.stats()["requests"]
+        stats = self._call("GET", "stats") if self.addr else None
+        return stats["requests"] if stats else None
+
+    def _call(self, method, action):
+        import requests
+
+        try:
+            response = requests.request(
+                method, f"{self.addr}/_fake/{action}", timeout=5
+            )
+        except requests.exceptions.RequestException:
+            return None
+        if response.status_code != 200:
+            return None
+        return response.json()
+
+
+class RouteBenchmark:
+    """
+    Chuẩn bị dữ liệu và chạy các kịch bản cho từng route.
+
+    Args:
+        app: Ứng dụng Flask.
+        vault (VaultCounter): Bộ đếm request OpenBao.
+        employees (int): Số nhân viên được tạo sẵn.
+        users (int): Số người dùng được tạo sẵn.
+    """
+
+    def __init__(self, app, vault, employees=50, users=20):
+        self.app = app
+        self.vault = vault
+        self.employees = employees
+        self.users = users
+        self.employee_ids = []
+        self.user_names = []
+        self._sequence = itertools.count(1)
+        self._sql_statements = 0
+        self._sql_lock = threading.Lock()
+
+    def _count_statement(self, *args):
+        with self._sql_lock:
+            self._sql_statements += 1
+
+    def setup(self):
+        """Tạo bảng (SQLite), dữ liệu mẫu và secret cho route /secrets."""
+        from sqlalchemy import event
+
+        from app.models import db, Employee, Users
+        from app.vault_secrets import write_secret
+
+        with self.app.app_context():
+            if db.engine.dialect.name == "sqlite":
+                db.create_all()
+            event.listen(db.engine, "before_cursor_execute", self._count_statement)
+            run = next(self._sequence)
+            for index in range(self.employees):
+                employee = Employee(
+                    employee_id=f"BE{run}-{index}",
+                    name=f"Benchmark Employee {index}",
+                    gender="Male",
+                    address="1 Benchmark Street",
+                    status="Active",
+                )
+                employee.set_sensitive_data(
+                    phone_number=f"0900{index:06d}",
+                    email=f"be{run}-{index}@example.com",
+                    position="Engineer",
+                    department="R&D",
+                )
+                db.session.add(employee)
+            for index in range(self.users):
+                user = Users(
+                    username=f"bench-user-{run}-{index}",
+                    email=f"bench-user-{run}-{index}@example.com",
+                )
+                user.set_password(PASSWORD)
+                db.session.add(user)
+            db.session.commit()
+            self.employee_ids = [
+                employee.id
+                for employee in Employee.query.filter(
+                    Employee.employee_id.like(f"BE{run}-%")
+                )
+            ]
+            self.user_names = [
+                f"bench-user-{run}-{index}" for index in range(self.users)
+            ]
+            write_secret("my-secret", {"greeting": "hello", "owner": "benchmark"})
+
+    # Mỗi kịch bản trả về (response, mã trạng thái mong đợi)
+
+    def login(self, client, index):
+        username = self.user_names[index % len(self.user_names)]
+        return (
+            client.post("/login", data={"username": username, "password": PASSWORD}),
+            302,
+        )
+
+    def register(self, client, index):
+        number = next(self._sequence)
+        data = {
+            "username": f"bench-register-{os.getpid()}-{number}",
+            "email": f"bench-register-{os.getpid()}-{number}@example.com",
+            "password": PASSWORD,
+            "password2": PASSWORD,
+        }
+        return client.post("/register", data=data), 302
+
+    def add_employee(self, client, index):
+        number = next(self._sequence)
+        data = {
+            "employee_id": f"BN{os.getpid()}-{number}",
+            "name": f"New Employee {number}",
+            "gender": "Female",
+            "date_of_birth": "1990-01-01",
+            "address": "2 Benchmark Street",
+            "phone_number": f"0911{number:06d}",
+            "email": f"bn{os.getpid()}-{number}@example.com",
+            "position": "Engineer",
+            "department": "R&D",
+            "status": "Active",
+        }
+        return client.post("/add_employee", data=data), 302
+
+    def add_salary(self, client, index):
+        employee_id = self.employee_ids[index % len(self.employee_ids)]
+        month = index // len(self.employee_ids) % 12 + 1
+        data = {
+            "employee_id": str(employee_id),
+            "month": str(month),
+            "year": "2024",
+            "basic_salary": "1000",
+            "bonus": "50",
+            "deduction": "10",
+        }
+        return client.post("/add_salary", data=data), 302
+
+    def employee_details(self, client, index):
+        employee_id = self.employee_ids[index % len(self.employee_ids)]
+        return client.get(f"/employee_details/{employee_id}"), 200
+
+    def secrets(self, client, index):
+        return client.get("/secrets"), 200
+
+    def run(self, route, requests, threads, warmup, cache="warm"):
+        """
+        Chạy một route với số request và số thread cho trước.
+
+        Args:
+            cache (str): "cold" để tắt cache secret trong lần chạy (số request
+                OpenBao là chi phí thật của route), "warm" để dùng cache như
+                khi chạy thật.
+
+        Returns:
+            dict: Độ trễ (ms), throughput, số lỗi, số câu lệnh SQL và số request
+            OpenBao trung bình trên mỗi request.
+        """
+        from app.vault_cache import get_secret_cache
+
+        secret_cache = get_secret_cache()
+        max_entries = secret_cache.max_entries
+        secret_cache.clear()
+        if cache == "cold":
+            secret_cache.max_entries = 0
+        try:
+            return self._run(route, requests, threads, warmup)
+        finally:
+            secret_cache.max_entries = max_entries
+
+    def _run(self, route, requests, threads, warmup):
+        scenario = getattr(self, route)
+        clients = [self.app.test_client() for _ in range(threads)]
+        for index in range(warmup):
+            scenario(clients[0], index)
+
+        latencies = [None] * requests
+        errors = []
+        counter = itertools.count()
+
+        def worker(client):
+            while True:
+                index = next(counter)
+                if index >= requests:
+                    return
+                started = time.perf_counter()
+                response, expected = scenario(client, warmup + index)
+                latencies[index] = (time.perf_counter() - started) * 1000
+                if response.status_code != expected:
+                    errors.append(response.status_code)
+
+        self.vault.reset()
+        sql_before = self._sql_statements
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(worker, clients))
+        elapsed = time.perf_counter() - started
+        sql_statements = self._sql_statements - sql_before
+        vault_requests = self.vault.count()
+
+        latencies.sort()
+        return {
+            "requests": requests,
+            "threads": threads,
+            "errors": len(errors),
+            "error_statuses": sorted(set(errors)),
+            "p50_ms": round(percentile(latencies, 0.50), 3),
+            "p95_ms": round(percentile(latencies, 0.95), 3),
+            "p99_ms": round(percentile(latencies, 0.99), 3),
+            "throughput_rps": round(requests / elapsed, 2),
+            "sql_per_request": round(sql_statements / requests, 3),
+            "vault_per_request": (
+                round(vault_requests / requests, 3)
+                if vault_requests is not None
+                else None
+            ),
+        }
+
+
+def compare(results, baseline, tolerance):
+    """
+    So sánh kết quả với baseline.
+
+    Số câu lệnh SQL hoặc request Vault trên mỗi request tăng, hoặc p95 tăng quá
+    tolerance (tỉ lệ), đều được coi là hồi quy.
+
+    Returns:
+        list: Mô tả các hồi quy tìm thấy.
+    """
+    # Baseline cũ không có trường cache và được đo với cache đã làm nóng
+    previous = {
+        (entry["route"], entry["threads"], entry.get("cache", "warm")): entry
+        for entry in baseline["results"]
+    }
+    regressions = []
+    for entry in results:
+        before = previous.get((entry["route"], entry["threads"], entry["cache"]))
+        if before is None:
+            continue
+        name = f"{entry['route']} (threads={entry['threads']}, {entry['cache']})"
+        for metric in ("sql_per_request", "vault_per_request"):
+            if (
+                entry[metric] is not None
+                and before.get(metric) is not None
+                and entry[metric] > before[metric] + 0.01
+            ):
+                regressions.append(
+                    f"{name}: {metric} {before[metric]} -> {entry[metric]}"
+                )
+        if entry["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95_ms {before['p95_ms']} -> {entry['p95_ms']}"
+            )
+    return regressions
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCH_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--routes", nargs="+", choices=ROUTES, default=list(ROUTES))
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument(
+        "--cache", nargs="+", choices=CACHE_MODES, default=list(CACHE_MODES)
+    )
+    parser.add_argument("--employees", type=int, default=50)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument(
+        "--vault-addr", help="Dùng OpenBao có sẵn thay vì server giả lập."
+    )
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--output", help="Ghi kết quả JSON vào file thay vì stdout.")
+    parser.add_argument("--baseline", help="File JSON kết quả trước đó để so sánh.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Mức tăng p95 tối đa cho phép so với baseline (tỉ lệ).",
+    )
+    args = parser.parse_args()
+
+    server = None
+    if args.vault_addr:
+        vault = VaultCounter(addr=args.vault_addr)
+        os.environ["VAULT_ADDR"] = args.vault_addr
+    else:
+        server = FakeOpenBao(
+            latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000, seed=42
+        ).start()
+        vault = VaultCounter(server=server)
+        os.environ["VAULT_ADDR"] = server.url
+    workdir = tempfile.mkdtemp(prefix="openbao-bench-")
+    os.environ.setdefault(
+        "DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    )
+
+    # Import sau khi đặt VAULT_ADDR/DATABASE_URL vì cấu hình được đọc lúc import
+    from app import create_app
+    from app.vault_config import get_cache_settings, get_sensitive_storage_mode
+
+    app = create_app()
+    app.config["WTF_CSRF_ENABLED"] = False
+    benchmark = RouteBenchmark(app, vault, args.employees, args.users)
+    benchmark.setup()
+
+    results = []
+    try:
+        for route in args.routes:
+            for threads in args.threads:
+                for cache in args.cache:
+                    entry = benchmark.run(
+                        route, args.requests, threads, args.warmup, cache
+                    )
+                    entry["route"] = route
+                    entry["cache"] = cache
+                    results.append(entry)
+                    print(
+                        f"{route} threads={threads} cache={cache}: "
+                        f"p95={entry['p95_ms']}ms "
+                        f"{entry['throughput_rps']} req/s "
+                        f"sql={entry['sql_per_request']} "
+                        f"vault={entry['vault_per_request']}",
+                        file=sys.stderr,
+                    )
+    finally:
+        if server is not None:
+            server.stop()
+
+    report = {
+        "commit": current_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "employees": args.employees,
+            "users": args.users,
+            "vault": args.vault_addr or "fake",
+            "vault_latency_ms": None if args.vault_addr else args.latency_ms,
+            "database": app.config["SQLALCHEMY_DATABASE_URI"].split(":", 1)[0],
+            "storage_mode": get_sensitive_storage_mode(),
+            "cache_modes": args.cache,
+            "secret_cache": {
+                key: list(value) if isinstance(value, tuple) else value
+                for key, value in get_cache_settings().items()
+            },
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""widen sensitive key columns for transit ciphertext
+
+Revision ID: 5c2e8f1a9b3d
+Revises: 072e57d254d7
+Create Date: 2026-10-18 09:12:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2e8f1a9b3d'
+down_revision = '072e57d254d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        for column in ('phone_number_key', 'email_key', 'position_key', 'department_key'):
+            batch_op.alter_column(column,
+                   existing_type=sa.String(length=50),
+                   type_=sa.Text(),
+                   existing_nullable=True)
+
+    with op.batch_alter_table('salaries', schema=None) as batch_op:
+        for column in ('basic_salary_key', 'salary_coefficient_key', 'total_salary_key'):
+            batch_op.alter_column(column,
+                   existing_type=sa.String(length=50),
+                   type_=sa.Text(),
+                   existing_nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('salaries', schema=None) as batch_op:
+        for column in ('basic_salary_key', 'salary_coefficient_key', 'total_salary_key'):
+            batch_op.alter_column(column,
+                   existing_type=sa.Text(),
+                   type_=sa.String(length=50),
+                   existing_nullable=True)
+
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        for column in ('phone_number_key', 'email_key', 'position_key', 'department_key'):
+            batch_op.alter_column(column,
+                   existing_type=sa.Text(),
+                   type_=sa.String(length=50),
+                   existing_nullable=True)
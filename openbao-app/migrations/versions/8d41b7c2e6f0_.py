@@ -0,0 +1,26 @@
+"""add password hash to users
+
+Revision ID: 8d41b7c2e6f0
+Revises: 5c2e8f1a9b3d
+Create Date: 2026-10-18 10:27:03.184552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41b7c2e6f0'
+down_revision = '5c2e8f1a9b3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('password_hash', sa.String(length=256), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('password_hash')
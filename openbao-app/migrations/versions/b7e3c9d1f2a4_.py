@@ -0,0 +1,121 @@
+"""partition attendances by month
+
+Revision ID: b7e3c9d1f2a4
+Revises: 8d41b7c2e6f0
+Create Date: 2026-10-18 11:05:19.640271
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3c9d1f2a4'
+down_revision = '8d41b7c2e6f0'
+branch_labels = None
+depends_on = None
+
+
+# Trên PostgreSQL bảng attendances được chia partition theo tháng (RANGE theo
+# cột date). Khóa chính và ràng buộc unique của bảng partition phải chứa khóa
+# partition nên chúng được đổi thành (id, date) và (attendance_id, date).
+# Partition cho các tháng tiếp theo được tạo bởi `flask attendance-partitions`.
+CREATE_PARTITIONS = """
+DO $$
+DECLARE
+    month date := date_trunc('month', LEAST(
+        COALESCE((SELECT min(date) FROM attendances_legacy), current_date),
+        current_date))::date;
+    last_month date := (date_trunc('month', current_date) + interval '3 months')::date;
+BEGIN
+    WHILE month <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF attendances FOR VALUES FROM (%L) TO (%L)',
+            'attendances_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+            month, (month + interval '1 month')::date);
+        month := (month + interval '1 month')::date;
+    END LOOP;
+END $$;
+"""
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('attendances', schema=None) as batch_op:
+            batch_op.create_index('ix_attendances_employee_id_date', ['employee_id', 'date'], unique=False)
+        return
+
+    op.execute('ALTER TABLE attendances RENAME TO attendances_legacy')
+    op.execute('ALTER TABLE attendances_legacy RENAME CONSTRAINT attendances_pkey TO attendances_legacy_pkey')
+    op.execute('ALTER TABLE attendances_legacy RENAME CONSTRAINT attendances_attendance_id_key TO attendances_legacy_attendance_id_key')
+    op.execute('ALTER TABLE attendances_legacy RENAME CONSTRAINT attendances_employee_id_fkey TO attendances_legacy_employee_id_fkey')
+    op.execute("""
+        CREATE TABLE attendances (
+            id integer NOT NULL DEFAULT nextval('attendances_id_seq'),
+            attendance_id varchar(10) NOT NULL,
+            employee_id integer REFERENCES employees (id),
+            date date NOT NULL,
+            check_in_time time,
+            check_out_time time,
+            CONSTRAINT attendances_pkey PRIMARY KEY (id, date),
+            CONSTRAINT attendances_attendance_id_date_key UNIQUE (attendance_id, date)
+        ) PARTITION BY RANGE (date)
+    """)
+    op.execute('ALTER SEQUENCE attendances_id_seq OWNED BY attendances.id')
+    op.execute('CREATE TABLE attendances_default PARTITION OF attendances DEFAULT')
+    op.execute(CREATE_PARTITIONS)
+    op.create_index('ix_attendances_employee_id_date', 'attendances', ['employee_id', 'date'], unique=False)
+    op.create_index('ix_attendances_date_brin', 'attendances', ['date'], unique=False, postgresql_using='brin')
+    op.execute("""
+        INSERT INTO attendances (id, attendance_id, employee_id, date, check_in_time, check_out_time)
+        SELECT id, attendance_id, employee_id, date, check_in_time, check_out_time
+        FROM attendances_legacy WHERE date IS NOT NULL
+    """)
+    # Bảng partition không chứa được bản ghi thiếu ngày: chuyển chúng sang
+    # attendances_quarantine thay vì xóa cùng bảng cũ
+    skipped = op.get_bind().execute(
+        sa.text('SELECT count(*) FROM attendances_legacy WHERE date IS NULL')
+    ).scalar()
+    if skipped:
+        op.execute("""
+            CREATE TABLE attendances_quarantine AS
+            SELECT id, attendance_id, employee_id, date, check_in_time, check_out_time
+            FROM attendances_legacy WHERE date IS NULL
+        """)
+    print(f"Attendance partitioning: {skipped} rows with NULL date moved to attendances_quarantine")
+    op.execute('DROP TABLE attendances_legacy')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        with op.batch_alter_table('attendances', schema=None) as batch_op:
+            batch_op.drop_index('ix_attendances_employee_id_date')
+        return
+
+    op.execute('ALTER TABLE attendances RENAME TO attendances_partitioned')
+    op.execute('ALTER TABLE attendances_partitioned RENAME CONSTRAINT attendances_pkey TO attendances_partitioned_pkey')
+    op.create_table('attendances',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('attendances_id_seq')"), nullable=False),
+    sa.Column('attendance_id', sa.String(length=10), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=True),
+    sa.Column('date', sa.Date(), nullable=True),
+    sa.Column('check_in_time', sa.Time(), nullable=True),
+    sa.Column('check_out_time', sa.Time(), nullable=True),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('attendance_id')
+    )
+    op.execute('ALTER SEQUENCE attendances_id_seq OWNED BY attendances.id')
+    op.execute("""
+        INSERT INTO attendances (id, attendance_id, employee_id, date, check_in_time, check_out_time)
+        SELECT id, attendance_id, employee_id, date, check_in_time, check_out_time
+        FROM attendances_partitioned
+    """)
+    op.execute('DROP TABLE attendances_partitioned')
+    if sa.inspect(op.get_bind()).has_table('attendances_quarantine'):
+        op.execute("""
+            INSERT INTO attendances (id, attendance_id, employee_id, date, check_in_time, check_out_time)
+            SELECT id, attendance_id, employee_id, date, check_in_time, check_out_time
+            FROM attendances_quarantine
+        """)
+        op.execute('DROP TABLE attendances_quarantine')
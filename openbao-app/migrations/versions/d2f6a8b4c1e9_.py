@@ -0,0 +1,50 @@
+"""deduplicate attendances on employee and date
+
+Revision ID: d2f6a8b4c1e9
+Revises: b7e3c9d1f2a4
+Create Date: 2026-10-18 11:48:52.377016
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f6a8b4c1e9'
+down_revision = 'b7e3c9d1f2a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Gộp các bản ghi trùng (employee_id, date) vào bản ghi đầu tiên theo cùng
+    # quy tắc của bộ nhận chấm công: giờ vào sớm nhất, giờ ra muộn nhất; bản ghi
+    # không có employee_id không bị gộp (NULL không vi phạm ràng buộc unique)
+    op.execute("""
+        UPDATE attendances SET
+            check_in_time = (
+                SELECT min(d.check_in_time) FROM attendances d
+                WHERE d.employee_id = attendances.employee_id AND d.date = attendances.date
+            ),
+            check_out_time = (
+                SELECT max(d.check_out_time) FROM attendances d
+                WHERE d.employee_id = attendances.employee_id AND d.date = attendances.date
+            )
+        WHERE employee_id IS NOT NULL AND id IN (
+            SELECT min(id) FROM attendances WHERE employee_id IS NOT NULL
+            GROUP BY employee_id, date HAVING count(*) > 1
+        )
+    """)
+    op.execute("""
+        DELETE FROM attendances WHERE employee_id IS NOT NULL AND id NOT IN (
+            SELECT min(id) FROM attendances WHERE employee_id IS NOT NULL
+            GROUP BY employee_id, date
+        )
+    """)
+    op.drop_index('ix_attendances_employee_id_date', table_name='attendances')
+    op.create_index('uq_attendances_employee_id_date', 'attendances', ['employee_id', 'date'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_attendances_employee_id_date', table_name='attendances')
+    op.create_index('ix_attendances_employee_id_date', 'attendances', ['employee_id', 'date'], unique=False)
@@ -0,0 +1,36 @@
+"""add payroll period and inputs to salaries
+
+Revision ID: e5a9c3f7b2d8
+Revises: d2f6a8b4c1e9
+Create Date: 2026-10-18 12:31:07.992461
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c3f7b2d8'
+down_revision = 'd2f6a8b4c1e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('salaries', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('month', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('year', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('worked_days', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('bonus_key', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('deduction_key', sa.Text(), nullable=True))
+        batch_op.create_unique_constraint('salaries_employee_id_year_month_key', ['employee_id', 'year', 'month'])
+
+
+def downgrade():
+    with op.batch_alter_table('salaries', schema=None) as batch_op:
+        batch_op.drop_constraint('salaries_employee_id_year_month_key', type_='unique')
+        batch_op.drop_column('deduction_key')
+        batch_op.drop_column('bonus_key')
+        batch_op.drop_column('worked_days')
+        batch_op.drop_column('year')
+        batch_op.drop_column('month')
@@ -0,0 +1,36 @@
+"""add attendance_summaries
+
+Revision ID: f1c7d3e9a5b6
+Revises: e5a9c3f7b2d8
+Create Date: 2026-10-18 13:14:45.208833
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c7d3e9a5b6'
+down_revision = 'e5a9c3f7b2d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bảng được điền bởi `flask reconcile-attendance-summaries --all`; trước
+    # khi chạy lệnh này, get_month_summaries tự tính tổng hợp còn thiếu
+    op.create_table('attendance_summaries',
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('days_present', sa.Integer(), nullable=False),
+    sa.Column('total_minutes', sa.Integer(), nullable=False),
+    sa.Column('late_arrivals', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ),
+    sa.PrimaryKeyConstraint('employee_id', 'year', 'month')
+    )
+
+
+def downgrade():
+    op.drop_table('attendance_summaries')
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from fake_openbao import FakeOpenBao  # noqa: E402
+
+# Địa chỉ Vault, cơ sở dữ liệu và cấu hình thử lại được đọc lúc import app nên
+# phải được đặt trước khi import bất kỳ module nào của app
+_server = FakeOpenBao().start()
+os.environ["VAULT_ADDR"] = _server.url
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+os.environ["VAULT_RETRY_BACKOFF"] = "0.001"
+os.environ["VAULT_RETRY_BACKOFF_MAX"] = "0.01"
+
+from app import create_app  # noqa: E402
+from app import vault_cache, vault_client, vault_config, vault_envelope  # noqa: E402
+from app.employee_directory import invalidate_employee_directory  # noqa: E402
+from app.models import db as _db  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def fake_openbao():
+    yield _server
+    _server.stop()
+
+
+@pytest.fixture(autouse=True)
+def vault(fake_openbao, monkeypatch):
+    """FakeOpenBao sạch cùng breaker, cache và data key mới cho mỗi test."""
+    fake_openbao.set_faults(latency=0, jitter=0, error_rate=0, error_status=503)
+    fake_openbao.kv.clear()
+    fake_openbao.transit_keys.clear()
+    fake_openbao.reset_stats()
+    monkeypatch.setattr(vault_client, "_breaker", None)
+    monkeypatch.setattr(vault_cache, "_cache", None)
+    monkeypatch.setattr(vault_cache, "_flights", vault_cache.SingleFlight())
+    monkeypatch.setattr(vault_envelope, "_manager", None)
+    monkeypatch.setattr(vault_config, "sensitive_storage_mode", "packed")
+    yield fake_openbao
+
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    return app
+
+
+@pytest.fixture
+def db(app):
+    with app.app_context():
+        _db.create_all()
+        invalidate_employee_directory()
+        yield _db
+        _db.session.remove()
+        _db.drop_all()
+
+
+@pytest.fixture
+def client(app, db):
+    return app.test_client()
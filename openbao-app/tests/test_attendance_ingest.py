@@ -0,0 +1,119 @@
+from datetime import date, time
+
+import pytest
+
+from app.attendance_ingest import AttendanceIngester, parse_event
+from app.attendance_summary import get_summary
+from app.models import Attendance, Employee
+
+
+@pytest.fixture
+def employee(db):
+    employee = Employee(employee_id="E1", name="An")
+    db.session.add(employee)
+    db.session.commit()
+    return employee
+
+
+@pytest.fixture
+def ingester(app):
+    # Không khởi động thread nền: test gọi flush() trực tiếp
+    return AttendanceIngester(app, max_batch=1000, max_delay=60)
+
+
+def test_parse_event_formats():
+    assert parse_event(
+        {"employee_id": "7", "date": "2024-03-04", "check_in_time": "08:00"}
+    ) == (7, date(2024, 3, 4), time(8, 0), None)
+    assert parse_event(
+        {"employee_id": 7, "timestamp": "2024-03-04T17:30:05", "type": "out"}
+    ) == (7, date(2024, 3, 4), None, time(17, 30, 5))
+
+
+def test_events_for_the_same_day_are_merged(employee, ingester):
+    day = "2024-03-04"
+    result = ingester.submit(
+        [
+            {"employee_id": employee.id, "date": day, "check_in_time": "08:10"},
+            {"employee_id": employee.id, "timestamp": f"{day}T07:55:00"},
+            {"employee_id": employee.id, "timestamp": f"{day}T17:00", "type": "out"},
+            {"employee_id": employee.id, "date": day, "check_out_time": "18:15"},
+        ]
+    )
+    assert result["accepted"] == 4
+    assert ingester.stats()["merged"] == 3
+    assert ingester.flush() == 1
+
+    attendance = Attendance.query.one()
+    assert (attendance.check_in_time, attendance.check_out_time) == (
+        time(7, 55),
+        time(18, 15),
+    )
+
+
+def test_flush_upserts_existing_rows(employee, ingester):
+    day = "2024-03-04"
+    ingester.submit(
+        [{"employee_id": employee.id, "date": day, "check_in_time": "08:10"}]
+    )
+    ingester.flush()
+    ingester.submit(
+        [
+            {"employee_id": employee.id, "date": day, "check_in_time": "09:00"},
+            {"employee_id": employee.id, "date": day, "check_out_time": "17:00"},
+        ]
+    )
+    ingester.flush()
+
+    attendance = Attendance.query.one()
+    assert (attendance.check_in_time, attendance.check_out_time) == (
+        time(8, 10),
+        time(17, 0),
+    )
+    summary = get_summary(employee.id, 2024, 3)
+    assert (summary.days_present, summary.total_minutes) == (1, 530)
+
+
+def test_invalid_and_unknown_events_are_rejected(employee, ingester):
+    result = ingester.submit(
+        [
+            {"employee_id": employee.id, "date": 20240304, "check_in_time": "8"},
+            {"employee_id": employee.id, "timestamp": 1709539200},
+            {"employee_id": "abc", "date": "2024-03-04", "check_in_time": "08:00"},
+            {"employee_id": employee.id, "date": "2024-03-04"},
+            "not an event",
+            {"employee_id": employee.id + 1, "timestamp": "2024-03-04T08:00:00"},
+        ]
+    )
+    assert result["accepted"] == 1
+    assert result["rejected"] == 5
+    assert [error["index"] for error in result["errors"]] == [0, 1, 2, 3, 4]
+
+    assert ingester.flush() == 0
+    assert ingester.stats()["rejected_reasons"]["unknown employee"] == 1
+    assert Attendance.query.count() == 0
+
+
+def test_ingest_endpoint_requires_login_or_token(app, client, employee):
+    url = "/attendances/ingest?flush=1"
+    events = [{"employee_id": employee.id, "timestamp": "2024-03-04T08:00:00"}]
+    assert client.post(url, json=events).status_code == 401
+    assert client.get("/attendances/ingest/stats").status_code == 401
+
+    app.config["ATTENDANCE_INGEST_TOKEN"] = "device-token"
+    try:
+        headers = {"X-Ingest-Token": "wrong"}
+        response = client.post(url, json=events, headers=headers)
+        assert response.status_code == 401
+        headers = {"X-Ingest-Token": "device-token"}
+        response = client.post(url, json=events, headers=headers)
+        assert response.status_code == 202
+        assert response.get_json()["accepted"] == 1
+    finally:
+        app.config["ATTENDANCE_INGEST_TOKEN"] = ""
+
+    with client.session_transaction() as session:
+        session["username"] = "admin"
+    response = client.post(url, json=[{"employee_id": employee.id, "date": 5}])
+    assert response.status_code == 202
+    assert response.get_json()["rejected"] == 1
@@ -0,0 +1,94 @@
+from datetime import date, time
+
+import pytest
+from sqlalchemy import delete, insert, update
+
+from app.attendance_ingest import make_attendance_id
+from app.attendance_summary import get_month_summaries, get_summary, reconcile_month
+from app.models import Attendance, AttendanceSummary, Employee
+
+
+@pytest.fixture
+def employees(db):
+    employees = [Employee(employee_id=f"E{i}", name=f"N{i}") for i in range(3)]
+    db.session.add_all(employees)
+    db.session.commit()
+    return employees
+
+
+def _row(employee, day, check_in=time(8, 0), check_out=time(17, 0)):
+    return {
+        "attendance_id": make_attendance_id(employee.id, day),
+        "employee_id": employee.id,
+        "date": day,
+        "check_in_time": check_in,
+        "check_out_time": check_out,
+    }
+
+
+def test_summary_follows_orm_changes(db, employees):
+    employee = employees[0]
+    db.session.add_all(
+        [
+            Attendance(**_row(employee, date(2024, 3, 1))),
+            Attendance(**_row(employee, date(2024, 3, 4), check_in=time(9, 0))),
+        ]
+    )
+    db.session.commit()
+
+    summary = get_summary(employee.id, 2024, 3)
+    assert (summary.days_present, summary.total_minutes, summary.late_arrivals) == (
+        2,
+        1020,
+        1,
+    )
+
+    # Chuyển một dòng sang tháng khác: cả tháng cũ và tháng mới được cập nhật
+    moved = Attendance.query.filter_by(date=date(2024, 3, 4)).one()
+    moved.date = date(2024, 4, 1)
+    db.session.commit()
+    assert get_summary(employee.id, 2024, 3).days_present == 1
+    assert get_summary(employee.id, 2024, 4).days_present == 1
+
+
+def test_reconcile_fixes_drift(db, employees):
+    first, second, third = employees
+    day = date(2024, 3, 1)
+    db.session.add_all(
+        [Attendance(**_row(first, day)), Attendance(**_row(second, day))]
+    )
+    db.session.commit()
+
+    # Sửa thẳng trong cơ sở dữ liệu, bỏ qua cập nhật tổng hợp của ORM
+    db.session.execute(
+        update(AttendanceSummary)
+        .where(AttendanceSummary.employee_id == first.id)
+        .values(days_present=7)
+    )
+    db.session.execute(delete(Attendance).where(Attendance.employee_id == second.id))
+    db.session.execute(insert(Attendance), [_row(third, day)])
+    db.session.commit()
+
+    result = reconcile_month(2024, 3)
+
+    assert (result["created"], result["fixed"], result["deleted"]) == (1, 1, 1)
+    summaries = {
+        summary.employee_id: summary.days_present
+        for summary in AttendanceSummary.query.filter_by(year=2024, month=3)
+    }
+    assert summaries == {first.id: 1, third.id: 1}
+    assert reconcile_month(2024, 3) == dict(
+        result, checked=2, created=0, fixed=0, deleted=0
+    )
+
+
+def test_month_summaries_fill_in_missing_employees(db, employees):
+    first = employees[0]
+    db.session.execute(insert(Attendance), [_row(first, date(2024, 3, 1))])
+    db.session.commit()
+    assert get_summary(first.id, 2024, 3) is None
+
+    summaries = get_month_summaries(2024, 3)
+
+    assert summaries[first.id].days_present == 1
+    assert get_summary(first.id, 2024, 3) is not None
@@ -0,0 +1,155 @@
+import io
+import json
+
+from sqlalchemy.exc import DataError
+
+from app import bulk_import
+from app.bulk_import import import_employees
+from app.models import Employee
+from app.vault_client import read_kv
+
+CSV_HEADER = "employee_id,name,gender,date_of_birth,email\n"
+
+
+def _import(data, fmt="jsonl", **kwargs):
+    kwargs.setdefault("source_name", "employees")
+    return import_employees(io.StringIO(data), fmt, **kwargs)
+
+
+def _jsonl(*rows):
+    return "".join(f"{json.dumps(row)}\n" for row in rows)
+
+
+def test_imports_rows_and_their_sensitive_data(db):
+    data = CSV_HEADER + "E1,An,F,1990-01-02,an@x\nE2,Binh,M,,binh@x\n"
+    stats = _import(data, fmt="csv", batch_size=1)
+
+    assert stats["inserted"] == 2
+    assert stats["failed"] == 0
+    employee = Employee.query.filter_by(employee_id="E1").one()
+    assert str(employee.date_of_birth) == "1990-01-02"
+    assert employee.get_sensitive_data()[1] == "an@x"
+
+
+def test_bad_rows_are_reported_without_stopping_the_import(db):
+    data = (
+        _jsonl({"employee_id": "E1", "name": "An"})
+        + "{not json\n"
+        + "[1]\n"
+        + _jsonl(
+            {"employee_id": "E2"},
+            {"employee_id": "E3", "name": "C", "date_of_birth": 5},
+            {"employee_id": "E4", "name": "D", "date_of_birth": "02/01/1990"},
+            {"employee_id": "E5", "name": "x" * 101},
+            {"employee_id": "E6", "name": "F"},
+        )
+    )
+    stats = _import(data, batch_size=3)
+
+    assert stats["rows"] == 8
+    assert stats["inserted"] == 2
+    assert stats["failed"] == 6
+    assert [error["row"] for error in stats["errors"]] == [2, 3, 4, 5, 6, 7]
+    assert {e.employee_id for e in Employee.query} == {"E1", "E6"}
+
+
+def test_oversized_value_is_rejected_before_writing_to_vault(vault, db):
+    stats = _import(_jsonl({"employee_id": "E" * 11, "name": "A", "email": "a@x"}))
+
+    assert stats["failed"] == 1
+    assert "longer than 10" in stats["errors"][0]["error"]
+    assert vault.stats()["by_route"].get("POST secret/data/*") is None
+
+
+def test_duplicates_are_skipped(db):
+    rows = _jsonl(
+        {"employee_id": "E1", "name": "An", "email": "first@x"},
+        {"employee_id": "E1", "name": "An", "email": "second@x"},
+    )
+    assert _import(rows)["inserted"] == 1
+
+    stats = _import(rows)
+    assert stats["inserted"] == 0
+    assert stats["skipped"] == 2
+    employee = Employee.query.filter_by(employee_id="E1").one()
+    assert employee.get_sensitive_data()[1] == "first@x"
+
+
+def test_resumes_from_checkpoint(db, tmp_path):
+    checkpoint = tmp_path / "import.checkpoint"
+    rows = _jsonl(*({"employee_id": f"E{i}", "name": f"N{i}"} for i in range(5)))
+    checkpoint.write_text(json.dumps({"source": "employees", "rows_done": 3}))
+
+    stats = _import(rows, batch_size=1, checkpoint_path=str(checkpoint))
+
+    assert stats["resumed_from"] == 3
+    assert stats["inserted"] == 2
+    assert {e.employee_id for e in Employee.query} == {"E3", "E4"}
+    assert json.loads(checkpoint.read_text())["rows_done"] == 5
+
+
+def test_checkpoint_of_another_source_is_ignored(db, tmp_path):
+    checkpoint = tmp_path / "import.checkpoint"
+    checkpoint.write_text(json.dumps({"source": "other", "rows_done": 3}))
+
+    stats = _import(
+        _jsonl({"employee_id": "E1", "name": "An"}),
+        checkpoint_path=str(checkpoint),
+    )
+    assert stats["resumed_from"] == 0
+    assert stats["inserted"] == 1
+
+
+def test_rows_are_not_inserted_when_vault_is_down(vault, db):
+    vault.set_faults(error_rate=1.0)
+    stats = _import(_jsonl({"employee_id": "E1", "name": "An", "email": "a@x"}))
+
+    assert stats["inserted"] == 0
+    assert stats["errors"][0]["error"] == "failed to store sensitive data"
+    assert Employee.query.count() == 0
+
+
+def test_batch_insert_error_falls_back_to_single_rows(vault, db, monkeypatch):
+    insert_rows = bulk_import._insert_rows
+
+    def reject_e2(statement, returning, mappings):
+        if any(mapping["employee_id"] == "E2" for mapping in mappings):
+            raise DataError("INSERT", {}, Exception("value too long"))
+        return insert_rows(statement, returning, mappings)
+
+    monkeypatch.setattr(bulk_import, "_insert_rows", reject_e2)
+    stats = _import(
+        _jsonl(
+            {"employee_id": "E1", "name": "An", "email": "a@x"},
+            {"employee_id": "E2", "name": "Binh", "email": "b@x"},
+            {"employee_id": "E3", "name": "Chi", "email": "c@x"},
+        )
+    )
+
+    assert stats["inserted"] == 2
+    assert stats["failed"] == 1
+    assert stats["errors"] == [{"row": 2, "error": "value too long"}]
+    assert {e.employee_id for e in Employee.query} == {"E1", "E3"}
+    # Document Vault của dòng bị từ chối đã bị xóa, không bị bỏ rơi
+    assert read_kv("employee/E2", cacheable=False) == (None, None)
+    assert read_kv("employee/E1", cacheable=False)[0]["email"] == "a@x"
+
+
+def test_upload_requires_login_and_csrf(app, client):
+    def upload():
+        return client.post(
+            "/employees/import",
+            data={"file": (io.BytesIO(b"employee_id,name\nE1,An\n"), "e.csv")},
+        )
+
+    assert upload().status_code == 302
+    with client.session_transaction() as session:
+        session["username"] = "admin"
+    app.config["WTF_CSRF_ENABLED"] = True
+    try:
+        assert upload().status_code == 400
+    finally:
+        app.config["WTF_CSRF_ENABLED"] = False
+    response = upload()
+    assert response.status_code == 200
+    assert response.get_json()["inserted"] == 1
@@ -0,0 +1,88 @@
+from datetime import date, time, timedelta
+
+import pytest
+
+from app.attendance_ingest import make_attendance_id
+from app.models import Attendance, Employee, Position, Salary
+from app.payroll import run_payroll
+
+YEAR, MONTH = 2024, 3
+
+
+@pytest.fixture
+def payroll_data(db):
+    db.session.add(
+        Position(position_id="P1", position_name="Dev", salary_coefficient=1.5)
+    )
+
+    def add(employee_id, position, worked_days, basic, coefficient, bonus, deduction):
+        employee = Employee(employee_id=employee_id, name=employee_id)
+        employee.set_sensitive_data(None, None, position, None)
+        db.session.add(employee)
+        db.session.flush()
+        for offset in range(worked_days):
+            day = date(YEAR, MONTH, 1) + timedelta(days=offset)
+            db.session.add(
+                Attendance(
+                    attendance_id=make_attendance_id(employee.id, day),
+                    employee_id=employee.id,
+                    date=day,
+                    check_in_time=time(8, 0),
+                    check_out_time=time(17, 0),
+                )
+            )
+        salary = Salary(
+            salary_id=Salary.make_salary_id(employee.id, YEAR, MONTH),
+            employee_id=employee.id,
+            year=YEAR,
+            month=MONTH,
+        )
+        salary.set_salary_data(basic, coefficient, None, bonus, deduction)
+        db.session.add(salary)
+        db.session.commit()
+        return salary
+
+    return add
+
+
+def test_total_uses_worked_days_bonus_and_deduction(payroll_data):
+    salary = payroll_data("E1", "Dev", 10, 1000, 2, 100, 50)
+
+    result = run_payroll(YEAR, MONTH, standard_days=20)
+
+    assert result["computed"] == 1
+    assert result["skipped"] == 0
+    assert result["total_payroll"] == 1050.0
+    assert salary.worked_days == 10
+    assert float(salary.get_salary_data()[2]) == 1050.0
+
+
+def test_missing_coefficient_falls_back_to_the_position(payroll_data):
+    payroll_data("E1", "Dev", 20, 1000, None, 0, 0)
+
+    result = run_payroll(YEAR, MONTH, standard_days=20)
+
+    assert result["computed"] == 1
+    assert result["total_payroll"] == 1500.0
+
+
+def test_salaries_with_missing_inputs_are_skipped(payroll_data):
+    payroll_data("E1", "Dev", 20, 1000, 1, 0, 0)
+    skipped_bonus = payroll_data("E2", "Dev", 20, 1000, 1, None, 0)
+    skipped_position = payroll_data("E3", "Ops", 20, "abc", None, 0, 0)
+
+    result = run_payroll(YEAR, MONTH, standard_days=20)
+
+    assert result["computed"] == 1
+    assert result["skipped"] == 2
+    assert result["skipped_reasons"] == {
+        "basic_salary": 1,
+        "salary_coefficient": 1,
+        "bonus": 1,
+    }
+    assert sorted(result["skipped_salaries"]) == sorted(
+        [skipped_bonus.salary_id, skipped_position.salary_id]
+    )
+    assert result["total_payroll"] == 1000.0
+    # Bảng lương bị bỏ qua không bị ghi total_salary
+    assert skipped_bonus.get_salary_data()[2] is None
@@ -0,0 +1,115 @@
+import time
+
+import pytest
+
+from app import vault_client
+from app.vault_client import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    get_circuit_breaker,
+    read_kv,
+    request,
+    write_kv,
+)
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    assert breaker.allow()
+    breaker.record(503)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+    breaker.record(None)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_breaker_success_resets_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.allow()
+    breaker.record(503)
+    breaker.allow()
+    breaker.record(404)
+    breaker.allow()
+    breaker.record(503)
+    assert breaker.state == CLOSED
+
+
+def test_breaker_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.allow()
+    breaker.record(503)
+    time.sleep(0.02)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record(200)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.allow()
+    breaker.record(503)
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record(None)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_idempotent_request_is_retried(vault):
+    vault.set_faults(error_rate=1.0, error_status=503)
+    response = request("GET", "secret/data/retried")
+    assert response.status_code == 503
+    assert vault.stats()["by_route"]["GET secret/data/*"] == 3
+    assert get_circuit_breaker().stats()["retries"] == 2
+
+
+def test_write_is_not_retried(vault):
+    vault.set_faults(error_rate=1.0, error_status=503)
+    assert write_kv("not-retried", {"a": 1}) is None
+    assert vault.stats()["by_route"]["POST secret/data/*"] == 1
+
+
+def test_client_errors_are_not_retried(vault):
+    data, version = read_kv("missing", cacheable=False)
+    assert (data, version) == (None, None)
+    assert vault.stats()["by_route"]["GET secret/data/*"] == 1
+    assert get_circuit_breaker().state == CLOSED
+
+
+def test_open_breaker_rejects_without_calling_vault(vault, monkeypatch):
+    monkeypatch.setattr(vault_client, "_breaker", CircuitBreaker(1, 60))
+    vault.set_faults(error_rate=1.0, error_status=503)
+    request("GET", "secret/data/down")
+    vault.reset_stats()
+    with pytest.raises(CircuitOpenError):
+        request("GET", "secret/data/down")
+    assert vault.stats()["requests"] == 0
+    assert read_kv("down", cacheable=False) == (None, None)
+
+
+def test_probe_is_released_when_request_setup_fails(vault, monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    monkeypatch.setattr(vault_client, "_breaker", breaker)
+    breaker.allow()
+    breaker.record(503)
+    time.sleep(0.02)
+
+    def broken_plan(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    plan_request = vault_client.plan_request
+    monkeypatch.setattr(vault_client, "plan_request", broken_plan)
+    with pytest.raises(RuntimeError):
+        request("GET", "secret/data/probe")
+    monkeypatch.setattr(vault_client, "plan_request", plan_request)
+    time.sleep(0.02)
+    # Lời gọi thử lỗi khi chuẩn bị vẫn được ghi nhận nên breaker không bị kẹt
+    assert breaker.allow()
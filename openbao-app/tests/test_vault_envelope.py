@@ -0,0 +1,77 @@
+import pytest
+
+from app import vault_config
+from app.models import Employee
+from app.vault_envelope import (
+    ENVELOPE_PREFIX,
+    envelope_decrypt_batch,
+    envelope_encrypt_batch,
+    get_envelope_stats,
+    is_envelope_ciphertext,
+)
+
+
+@pytest.fixture
+def envelope_mode(monkeypatch):
+    monkeypatch.setattr(vault_config, "sensitive_storage_mode", "envelope")
+
+
+def test_round_trip_uses_one_data_key(vault):
+    contexts = ["employees:E1:email", "employees:E2:email", None]
+    ciphertexts = envelope_encrypt_batch(["a@x", "b@x", None], contexts)
+    assert all(is_envelope_ciphertext(value) for value in ciphertexts[:2])
+    assert ciphertexts[2] is None
+    assert envelope_decrypt_batch(ciphertexts, contexts) == ["a@x", "b@x", None]
+    assert get_envelope_stats()["key_fetches"] == 1
+
+
+def test_ciphertext_is_bound_to_its_context(vault):
+    ciphertexts = envelope_encrypt_batch(["a@x", "b@x"], ["t:1:email", "t:2:email"])
+    # Hai ciphertext bị tráo giữa hai ô không giải mã được
+    swapped = envelope_decrypt_batch(ciphertexts[::-1], ["t:1:email", "t:2:email"])
+    assert swapped == [None, None]
+
+
+def test_corrupt_value_does_not_fail_the_batch(vault):
+    contexts = ["t:1:f", "t:2:f", "t:3:f"]
+    good = envelope_encrypt_batch(["one", "two", "three"], contexts)
+    wrapped, _, payload = good[1].rpartition(":")
+    corrupt = [
+        good[0],
+        f"{wrapped}:{payload[:-4]}AAAA",
+        good[2],
+    ]
+    assert envelope_decrypt_batch(corrupt, contexts) == ["one", None, "three"]
+
+    not_base64 = [good[0], f"{wrapped}:***", good[2]]
+    assert envelope_decrypt_batch(not_base64, contexts) == ["one", None, "three"]
+
+
+def test_v1_prefix_is_not_recognised():
+    assert not is_envelope_ciphertext("env:v1:vault:v1:abc:def")
+    assert is_envelope_ciphertext(f"{ENVELOPE_PREFIX}vault:v1:abc:def")
+
+
+def test_employee_fields_round_trip(vault, db, envelope_mode):
+    employee = Employee(employee_id="E1", name="An")
+    employee.set_sensitive_data("0900", "an@x", "Dev", "IT")
+    db.session.add(employee)
+    db.session.commit()
+
+    assert is_envelope_ciphertext(employee.email_key)
+    assert vault.stats()["by_route"].get("POST secret/data/*") is None
+    assert employee.get_sensitive_data() == ("0900", "an@x", "Dev", "IT")
+
+
+def test_employee_ciphertext_copied_to_another_row_is_rejected(
+    vault, db, envelope_mode
+):
+    first = Employee(employee_id="E1", name="An")
+    first.set_sensitive_data("0900", "an@x", "Dev", "IT")
+    second = Employee(employee_id="E2", name="Binh")
+    second.set_sensitive_data("0911", "binh@x", "Ops", "IT")
+    second.email_key = first.email_key
+    db.session.add_all([first, second])
+    db.session.commit()
+
+    assert second.get_sensitive_data() == ("0911", None, "Ops", "IT")
@@ -0,0 +1,34 @@
+import requests
+
+from app.vault_transit import (
+    transit_decrypt_batch,
+    transit_encrypt_batch,
+    transit_rewrap_batch,
+)
+
+
+def test_round_trip_in_one_request(vault):
+    ciphertexts = transit_encrypt_batch(["a", None, "b"])
+    assert ciphertexts[1] is None
+    assert transit_decrypt_batch(ciphertexts) == ["a", None, "b"]
+    assert vault.stats()["batch_items"] == {
+        "POST transit/encrypt/*": 2,
+        "POST transit/decrypt/*": 2,
+    }
+
+
+def test_one_bad_ciphertext_only_loses_its_own_value(vault):
+    good = transit_encrypt_batch(["a", "b"])
+    values = [good[0], "vault:v1:not-a-ciphertext", good[1]]
+    assert transit_decrypt_batch(values) == ["a", None, "b"]
+    assert transit_rewrap_batch(values)[1] is None
+    assert None not in transit_rewrap_batch(good)
+
+
+def test_fake_server_fails_the_batch_without_partial_failure_code(vault):
+    response = requests.post(
+        f"{vault.url}/v1/transit/decrypt/openbao-app",
+        json={"batch_input": [{"ciphertext": "vault:v1:bad"}]},
+    )
+    assert response.status_code == 400
+    assert "error" in response.json()["data"]["batch_results"][0]